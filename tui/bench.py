@@ -0,0 +1,479 @@
+"""
+Banc d'essai reproductible des chemins critiques, sur un domaine jetable créé hors ligne :
+  - "provision" : `samba-tool domain provision` dans un répertoire temporaire, dont le
+    sam.ldb est ouvert directement (comme l'URL "local" de la TUI) ;
+  - "ldb" : simple fichier ldb (modules paged_results et server_sort de ldb) ouvert par
+    SamDB, sans schéma ni rootDSE : refresh_data n'y est pas mesurable.
+Le domaine est peuplé d'une population synthétique (utilisateurs répartis dans un arbre
+d'OU, ordinateurs, groupes dont quelques très gros), puis sont mesurés refresh_data, les
+list_*, search_objects, get_object_attributes(all_attrs=True), des créations en série et
+les fonctions draw_* de la TUI dans un terminal virtuel (pty). Les résultats sont écrits
+en JSON ; --baseline les compare à ceux d'une version précédente.
+
+    python3 bench.py --users 10000 --output bench-10k.json
+    python3 bench.py --backend ldb --users 100000 --ou-depth 6 --output new.json --baseline old.json
+"""
+import argparse
+import curses
+import itertools
+import json
+import os
+import platform
+import pty
+import random
+import select
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import ldb
+import tui
+from bulk_import import generate_password
+from metrics import metrics
+from samba_ad import (
+    detect_domain_settings, open_connection, connection, refresh_data, CATEGORIES,
+    list_ous, list_groups, list_gpos, list_users, list_computers, search_objects, get_object_attributes,
+    create_ou, create_group, create_user, create_computer,
+)
+
+BENCH_REALM = "BENCH.LAN"
+BENCH_DOMAIN = "BENCH"
+BENCH_DN = "DC=bench,DC=lan"
+# Ajouts par transaction lors du peuplement
+POPULATE_CHUNK = 1000
+# Écart de la médiane au-delà duquel un résultat est signalé par --baseline (1.2 = 20 % plus lent)
+REGRESSION_RATIO = 1.2
+# Version du format du fichier de résultats
+RESULTS_FORMAT = 1
+
+DESCRIPTIONS = ["Comptabilité", "Support informatique", "Direction", "Prestataire", "Commercial", ""]
+
+# Base d'un simple fichier ldb : modules intégrés à ldb (pagination et tri côté serveur),
+# index et comparaisons insensibles à la casse comme dans l'annuaire
+LDB_SETUP = [
+    {"dn": "@MODULES", "@LIST": "rdn_name,paged_results,server_sort"},
+    {"dn": "@INDEXLIST", "@IDXATTR": ["objectClass", "sAMAccountName"], "@IDXONE": "1"},
+    {"dn": "@ATTRIBUTES", "objectClass": "CASE_INSENSITIVE", "sAMAccountName": "CASE_INSENSITIVE",
+     "cn": "CASE_INSENSITIVE", "ou": "CASE_INSENSITIVE", "name": "CASE_INSENSITIVE"},
+]
+
+
+# --- Domaine jetable ---
+def provision_domain(workdir, password, options=()):
+    """Provisionne un DC dans 'workdir' et s'y connecte (sam.ldb ouvert directement)."""
+    command = ["samba-tool", "domain", "provision", f"--realm={BENCH_REALM}", f"--domain={BENCH_DOMAIN}",
+               "--server-role=dc", "--dns-backend=NONE", f"--adminpass={password}", f"--targetdir={workdir}"]
+    try:
+        result = subprocess.run(command + list(options), capture_output=True, text=True)
+    except OSError as e:
+        return f"[ERROR] Provisionnement impossible : {e}"
+    if result.returncode != 0:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        return f"[ERROR] Provisionnement impossible : {lines[-1] if lines else result.returncode}"
+    # Configuration du domaine jetable (et non celle de la machine) pour la pile samba
+    os.environ["SMB_CONF_PATH"] = os.path.join(workdir, "etc", "smb.conf")
+    return detect_domain_settings("Administrator", password, url=os.path.join(workdir, "private", "sam.ldb"))
+
+def create_ldb_domain(workdir, guid):
+    """Crée un simple fichier ldb avec les conteneurs d'un domaine et l'ouvre par SamDB."""
+    from samba.param import LoadParm
+    path = os.path.join(workdir, "bench.ldb")
+    try:
+        db = ldb.Ldb(path)
+        for entry in LDB_SETUP:
+            db.add(entry)
+        # Fichier refermé avant d'être rouvert avec ses modules (tdb : une ouverture par processus)
+        del db
+        samdb = open_connection(path, None, LoadParm())
+    except Exception as e:
+        return f"[ERROR] Création de la base ldb impossible : {e}"
+    containers = [
+        {"dn": BENCH_DN, "objectClass": ["top", "domain"], "dc": "bench"},
+        {"dn": f"CN=Users,{BENCH_DN}", "objectClass": ["top", "container"], "cn": "Users"},
+        {"dn": f"CN=Computers,{BENCH_DN}", "objectClass": ["top", "container"], "cn": "Computers"},
+        {"dn": f"CN=System,{BENCH_DN}", "objectClass": ["top", "container"], "cn": "System"},
+        {"dn": f"CN=Policies,CN=System,{BENCH_DN}", "objectClass": ["top", "container"], "cn": "Policies"},
+        {"dn": f"CN={{31B2F340-016D-11D2-945F-00C04FB984F9}},CN=Policies,CN=System,{BENCH_DN}",
+         "objectClass": ["top", "container", "groupPolicyContainer"], "displayName": "Default Domain Policy"},
+    ]
+    add_entries(samdb, containers, guid)
+    return {"samdb": samdb, "domain_dn": BENCH_DN, "domain_name": "bench", "user": "bench", "url": path}
+
+
+# --- Population synthétique ---
+def ou_tree(domain_dn, depth, width):
+    """DN des OU d'un arbre de 'depth' niveaux de 'width' OU chacune, parents d'abord."""
+    level = [domain_dn]
+    dns = []
+    for d in range(depth):
+        level = [f"OU=Bench{d}-{i},{parent}" for parent in level for i in range(width)]
+        dns.extend(level)
+    return dns, level if depth else []
+
+def user_dn(index, leaves, domain_dn):
+    container = leaves[index % len(leaves)] if leaves else f"CN=Users,{domain_dn}"
+    return f"CN=bench-user-{index:06d},{container}"
+
+def population(domain_dn, args):
+    """Entrées à ajouter (générateur), dans un ordre où chaque parent précède ses enfants."""
+    ous, leaves = ou_tree(domain_dn, args.ou_depth, args.ou_width)
+    for dn in ous:
+        yield {"dn": dn, "objectClass": ["top", "organizationalUnit"], "ou": dn.split(",", 1)[0][3:]}
+    for i in range(args.users):
+        yield {"dn": user_dn(i, leaves, domain_dn), "objectClass": ["top", "person", "organizationalPerson", "user"],
+               "sAMAccountName": f"bench-user-{i:06d}", "description": DESCRIPTIONS[i % len(DESCRIPTIONS)] or []}
+    for i in range(args.computers):
+        yield {"dn": f"CN=BENCH-PC-{i:06d},CN=Computers,{domain_dn}",
+               "objectClass": ["top", "person", "organizationalPerson", "user", "computer"],
+               "sAMAccountName": f"BENCH-PC-{i:06d}$"}
+    group_size = min(args.group_size, args.users)
+    for i in range(args.groups):
+        entry = {"dn": f"CN=bench-group-{i:04d},CN=Users,{domain_dn}", "objectClass": ["top", "group"],
+                 "sAMAccountName": f"bench-group-{i:04d}", "description": DESCRIPTIONS[i % len(DESCRIPTIONS)] or []}
+        if i < args.large_groups and group_size:
+            entry["member"] = [user_dn(j, leaves, domain_dn) for j in range(group_size)]
+        yield entry
+
+def add_entries(samdb, entries, guid=None):
+    """
+    Ajoute les entrées par transactions de POPULATE_CHUNK. 'guid' (simple fichier ldb) fournit
+    l'objectGUID que le DC attribuerait lui-même. Renvoie le nombre d'entrées ajoutées.
+    """
+    count = 0
+    entries = iter(entries)
+    with connection(samdb) as conn:
+        while True:
+            chunk = list(itertools.islice(entries, POPULATE_CHUNK))
+            if not chunk:
+                return count
+            conn.transaction_start()
+            try:
+                for entry in chunk:
+                    entry = {k: v for k, v in entry.items() if v != []}
+                    if guid:
+                        entry["objectGUID"] = guid()
+                    conn.add(entry)
+            except Exception:
+                conn.transaction_cancel()
+                raise
+            conn.transaction_commit()
+            count += len(chunk)
+
+
+# --- Mesures ---
+def summarize(durations):
+    """Résumé (secondes) d'une série de durées."""
+    return {"runs": len(durations), "min": min(durations), "median": statistics.median(durations),
+            "mean": statistics.fmean(durations), "max": max(durations)}
+
+def _entries(value):
+    if isinstance(value, dict) and "sync" in value:
+        return sum(len(value[category]) for category in CATEGORIES if isinstance(value.get(category), list))
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return 1 if value is not None else 0
+
+def report(name, result):
+    if "error" in result:
+        print(f"{name:<48}{result['error']}")
+    elif "skipped" in result:
+        print(f"{name:<48}ignoré : {result['skipped']}")
+    else:
+        print(f"{name:<48}{result['median'] * 1000:>12.2f} ms{result.get('entries', ''):>10}")
+
+def measure(results, name, func, repeat):
+    """
+    Exécute 'func' 'repeat' fois et range dans results[name] ses durées, le nombre d'entrées
+    renvoyées et les appels LDAP effectués (registre metrics, remis à zéro à chaque passage).
+    """
+    durations = []
+    value = None
+    try:
+        for _ in range(repeat):
+            metrics.reset()
+            started = time.perf_counter()
+            value = func()
+            durations.append(time.perf_counter() - started)
+    except Exception as e:
+        value = f"[ERROR] {e}"
+    if isinstance(value, str) and value.startswith("[ERROR]"):
+        results[name] = {"error": value}
+    else:
+        results[name] = dict(summarize(durations), entries=_entries(value),
+                             ldap={op: h.count for family, op, h in metrics.series() if family == "ldap"})
+    report(name, results[name])
+
+def measure_creates(results, name, create, count):
+    """Créations en série (une seule passe : les objets restent dans le domaine jetable)."""
+    errors = 0
+    started = time.perf_counter()
+    for i in range(count):
+        if str(create(i)).startswith("[ERROR]"):
+            errors += 1
+    elapsed = time.perf_counter() - started
+    results[name] = {"runs": 1, "count": count, "errors": errors, "median": elapsed / max(count, 1),
+                     "total": elapsed}
+    report(name, results[name])
+
+def run_directory_benchmarks(domain_info, args, results):
+    samdb, domain_dn = domain_info["samdb"], domain_info["domain_dn"]
+    repeat = args.repeat
+    if args.backend == "ldb":
+        results["refresh_data"] = {"skipped": "pas de rootDSE (highestCommittedUSN) dans un simple fichier ldb"}
+        report("refresh_data", results["refresh_data"])
+    else:
+        measure(results, "refresh_data", lambda: refresh_data(domain_info), repeat)
+        measure(results, "refresh_data (une recherche par catégorie)",
+                lambda: refresh_data(domain_info, merged=False), repeat)
+    for func in (list_ous, list_groups, list_gpos, list_users, list_computers):
+        measure(results, func.__name__, lambda: func(samdb, domain_dn), repeat)
+
+    measure(results, "search_objects (un compte)",
+            lambda: search_objects(samdb, domain_dn, "(sAMAccountName=bench-user-000042)", ["sAMAccountName"]), repeat)
+    measure(results, "search_objects (préfixe)",
+            lambda: search_objects(samdb, domain_dn, "(&(objectClass=user)(sAMAccountName=bench-user-00*))",
+                                   ["sAMAccountName", "description"]), repeat)
+    measure(results, "search_objects (tous les utilisateurs)",
+            lambda: search_objects(samdb, domain_dn, "(objectClass=user)", ["sAMAccountName", "description"]), repeat)
+
+    _, leaves = ou_tree(domain_dn, args.ou_depth, args.ou_width)
+    targets = []
+    if args.users:
+        targets.append(("utilisateur", user_dn(0, leaves, domain_dn)))
+    if args.groups:
+        targets.append(("gros groupe" if args.large_groups else "groupe", f"CN=bench-group-0000,CN=Users,{domain_dn}"))
+    for label, dn in targets:
+        measure(results, f"get_object_attributes all_attrs ({label})",
+                lambda: get_object_attributes(samdb, dn, all_attrs=True, use_cache=False), repeat)
+
+    if args.creates:
+        run_id = time.strftime("%H%M%S")
+        measure_creates(results, "create_ou (par objet)",
+                        lambda i: create_ou(samdb, domain_dn, f"bench-new-{run_id}-{i}"), args.creates)
+        measure_creates(results, "create_group (par objet)",
+                        lambda i: create_group(samdb, domain_dn, f"bench-new-{run_id}-{i}"), args.creates)
+        measure_creates(results, "create_user (par objet)",
+                        lambda i: create_user(samdb, domain_dn, f"bench-new-{run_id}-{i}", args.password), args.creates)
+        measure_creates(results, "create_computer (par objet)",
+                        lambda i: create_computer(samdb, domain_dn, f"BN{run_id}{i:05d}"), args.creates)
+
+
+# --- Affichage dans un terminal virtuel ---
+TABS = ["Dashboard", "OUs", "Groupes", "GPOs", "Utilisateurs", "Ordinateurs", "Recherche", "Hygiène"]
+
+def draw_benchmarks(stdscr, domain_info, items, repeat):
+    """Mesure les fonctions draw_* de la TUI sur la liste 'items' (onglet Utilisateurs)."""
+    tui.init_colors()
+    max_y, max_x = stdscr.getmaxyx()
+    header_height, tab_height, status_height = 6, 3, 1
+    content_height = max_y - header_height - tab_height - status_height
+    sidebar_width = max_x // 3
+    header_win = stdscr.subwin(header_height, max_x, 0, 0)
+    tab_win = stdscr.subwin(tab_height, max_x, header_height, 0)
+    main_win = stdscr.subwin(content_height, max_x, header_height + tab_height, 0)
+    status_win = stdscr.subwin(status_height, max_x, max_y - status_height, 0)
+    sidebar_win = main_win.derwin(content_height, sidebar_width, 0, 0)
+    content_win = main_win.derwin(content_height, max_x - sidebar_width, 0, sidebar_width)
+    page = tui.sidebar_page_size(sidebar_win)
+    last = max(len(items) - 1, 0)
+    marked = {tui.item_dn(item) for item in items[:1000]}
+
+    def frame():
+        stdscr.touchwin()
+        tui.draw_ascii_header(header_win, domain_info)
+        tui.draw_tab_bar(tab_win, 4, TABS, "Actualisé il y a 5 s")
+        tui.draw_sidebar(sidebar_win, 4, items, 0, 0)
+        tui.draw_content(content_win, 4, items, 0)
+        tui.draw_status_bar(status_win, "")
+        curses.doupdate()
+
+    cases = [
+        ("draw_ascii_header", lambda: tui.draw_ascii_header(header_win, domain_info)),
+        ("draw_tab_bar", lambda: tui.draw_tab_bar(tab_win, 4, TABS, "Actualisé il y a 5 s")),
+        ("draw_sidebar (début de liste)", lambda: tui.draw_sidebar(sidebar_win, 4, items, 0, 0)),
+        ("draw_sidebar (fin de liste)", lambda: tui.draw_sidebar(sidebar_win, 4, items, last, max(last - page + 1, 0))),
+        ("draw_sidebar (1000 sélectionnés)", lambda: tui.draw_sidebar(sidebar_win, 4, items, 0, 0, marked)),
+        ("draw_content", lambda: tui.draw_content(content_win, 4, items, 0)),
+        ("draw_metrics", lambda: tui.draw_metrics(content_win, metrics)),
+        ("draw_status_bar", lambda: tui.draw_status_bar(status_win, "")),
+        ("image complète (doupdate)", frame),
+    ]
+    results = {}
+    for name, draw in cases:
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            draw()
+            durations.append(time.perf_counter() - started)
+        results[f"affichage : {name}"] = dict(summarize(durations), entries=len(items))
+    return results
+
+def run_headless(func, *args, lines=50, columns=160):
+    """
+    Exécute func(stdscr, *args) sous curses dans un processus fils relié à un pseudo-terminal
+    de lines x columns ; la sortie du terminal est lue et ignorée. Renvoie le résultat de
+    'func' (sérialisable en JSON) ou {"error": ...}.
+    """
+    read_fd, write_fd = os.pipe()
+    pid, master = pty.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.environ.update(TERM=os.environ.get("BENCH_TERM", "xterm"), LINES=str(lines), COLUMNS=str(columns))
+        try:
+            payload = json.dumps(curses.wrapper(func, *args))
+        except Exception as e:
+            payload = json.dumps({"error": f"[ERROR] Affichage impossible : {e}"})
+        with os.fdopen(write_fd, "w") as f:
+            f.write(payload)
+        os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    fds = [master, read_fd]
+    while read_fd in fds:
+        ready, _, _ = select.select(fds, [], [])
+        for fd in ready:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                data = b""
+            if fd == read_fd and data:
+                chunks.append(data)
+            elif not data:
+                fds.remove(fd)
+    os.waitpid(pid, 0)
+    os.close(master)
+    os.close(read_fd)
+    try:
+        return json.loads(b"".join(chunks))
+    except ValueError:
+        return {"error": "[ERROR] Affichage impossible : aucun résultat du terminal virtuel"}
+
+
+# --- Résultats ---
+def source_version():
+    """Révision git des sources mesurées (None hors dépôt git)."""
+    try:
+        return subprocess.run(["git", "-C", os.path.dirname(os.path.abspath(__file__)), "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold=REGRESSION_RATIO):
+    """Compare les médianes à celles de 'baseline' ; renvoie les noms des résultats plus lents que 'threshold'."""
+    old_results = baseline.get("results", {})
+    regressions = []
+    print(f"\nComparaison avec {baseline.get('version') or 'la référence'} ({baseline.get('created', '?')}) :")
+    for name, result in results.items():
+        old = old_results.get(name, {})
+        if "median" not in result or not old.get("median"):
+            continue
+        ratio = result["median"] / old["median"]
+        flag = "  RÉGRESSION" if ratio > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<48}{old['median'] * 1000:>12.2f} ->{result['median'] * 1000:>10.2f} ms{ratio:>7.2f}x{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de Samba-AD sur un domaine jetable (résultats JSON).")
+    parser.add_argument("--backend", choices=["provision", "ldb"], default="provision",
+                        help="DC provisionné par samba-tool (défaut) ou simple fichier ldb")
+    parser.add_argument("--users", type=int, default=10000, help="nombre d'utilisateurs")
+    parser.add_argument("--computers", type=int, default=1000, help="nombre d'ordinateurs")
+    parser.add_argument("--groups", type=int, default=100, help="nombre de groupes")
+    parser.add_argument("--large-groups", type=int, default=2, help="groupes contenant --group-size membres")
+    parser.add_argument("--group-size", type=int, default=5000, help="membres de chaque gros groupe")
+    parser.add_argument("--ou-depth", type=int, default=4, help="profondeur de l'arbre d'OU (utilisateurs dans les feuilles)")
+    parser.add_argument("--ou-width", type=int, default=3, help="OU filles par OU")
+    parser.add_argument("--creates", type=int, default=200, help="objets créés par fonction create_* mesurée")
+    parser.add_argument("--repeat", type=int, default=3, help="passages par mesure (la médiane est comparée)")
+    parser.add_argument("--draw-repeat", type=int, default=200, help="passages par fonction d'affichage")
+    parser.add_argument("--seed", type=int, default=1, help="graine des objectGUID (fichier ldb)")
+    parser.add_argument("--workdir", help="répertoire du domaine jetable (défaut : temporaire, supprimé à la fin)")
+    parser.add_argument("--provision-option", action="append", default=[],
+                        help="option supplémentaire de samba-tool domain provision (répétable)")
+    parser.add_argument("--output", default="bench.json", help="fichier de résultats JSON")
+    parser.add_argument("--baseline", help="résultats d'une version précédente : code de sortie 1 en cas de régression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_RATIO,
+                        help="rapport des médianes au-delà duquel une mesure est une régression")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="samba-ad-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    args.password = generate_password()
+    rng = random.Random(args.seed)
+    try:
+        print(f"[INFO] Domaine jetable ({args.backend}) dans {workdir}...")
+        started = time.perf_counter()
+        if args.backend == "provision":
+            domain_info = provision_domain(workdir, args.password, args.provision_option)
+            guid = None
+        else:
+            guid = lambda: uuid.UUID(int=rng.getrandbits(128)).bytes_le
+            domain_info = create_ldb_domain(workdir, guid)
+        if isinstance(domain_info, str):
+            print(domain_info, file=sys.stderr)
+            return 1
+        setup_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            added = add_entries(domain_info["samdb"], population(domain_info["domain_dn"], args), guid)
+        except Exception as e:
+            print(f"[ERROR] Peuplement du domaine impossible : {e}", file=sys.stderr)
+            return 1
+        populate_seconds = time.perf_counter() - started
+        print(f"[INFO] {added} objets ajoutés en {populate_seconds:.1f} s.")
+
+        results = {}
+        run_directory_benchmarks(domain_info, args, results)
+        items = list_users(domain_info["samdb"], domain_info["domain_dn"])
+        drawn = run_headless(draw_benchmarks, {"domain_name": domain_info["domain_name"], "user": domain_info["user"]},
+                             items if isinstance(items, list) else [], args.draw_repeat)
+        if "error" in drawn:
+            drawn = {"affichage": drawn}
+        for name, result in drawn.items():
+            results[name] = result
+            report(name, result)
+
+        output = {
+            "format": RESULTS_FORMAT,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "version": source_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "population": {"users": args.users, "computers": args.computers, "groups": args.groups,
+                           "large_groups": args.large_groups, "group_size": args.group_size,
+                           "ou_depth": args.ou_depth, "ou_width": args.ou_width, "objects": added},
+            "setup_seconds": setup_seconds,
+            "populate_seconds": populate_seconds,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=1)
+        print(f"[OK] Résultats enregistrés dans {args.output}.")
+
+        if args.baseline:
+            try:
+                with open(args.baseline, encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Lecture de la référence impossible : {e}", file=sys.stderr)
+                return 1
+            regressions = compare(results, baseline, args.threshold)
+            if regressions:
+                print(f"[ERROR] {len(regressions)} mesure(s) plus lente(s) que la référence.")
+                return 1
+        return 0
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
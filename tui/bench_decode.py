@@ -0,0 +1,131 @@
+"""
+Micro-benchmark du décodage des entrées LDAP : coût par entrée de l'ancien décodage
+(attribut par attribut, "attr in msg" puis msg[attr][0]) et de decode.Decoder, sur des
+entrées ldb synthétiques en mémoire (aucune connexion à l'annuaire).
+
+    python3 bench_decode.py --entries 200000 --json decode.json
+"""
+import argparse
+import json
+import struct
+import sys
+import time
+import uuid
+
+import ldb
+from decode import Decoder
+from samba_ad import _user_record, _USER_ATTRS
+from hygiene import ACCOUNT_ATTRS
+from records import UserRecord
+
+
+# --- Décodage d'origine (référence "avant") ---
+def legacy_first_value(msg, attr):
+    if attr in msg and msg[attr]:
+        value = msg[attr][0]
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        return str(value)
+    return ""
+
+def legacy_user_values(msg):
+    return [legacy_first_value(msg, "cn"), legacy_first_value(msg, "sAMAccountName"),
+            legacy_first_value(msg, "description")]
+
+def legacy_user_record(msg):
+    # Même enregistrement qu'aujourd'hui : seul le décodage diffère
+    return UserRecord(cn=legacy_first_value(msg, "cn"), sAMAccountName=legacy_first_value(msg, "sAMAccountName"),
+                      description=legacy_first_value(msg, "description"), dn=msg.dn)
+
+def _legacy_int(msg, attr):
+    if attr not in msg or not msg[attr]:
+        return 0
+    try:
+        return int(bytes(msg[attr][0]))
+    except ValueError:
+        return 0
+
+def legacy_account_values(msg):
+    return [bytes(msg["sAMAccountName"][0]).decode("utf-8", errors="replace") if "sAMAccountName" in msg else "",
+            _legacy_int(msg, "lastLogonTimestamp"), _legacy_int(msg, "pwdLastSet"),
+            _legacy_int(msg, "userAccountControl"),
+            bytes(msg["whenCreated"][0]).decode("ascii", errors="replace") if "whenCreated" in msg else ""]
+
+
+# --- Entrées synthétiques ---
+def make_messages(count):
+    """Entrées ldb en mémoire, semblables à celles d'une page de la liste des utilisateurs."""
+    db = ldb.Ldb()
+    messages = []
+    for i in range(count):
+        msg = ldb.Message()
+        msg.dn = ldb.Dn(db, f"CN=Utilisateur {i},OU=Comptes,OU=Site{i % 20},DC=exemple,DC=lan")
+        msg["cn"] = ldb.MessageElement([f"Utilisateur {i}".encode()], 0, "cn")
+        msg["sAMAccountName"] = ldb.MessageElement([f"u{i:06d}".encode()], 0, "sAMAccountName")
+        if i % 3:
+            msg["description"] = ldb.MessageElement(["Poste bureautique – équipe {}".format(i % 50).encode()],
+                                                    0, "description")
+        msg["objectGUID"] = ldb.MessageElement([uuid.uuid4().bytes_le], 0, "objectGUID")
+        msg["objectSid"] = ldb.MessageElement([b"\x01\x05\x00\x00\x00\x00\x00\x05\x15\x00\x00\x00"
+                                               + struct.pack("<4I", 1, 2, 3, 1000 + i)], 0, "objectSid")
+        msg["userAccountControl"] = ldb.MessageElement([b"512" if i % 7 else b"514"], 0, "userAccountControl")
+        msg["lastLogonTimestamp"] = ldb.MessageElement([str(133400000000000000 + i).encode()], 0,
+                                                       "lastLogonTimestamp")
+        msg["pwdLastSet"] = ldb.MessageElement([str(133300000000000000 + i).encode()], 0, "pwdLastSet")
+        msg["whenCreated"] = ldb.MessageElement([b"20240131120000.0Z"], 0, "whenCreated")
+        messages.append(msg)
+    return messages
+
+
+# --- Mesure ---
+def best_time(func, messages, repeat):
+    """Meilleure durée (s) d'un passage de 'func' sur toutes les entrées."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for msg in messages:
+            func(msg)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(count, repeat):
+    messages = make_messages(count)
+    account_decoder = Decoder(ACCOUNT_ATTRS)
+    cases = [
+        ("utilisateurs : valeurs affichées", legacy_user_values, _USER_ATTRS.values),
+        ("utilisateurs : enregistrement complet", legacy_user_record, _user_record),
+        ("hygiène : attributs des comptes", legacy_account_values, account_decoder.values),
+    ]
+    results = []
+    for name, before, after in cases:
+        before_s = best_time(before, messages, repeat)
+        after_s = best_time(after, messages, repeat)
+        results.append({"cas": name, "avant_ns_par_entrée": before_s / count * 1e9,
+                        "après_ns_par_entrée": after_s / count * 1e9, "gain": before_s / after_s})
+    # Vérification : mêmes valeurs avant et après
+    for msg in messages[:100]:
+        assert legacy_user_values(msg) == _USER_ATTRS.values(msg)
+        assert legacy_account_values(msg) == account_decoder.values(msg)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark du décodage des entrées LDAP (avant/après decode.py).")
+    parser.add_argument("--entries", type=int, default=100000, help="nombre d'entrées synthétiques")
+    parser.add_argument("--repeat", type=int, default=5, help="passages par cas (la meilleure durée est retenue)")
+    parser.add_argument("--json", help="écrire aussi les résultats dans ce fichier JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.entries, args.repeat)
+    print(f"{'Cas':<40}{'avant (ns/entrée)':>20}{'après (ns/entrée)':>20}{'gain':>8}")
+    for result in results:
+        print(f"{result['cas']:<40}{result['avant_ns_par_entrée']:>20.0f}{result['après_ns_par_entrée']:>20.0f}"
+              f"{result['gain']:>7.2f}x")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"entrées": args.entries, "python": sys.version.split()[0], "résultats": results}, f, ensure_ascii=False, indent=1)
+        print(f"[OK] Résultats enregistrés dans {args.json}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
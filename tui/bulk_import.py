@@ -0,0 +1,387 @@
+import argparse
+import csv
+import getpass
+import os
+import secrets
+import string
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ldb
+from decode import to_text
+from samba_ad import detect_domain_settings, connection
+
+# Colonnes reconnues dans un fichier CSV d'import
+CSV_FIELDS = ["username", "password", "ou", "groups", "given_name", "surname", "mail", "description"]
+# Correspondance attributs LDIF -> champs d'import
+LDIF_FIELDS = {"sAMAccountName": "username", "givenName": "given_name", "sn": "surname",
+               "mail": "mail", "description": "description"}
+# Caractères interdits dans un sAMAccountName
+INVALID_SAM_CHARS = set('"/\\[]:;|=,+*?<>@')
+# userAccountControl d'un compte utilisateur normal et actif
+UF_NORMAL_ACCOUNT = 512
+# Colonnes du rapport CSV par compte
+REPORT_FIELDS = ["username", "dn", "status", "message", "generated_password"]
+
+# Connexion propre à chaque processus de travail (initialisée par _init_worker)
+_worker_domain = None
+
+
+# --- Lecture des fichiers d'import ---
+def read_csv(path):
+    """
+    Lit un CSV (en-tête obligatoire, colonnes de CSV_FIELDS) et renvoie une liste d'enregistrements.
+    'groups' contient des sAMAccountName de groupes séparés par des ';'.
+    'source' indique la ligne du fichier (messages de validation).
+    """
+    records = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record = {field: (row.get(field) or "").strip() for field in CSV_FIELDS}
+            record["groups"] = [g.strip() for g in record["groups"].split(";") if g.strip()]
+            record["source"] = f"Ligne {reader.line_num}"
+            records.append(record)
+    return records
+
+def read_ldif(path):
+    """
+    Lit un LDIF d'entrées utilisateur : l'OU est déduite du DN parent, les groupes de
+    'memberOf' (DN ou nom, résolus à la validation) et le mot de passe initial de 'userPassword'.
+    'source' indique le numéro de l'enregistrement dans le fichier.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    records = []
+    for number, (_changetype, msg) in enumerate(ldb.Ldb().parse_ldif(text), start=1):
+        record = {field: "" for field in CSV_FIELDS}
+        for attr, field in LDIF_FIELDS.items():
+            if attr in msg:
+                record[field] = to_text(msg[attr][0])
+        if "userPassword" in msg:
+            record["password"] = to_text(msg["userPassword"][0])
+        parent = msg.dn.parent()
+        record["ou"] = str(parent) if parent is not None else ""
+        record["groups"] = [to_text(value) for value in msg["memberOf"]] if "memberOf" in msg else []
+        record["source"] = f"Enregistrement {number}"
+        records.append(record)
+    return records
+
+def read_records(path):
+    """Lit un fichier d'import selon son extension (.ldif ou CSV)."""
+    if path.lower().endswith(".ldif"):
+        return read_ldif(path)
+    return read_csv(path)
+
+
+# --- Validation préalable ---
+def _ou_dn(ou, domain_dn):
+    """Complète un chemin d'OU relatif (ex. "OU=Finance,OU=Users") avec le DN du domaine."""
+    if not ou:
+        return f"CN=Users,{domain_dn}"
+    if ou.lower().endswith(domain_dn.lower()):
+        return ou
+    return f"{ou},{domain_dn}"
+
+def _exists(samdb, dn):
+    try:
+        return bool(samdb.search(base=dn, scope=ldb.SCOPE_BASE, attrs=["dn"]))
+    except ldb.LdbError:
+        return False
+
+def _existing_accounts(samdb, domain_dn, names, chunk=100):
+    """Renvoie les sAMAccountName déjà présents dans l'annuaire (requêtes groupées par 'chunk')."""
+    names = sorted(names)
+    existing = set()
+    for i in range(0, len(names), chunk):
+        clauses = "".join(f"(sAMAccountName={ldb.binary_encode(n)})" for n in names[i:i + chunk])
+        for msg in samdb.search(base=domain_dn, expression=f"(|{clauses})", attrs=["sAMAccountName"]):
+            existing.add(to_text(msg["sAMAccountName"][0]).lower())
+    return existing
+
+def _group_dn(samdb, domain_dn, group):
+    """Résout un groupe donné par son DN ou son sAMAccountName ; None s'il est introuvable."""
+    if "=" in group:
+        try:
+            res = samdb.search(base=group, scope=ldb.SCOPE_BASE, expression="(objectClass=group)", attrs=["dn"])
+        except ldb.LdbError:
+            return None
+    else:
+        res = samdb.search(base=domain_dn, attrs=["dn"],
+                           expression=f"(&(objectClass=group)(sAMAccountName={ldb.binary_encode(group)}))")
+    return str(res[0].dn) if res else None
+
+def validate_records(samdb, domain_dn, records):
+    """
+    Valide tous les enregistrements avant la moindre écriture : nom de compte, doublons,
+    comptes existants (hors comptes déjà créés lors d'une exécution reprise), OU et
+    groupes présents dans l'annuaire.
+    Renvoie (erreurs, groupes) : la liste des (position dans le fichier, nom, message) et la
+    résolution nom de groupe -> DN.
+    """
+    errors = []
+    seen = set()
+    for number, record in enumerate(records, start=1):
+        line = record.get("source", f"Enregistrement {number}")
+        name = record["username"]
+        if not name:
+            errors.append((line, name, "nom d'utilisateur manquant"))
+        elif len(name) > 20:
+            errors.append((line, name, "nom d'utilisateur de plus de 20 caractères"))
+        elif INVALID_SAM_CHARS & set(name):
+            errors.append((line, name, "caractère interdit dans le nom d'utilisateur"))
+        elif name.lower() in seen:
+            errors.append((line, name, "doublon dans le fichier"))
+        seen.add(name.lower())
+
+    existing = _existing_accounts(samdb, domain_dn, {r["username"] for r in records if r["username"]})
+    ous = {}
+    groups = {}
+    for number, record in enumerate(records, start=1):
+        line = record.get("source", f"Enregistrement {number}")
+        name = record["username"]
+        if name.lower() in existing and not record.get("created"):
+            errors.append((line, name, "le compte existe déjà"))
+        ou_dn = _ou_dn(record["ou"], domain_dn)
+        if ou_dn not in ous:
+            ous[ou_dn] = _exists(samdb, ou_dn)
+        if not ous[ou_dn]:
+            errors.append((line, name, f"OU introuvable : {ou_dn}"))
+        for group in record["groups"]:
+            if group not in groups:
+                groups[group] = _group_dn(samdb, domain_dn, group)
+            if groups[group] is None:
+                errors.append((line, name, f"groupe introuvable : {group}"))
+    return errors, groups
+
+
+# --- Création (processus de travail) ---
+def generate_password(length=16):
+    """Génère un mot de passe aléatoire respectant la complexité AD (4 classes de caractères)."""
+    classes = [string.ascii_lowercase, string.ascii_uppercase, string.digits, "!#%+-.:=?_"]
+    chars = [secrets.choice(c) for c in classes]
+    chars += [secrets.choice("".join(classes)) for _ in range(length - len(chars))]
+    secrets.SystemRandom().shuffle(chars)
+    return "".join(chars)
+
+def _init_worker(admin_user, admin_password):
+    """Ouvre la connexion authentifiée du processus de travail (une seule pour tous ses lots)."""
+    global _worker_domain
+    _worker_domain = detect_domain_settings(admin_user, admin_password, pool_size=1)
+
+def _realm(domain_dn):
+    """DC=northstar,DC=com -> northstar.com"""
+    return ".".join(part.split("=", 1)[1] for part in domain_dn.split(","))
+
+def _user_message(record, domain_dn, realm):
+    name = record["username"]
+    message = {
+        "dn": f"CN={name},{_ou_dn(record['ou'], domain_dn)}",
+        "objectClass": ["top", "person", "organizationalPerson", "user"],
+        "sAMAccountName": name,
+        "userPrincipalName": f"{name}@{realm}",
+        "userAccountControl": str(UF_NORMAL_ACCOUNT),
+        "unicodePwd": f'"{record["password"]}"'.encode("utf-16-le"),
+    }
+    for field, attr in (("given_name", "givenName"), ("surname", "sn"), ("mail", "mail"), ("description", "description")):
+        if record[field]:
+            message[attr] = record[field]
+    if record["given_name"] or record["surname"]:
+        message["displayName"] = " ".join(p for p in (record["given_name"], record["surname"]) if p)
+    return message
+
+def _add_members(samdb, group_dn, member_dns):
+    """Ajoute plusieurs membres à un groupe en une seule modification LDAP."""
+    with connection(samdb) as conn:
+        msg = ldb.Message()
+        msg.dn = ldb.Dn(conn, group_dn)
+        msg["member"] = ldb.MessageElement(member_dns, ldb.FLAG_MOD_ADD, "member")
+        conn.modify(msg)
+
+def _import_batch(batch, groups):
+    """
+    Crée un lot d'utilisateurs sur la connexion du processus, puis les ajoute à leurs groupes
+    avec une modification par groupe pour tout le lot (repli membre par membre en cas d'échec,
+    un membre déjà présent n'étant pas une erreur). Les comptes déjà créés par une exécution
+    précédente ('created') ne sont pas recréés : seuls leurs groupes sont complétés.
+    Renvoie la liste des résultats (nom, dn, statut, message).
+    """
+    if isinstance(_worker_domain, str):
+        return [(r["username"], "", "ERROR", _worker_domain) for r in batch]
+    samdb = _worker_domain["samdb"]
+    domain_dn = _worker_domain["domain_dn"]
+    realm = _realm(domain_dn)
+    results = {}
+    members = {}
+    for record in batch:
+        name = record["username"]
+        if record.get("created"):
+            dn = record["created"]
+            results[name] = [name, dn, "OK", "compte déjà créé, groupes complétés"]
+        else:
+            message = _user_message(record, domain_dn, realm)
+            dn = message["dn"]
+            try:
+                samdb.add(message)
+            except Exception as e:
+                results[name] = [name, dn, "ERROR", str(e)]
+                continue
+            results[name] = [name, dn, "OK", ""]
+        for group in record["groups"]:
+            members.setdefault(groups[group], []).append((name, dn))
+    for group_dn, entries in members.items():
+        try:
+            _add_members(samdb, group_dn, [dn for _, dn in entries])
+        except Exception:
+            for name, dn in entries:
+                try:
+                    _add_members(samdb, group_dn, [dn])
+                except ldb.LdbError as e:
+                    if e.args[0] == ldb.ERR_ATTRIBUTE_OR_VALUE_EXISTS:
+                        continue
+                    results[name][2] = "PARTIAL"
+                    results[name][3] += f"ajout à {group_dn} impossible : {e}; "
+                except Exception as e:
+                    results[name][2] = "PARTIAL"
+                    results[name][3] += f"ajout à {group_dn} impossible : {e}; "
+    return [tuple(r) for r in results.values()]
+
+
+# --- Orchestration ---
+def load_checkpoint(path):
+    """Renvoie l'ensemble des comptes déjà traités lors d'une exécution précédente."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+def load_report(path):
+    """
+    Renvoie les comptes créés d'après un rapport existant (nom en minuscules -> DN) :
+    statut OK ou PARTIAL, le dernier résultat d'un compte l'emportant.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    created = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("username") or "").lower()
+            if row.get("status") in ("OK", "PARTIAL"):
+                created[name] = row["dn"]
+            else:
+                created.pop(name, None)
+    return created
+
+def open_report(path, append=False):
+    """
+    Ouvre le rapport CSV par compte (mots de passe générés inclus, fichier en mode 600).
+    En mode 'append' (reprise), les lignes sont ajoutées au rapport existant.
+    Renvoie (fichier, writer).
+    """
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(path, flags, 0o600)
+    f = os.fdopen(fd, "a" if append else "w", newline="", encoding="utf-8")
+    writer = csv.writer(f)
+    if f.tell() == 0:
+        writer.writerow(REPORT_FIELDS)
+        f.flush()
+    return f, writer
+
+def import_users(records, groups, admin_user, admin_password, workers=4, batch_size=50,
+                 checkpoint=None, report=None, on_result=None):
+    """
+    Crée les utilisateurs par lots de 'batch_size' répartis sur 'workers' processus, chacun
+    disposant de sa propre connexion authentifiée. Chaque résultat est écrit dans le
+    rapport 'report' (avec le mot de passe généré) avant que le compte ne soit ajouté au
+    fichier 'checkpoint' : une interruption ne perd aucun mot de passe, et une nouvelle
+    exécution avec le même fichier reprend là où la précédente s'est arrêtée. Seuls les
+    comptes complets (OK) sont marqués : ceux dont un groupe a échoué sont repris.
+    'on_result' est appelé pour chaque résultat.
+    Renvoie la liste des résultats (nom, dn, statut, message).
+    """
+    done = load_checkpoint(checkpoint)
+    pending = [r for r in records if r["username"].lower() not in done]
+    for record in pending:
+        if not record["password"] and not record.get("created"):
+            record["password"] = generate_password()
+            record["generated"] = True
+    generated = {r["username"]: r["password"] for r in pending if r.get("generated")}
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    results = []
+    report_file, report_writer = open_report(report, append=bool(checkpoint)) if report else (None, None)
+    checkpoint_file = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(admin_user, admin_password)) as pool:
+            futures = [pool.submit(_import_batch, batch, groups) for batch in batches]
+            for future in as_completed(futures):
+                batch_results = future.result()
+                if report_file:
+                    for name, dn, status, message in batch_results:
+                        report_writer.writerow([name, dn, status, message,
+                                                generated.get(name, "") if status != "ERROR" else ""])
+                    report_file.flush()
+                    os.fsync(report_file.fileno())
+                for result in batch_results:
+                    results.append(result)
+                    if checkpoint_file and result[2] == "OK":
+                        checkpoint_file.write(result[0] + "\n")
+                    if on_result:
+                        on_result(result)
+                if checkpoint_file:
+                    checkpoint_file.flush()
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+        if report_file:
+            report_file.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import massif d'utilisateurs Samba AD (CSV ou LDIF).")
+    parser.add_argument("file", help="fichier d'import (.csv ou .ldif)")
+    parser.add_argument("--user", required=True, help="compte administrateur Samba AD")
+    parser.add_argument("--workers", type=int, default=4, help="nombre de connexions parallèles")
+    parser.add_argument("--batch-size", type=int, default=50, help="nombre de comptes par lot")
+    parser.add_argument("--checkpoint", help="fichier de reprise (comptes déjà créés)")
+    parser.add_argument("--report", default="import_report.csv", help="rapport CSV par compte")
+    parser.add_argument("--dry-run", action="store_true", help="valider le fichier sans rien créer")
+    args = parser.parse_args(argv)
+
+    admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+    domain_info = detect_domain_settings(args.user, admin_password)
+    if isinstance(domain_info, str):
+        print(domain_info)
+        return 1
+
+    records = read_records(args.file)
+    done = load_checkpoint(args.checkpoint)
+    to_validate = [r for r in records if r["username"].lower() not in done]
+    if args.checkpoint:
+        # Comptes créés mais non marqués (groupe en échec, interruption) : on complète leurs groupes
+        created = load_report(args.report)
+        for record in to_validate:
+            record["created"] = created.get(record["username"].lower())
+    errors, groups = validate_records(domain_info["samdb"], domain_info["domain_dn"], to_validate)
+    for line, name, message in errors:
+        print(f"[ERROR] {line} ({name}) : {message}")
+    if errors:
+        print(f"[ERROR] {len(errors)} erreur(s) de validation, aucun compte créé.")
+        return 1
+    print(f"[OK] {len(to_validate)} compte(s) valides ({len(records) - len(to_validate)} déjà traités).")
+    if args.dry_run:
+        return 0
+
+    counts = {}
+    def on_result(result):
+        counts[result[2]] = counts.get(result[2], 0) + 1
+        if result[2] != "OK":
+            print(f"[{result[2]}] {result[0]} : {result[3]}")
+    import_users(to_validate, groups, args.user, admin_password, args.workers,
+                 args.batch_size, args.checkpoint, args.report, on_result)
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    print(f"[OK] Import terminé ({summary}). Rapport : {args.report}")
+    return 0 if counts.get("ERROR", 0) == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
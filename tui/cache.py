@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Emplacement par défaut de l'instantané local de l'annuaire
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "samba-ad-tui", "snapshot.sqlite")
+# Âge maximal (secondes) d'un instantané réutilisable au démarrage
+SNAPSHOT_TTL = 24 * 3600
+# Paramètres du domaine (DN, nom) mémorisés par adresse d'annuaire pour accélérer le démarrage
+DEFAULT_DOMAIN_CACHE_PATH = os.path.join(os.path.dirname(DEFAULT_SNAPSHOT_PATH), "domain.json")
+
+
+def _dn_key(dn):
+    """Normalise un DN (ldb.Dn ou chaîne) pour servir de clé de cache."""
+    return str(dn).lower()
+
+
+# --- Cache mémoire (LRU) des attributs d'objets ---
+class AttributeCache:
+    """
+    Cache LRU des résultats de get_object_attributes, indexé par DN et variante
+    (sous-ensemble d'attributs ou tous les attributs).
+    Chaque entrée conserve l'uSNChanged de l'objet : passé le délai 'ttl', l'entrée
+    n'est pas jetée mais revalidée en comparant cet USN à celui du DC.
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def lookup(self, dn, variant):
+        """Renvoie (valeur, usn, expirée) ou None si l'objet n'est pas en cache."""
+        key = (_dn_key(dn), variant)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        value, usn, stored_at = entry
+        return value, usn, time.monotonic() - stored_at > self.ttl
+
+    def store(self, dn, variant, value, usn):
+        key = (_dn_key(dn), variant)
+        self._entries[key] = (value, usn, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def touch(self, dn, variant):
+        """Repousse l'expiration d'une entrée revalidée auprès du DC."""
+        key = (_dn_key(dn), variant)
+        value, usn, _ = self._entries[key]
+        self._entries[key] = (value, usn, time.monotonic())
+
+    def invalidate(self, dn):
+        """Retire du cache l'objet 'dn' et tous ses descendants (renommage/déplacement d'une OU)."""
+        dn = _dn_key(dn)
+        suffix = "," + dn
+        for key in [k for k in self._entries if k[0] == dn or k[0].endswith(suffix)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+# --- Instantané persistant (sqlite) des listes de la TUI ---
+def save_snapshot(path, domain_dn, data):
+    """
+    Enregistre les listes de 'data' et leur état de synchronisation (USN, DC, objectGUID)
+    dans une base sqlite locale, lisible uniquement par l'utilisateur courant.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            os.chmod(tmp_path, 0o600)
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE entries (category TEXT, guid BLOB, dn TEXT, record TEXT)")
+            sync = data["sync"]
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("domain_dn", str(domain_dn).lower()),
+                ("server", sync.get("server") or ""),
+                ("saved_at", str(time.time())),
+            ] + [(f"usn:{category}", str(usn)) for category, usn in sync["usns"].items()]
+              + [(f"refreshed:{category}", str(t)) for category, t in sync["refreshed"].items()])
+            for category, index in sync["index"].items():
+                conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", (
+                    (category, guid, str(record.get("dn")), json.dumps(dict(record), default=str))
+                    for guid, record in index.items()
+                ))
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+        return f"[OK] Instantané enregistré dans {path}."
+    except Exception as e:
+        return f"[ERROR] Impossible d'enregistrer l'instantané : {e}"
+
+def load_snapshot(path, domain_dn, categories, max_age=SNAPSHOT_TTL, make_record=None):
+    """
+    Recharge un instantané s'il existe, concerne le même domaine et a moins de 'max_age'
+    secondes. Renvoie un dictionnaire 'data' (listes + data['sync'], voir samba_ad.new_data) ou None.
+    Les DN y sont des chaînes ; les données doivent ensuite être mises à jour par sync_data.
+    'make_record(catégorie, dictionnaire)' (facultatif) construit chaque enregistrement.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("domain_dn") != str(domain_dn).lower():
+                return None
+            if time.time() - float(meta["saved_at"]) > max_age:
+                return None
+            # Seules les catégories chargées au moment de l'enregistrement ont un USN
+            usns = {category: int(meta[f"usn:{category}"]) for category in categories if f"usn:{category}" in meta}
+            refreshed = {category: float(meta.get(f"refreshed:{category}", meta["saved_at"])) for category in usns}
+            data = {category: [] for category in categories}
+            index = {category: {} for category in usns}
+            for category, guid, record in conn.execute("SELECT category, guid, record FROM entries ORDER BY rowid"):
+                if category not in index:
+                    continue
+                record = json.loads(record)
+                if make_record is not None:
+                    record = make_record(category, record)
+                data[category].append(record)
+                index[category][bytes(guid)] = record
+        finally:
+            conn.close()
+        data["sync"] = {"server": meta.get("server", ""), "usns": usns, "refreshed": refreshed, "index": index}
+        data["counts"] = {}
+        return data
+    except (sqlite3.Error, KeyError, ValueError):
+        return None
+
+
+# --- Paramètres du domaine mémorisés (démarrage) ---
+def load_domain_info(url, path=DEFAULT_DOMAIN_CACHE_PATH):
+    """Renvoie {"domain_dn", "domain_name"} mémorisé pour l'annuaire 'url', ou None."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            info = json.load(f).get(url)
+        if info and info.get("domain_dn") and info.get("domain_name"):
+            return {"domain_dn": info["domain_dn"], "domain_name": info["domain_name"]}
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+def save_domain_info(url, domain_dn, domain_name, path=DEFAULT_DOMAIN_CACHE_PATH):
+    """Mémorise le DN et le nom du domaine de l'annuaire 'url' (fichier lisible par l'utilisateur seul)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            known = json.load(f)
+        if not isinstance(known, dict):
+            known = {}
+    except (OSError, ValueError):
+        known = {}
+    known[url] = {"domain_dn": str(domain_dn), "domain_name": str(domain_name), "saved_at": time.time()}
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump(known, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
@@ -0,0 +1,261 @@
+import argparse
+import csv
+import getpass
+import json
+import os
+import sys
+
+import ldb
+from decode import json_value, to_text
+from metrics import metrics
+from samba_ad import (
+    detect_domain_settings, connection, CATEGORIES, iter_category_pages, iter_search_pages,
+    create_ou, delete_ou, create_group, delete_group, delete_gpo,
+    create_user, delete_user, reset_password, create_computer, delete_computer,
+    modify_object, move_object, rename_object, delete_object, batch_modify,
+)
+
+# Opérations acceptées par la commande 'run' (une par ligne JSON sur l'entrée standard) :
+# nom -> (fonction, arguments attendus après la connexion). "domain_dn" est fourni par la CLI.
+OPERATIONS = {
+    "create_ou": (create_ou, ["domain_dn", "name"]),
+    "delete_ou": (delete_ou, ["domain_dn", "name"]),
+    "create_group": (create_group, ["domain_dn", "name"]),
+    "delete_group": (delete_group, ["domain_dn", "name"]),
+    "delete_gpo": (delete_gpo, ["domain_dn", "name"]),
+    "create_user": (create_user, ["domain_dn", "name", "password"]),
+    "delete_user": (delete_user, ["domain_dn", "name"]),
+    "reset_password": (reset_password, ["domain_dn", "name", "password"]),
+    "create_computer": (create_computer, ["domain_dn", "name"]),
+    "delete_computer": (delete_computer, ["domain_dn", "name"]),
+    "modify": (modify_object, ["dn", "changes"]),  # {"attr": [valeurs]} : valeurs remplacées
+    "move": (move_object, ["dn", "new_dn"]),
+    "rename": (rename_object, ["dn", "new_rdn"]),
+    "delete": (delete_object, ["dn"]),
+    "batch_modify": (batch_modify, ["dns", "template"]),
+}
+
+
+# --- Sortie ---
+def message_record(msg):
+    """
+    Entrée LDAP brute -> dictionnaire sérialisable (valeurs multiples en liste), typé selon
+    decode.SCHEMA : entiers, GUID et SID en texte, binaire en {"base64": ...}.
+    """
+    record = {"dn": str(msg.dn)}
+    for attr in msg.keys():
+        if attr.lower() == "dn":
+            continue
+        values = [json_value(attr, v) for v in msg[attr]]
+        record[attr] = values[0] if len(values) == 1 else values
+    return record
+
+class RecordWriter:
+    """Écrit les enregistrements au fil de l'eau en JSON Lines ou en CSV (en-tête tiré du premier)."""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+
+    def write(self, record):
+        record = dict(record)
+        if self.fmt == "jsonl":
+            self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            return
+        if self._csv is None:
+            self._csv = csv.DictWriter(self.stream, fieldnames=list(record), extrasaction="ignore")
+            self._csv.writeheader()
+        self._csv.writerow({k: "|".join(map(str, v)) if isinstance(v, list) else v for k, v in record.items()})
+
+
+# --- Lecture LDIF en flux ---
+def iter_ldif_records(stream):
+    """Découpe un flux LDIF en enregistrements (texte), sans lire tout le fichier."""
+    lines = []
+    for line in stream:
+        if line.strip():
+            if not line.startswith(("#", "version:")):
+                lines.append(line)
+            continue
+        if lines:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+def apply_ldif_record(conn, text):
+    """Applique un enregistrement LDIF (add, modify, delete, modrdn). Renvoie [(dn, opération)]."""
+    applied = []
+    for changetype, msg in conn.parse_ldif(text):
+        dn = str(msg.dn)
+        if changetype in (ldb.CHANGETYPE_NONE, ldb.CHANGETYPE_ADD):
+            conn.add(msg)
+            applied.append((dn, "add"))
+        elif changetype == ldb.CHANGETYPE_MODIFY:
+            conn.modify(msg)
+            applied.append((dn, "modify"))
+        elif changetype == ldb.CHANGETYPE_DELETE:
+            conn.delete(msg.dn)
+            applied.append((dn, "delete"))
+        elif changetype == ldb.CHANGETYPE_MODRDN:
+            # L'AD remplace toujours l'ancien RDN : deleteoldrdn: 0 ne peut pas être respecté
+            if "deleteoldrdn" in msg and to_text(msg["deleteoldrdn"][0]).strip() != "1":
+                raise ldb.LdbError(ldb.ERR_UNWILLING_TO_PERFORM,
+                                   f"{dn} : deleteoldrdn: 0 non pris en charge par l'Active Directory")
+            new_rdn = to_text(msg["newrdn"][0])
+            parent = to_text(msg["newsuperior"][0]) if "newsuperior" in msg else str(msg.dn.parent())
+            conn.rename(msg.dn, ldb.Dn(conn, f"{new_rdn},{parent}"))
+            applied.append((dn, "modrdn"))
+    return applied
+
+
+# --- Commandes ---
+def cmd_list(domain_info, args, out):
+    writer = RecordWriter(out, args.format)
+    count = 0
+    for page in iter_category_pages(domain_info["samdb"], domain_info["domain_dn"], args.category,
+                                    sort_attr=args.sort):
+        for record in page:
+            writer.write(record)
+            count += 1
+        out.flush()
+    return count, 0
+
+def cmd_search(domain_info, args, out):
+    writer = RecordWriter(out, args.format)
+    attrs = args.attrs.split(",") if args.attrs else None
+    count = 0
+    for page in iter_search_pages(domain_info["samdb"], args.base or domain_info["domain_dn"], args.filter, attrs,
+                                  sort_attr=args.sort):
+        for msg in page:
+            writer.write(message_record(msg))
+            count += 1
+        out.flush()
+    return count, 0
+
+def cmd_apply(domain_info, args, out):
+    """Applique un fichier LDIF (ou l'entrée standard) ; une ligne de résultat JSON par enregistrement."""
+    writer = RecordWriter(out, "jsonl")
+    stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    done = errors = 0
+    try:
+        with connection(domain_info["samdb"]) as conn:
+            for number, text in enumerate(iter_ldif_records(stream), 1):
+                try:
+                    for dn, operation in apply_ldif_record(conn, text):
+                        writer.write({"record": number, "dn": dn, "op": operation, "status": "OK"})
+                        done += 1
+                except ldb.LdbError as e:
+                    errors += 1
+                    writer.write({"record": number, "status": "ERROR", "message": str(e.args[-1] if e.args else e)})
+                    if args.stop_on_error:
+                        break
+                out.flush()
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return done, errors
+
+def cmd_run(domain_info, args, out):
+    """
+    Exécute les opérations lues en JSON Lines sur l'entrée standard (ou dans un fichier), ex. :
+      {"op": "create_user", "name": "jdoe", "password": "..."}
+      {"op": "move", "dn": "CN=PC1,CN=Computers,DC=...", "new_dn": "CN=PC1,OU=Postes,DC=..."}
+    Une ligne de résultat JSON est écrite par opération.
+    """
+    writer = RecordWriter(out, "jsonl")
+    stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    samdb = domain_info["samdb"]
+    done = errors = 0
+    try:
+        # Toutes les opérations utilisent la même connexion (voir main)
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("objet JSON attendu")
+                if not isinstance(request.get("op"), str):
+                    raise ValueError("champ 'op' (texte) attendu")
+                func, params = OPERATIONS[request["op"]]
+                values = [domain_info["domain_dn"] if p == "domain_dn" else request[p] for p in params]
+                message = func(samdb, *values)
+            except (ValueError, KeyError) as e:
+                message = f"[ERROR] Opération invalide : {e}"
+            ok = message.startswith("[OK]")
+            done += ok
+            errors += not ok
+            writer.write({"line": number, "op": request.get("op") if isinstance(request, dict) else None,
+                          "status": "OK" if ok else "ERROR", "message": message})
+            out.flush()
+            if not ok and args.stop_on_error:
+                break
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return done, errors
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Administration Samba AD sans interface (scripts, automatisation).")
+    parser.add_argument("--user", default=os.environ.get("SAMBA_AD_USER"),
+                        help="compte administrateur Samba AD (défaut : $SAMBA_AD_USER)")
+    parser.add_argument("--url", help="URL de l'annuaire (défaut : $SAMBA_AD_URL ou ldap://localhost)")
+    parser.add_argument("--metrics", help="exporter les mesures (durées LDAP...) à la fin : .json, sinon texte Prometheus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("list", help="lister une catégorie d'objets")
+    p.add_argument("category", choices=list(CATEGORIES))
+    p.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    p.add_argument("--sort", help="attribut de tri (tri effectué par le DC)")
+    p.set_defaults(func=cmd_list)
+
+    p = commands.add_parser("search", help="recherche LDAP paginée")
+    p.add_argument("filter", help="filtre LDAP, ex. (objectClass=user)")
+    p.add_argument("--base", help="base DN (défaut : domaine)")
+    p.add_argument("--attrs", help="attributs séparés par des virgules (défaut : tous)")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    p.add_argument("--sort", help="attribut de tri (tri effectué par le DC)")
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("apply", help="appliquer un fichier LDIF (add, modify, delete, modrdn)")
+    p.add_argument("--file", default="-", help="fichier LDIF (défaut : entrée standard)")
+    p.add_argument("--stop-on-error", action="store_true", help="s'arrêter à la première erreur")
+    p.set_defaults(func=cmd_apply)
+
+    p = commands.add_parser("run", help="exécuter des opérations JSON Lines (voir OPERATIONS)")
+    p.add_argument("--file", default="-", help="fichier d'opérations (défaut : entrée standard)")
+    p.add_argument("--stop-on-error", action="store_true", help="s'arrêter à la première erreur")
+    p.set_defaults(func=cmd_run)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.user:
+        print("[ERROR] Compte administrateur requis (--user ou $SAMBA_AD_USER).", file=sys.stderr)
+        return 2
+    admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+    # Une seule connexion authentifiée, partagée par toutes les opérations de la commande
+    domain_info = detect_domain_settings(args.user, admin_password, url=args.url, pool_size=1)
+    if isinstance(domain_info, str):
+        print(domain_info, file=sys.stderr)
+        return 1
+    try:
+        done, errors = args.func(domain_info, args, sys.stdout)
+    except BrokenPipeError:
+        # Sortie interrompue par le lecteur (ex. "| head") : ce n'est pas une erreur
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ldb.LdbError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            print(metrics.export(args.metrics), file=sys.stderr)
+    print(f"[OK] {done} élément(s) traité(s), {errors} erreur(s).", file=sys.stderr)
+    return 0 if errors == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
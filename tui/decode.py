@@ -0,0 +1,212 @@
+import base64
+import calendar
+import struct
+import time
+import uuid
+
+# --- Types d'attributs ---
+STRING = "texte"
+INTEGER = "entier"
+BOOLEAN = "booléen"
+SID = "SID"
+GUID = "GUID"
+FILETIME = "FILETIME"
+GENERALIZED_TIME = "date"
+BINARY = "binaire"
+
+# Les dates AD (lastLogonTimestamp, pwdLastSet...) sont des FILETIME : intervalles de 100 ns
+# depuis le 1er janvier 1601. Écart avec l'époque Unix, en intervalles de 100 ns :
+FILETIME_EPOCH_OFFSET = 116444736000000000
+FILETIME_PER_SECOND = 10000000
+# Valeur "jamais" de certains attributs FILETIME (accountExpires...)
+FILETIME_NEVER = 0x7FFFFFFFFFFFFFFF
+
+# Type des attributs (noms en minuscules) ; un attribut absent est du texte UTF-8,
+# affiché comme binaire s'il n'en est pas.
+SCHEMA = {
+    **dict.fromkeys(("objectguid", "schemaidguid", "attributesecurityguid", "invocationid", "msds-generationid"), GUID),
+    **dict.fromkeys(("objectsid", "securityidentifier", "sidhistory", "tokengroups", "creatorsid"), SID),
+    **dict.fromkeys(("lastlogontimestamp", "lastlogon", "lastlogoff", "pwdlastset", "accountexpires",
+                     "badpasswordtime", "lockouttime", "creationtime"), FILETIME),
+    **dict.fromkeys(("whencreated", "whenchanged", "dscorepropagationdata"), GENERALIZED_TIME),
+    **dict.fromkeys(("useraccountcontrol", "usnchanged", "usncreated", "logoncount", "badpwdcount",
+                     "primarygroupid", "samaccounttype", "grouptype", "instancetype", "systemflags",
+                     "admincount", "codepage", "countrycode", "msds-supportedencryptiontypes",
+                     "msds-keyversionnumber", "pwdhistorylength", "minpwdlength", "lockoutthreshold",
+                     "maxpwdage", "minpwdage", "lockoutduration", "lockoutobservationwindow",
+                     "versionnumber", "flags", "gpcfunctionalityversion", "highestcommittedusn",
+                     "msds-behavior-version", "ridnextrid"), INTEGER),
+    **dict.fromkeys(("isdeleted", "showinadvancedviewonly", "iscriticalsystemobject"), BOOLEAN),
+    **dict.fromkeys(("ntsecuritydescriptor", "thumbnailphoto", "jpegphoto", "usercertificate", "cacertificate",
+                     "logonhours", "replpropertymetadata", "replupdatevector", "repsfrom", "repsto", "dnsrecord",
+                     "unicodepwd", "supplementalcredentials", "ntpwdhistory", "lmpwdhistory", "dbcspwd",
+                     "msds-managedpasswordid", "msds-allowedtoactonbehalfofotheridentity", "objectsidhistory",
+                     "msds-revealedusers", "priorvalue", "currentvalue", "trustauthincoming",
+                     "trustauthoutgoing"), BINARY),
+}
+
+def attribute_type(attr):
+    """Type d'un attribut (les options "member;range=0-1499" sont ignorées)."""
+    return SCHEMA.get(attr.split(";", 1)[0].lower(), STRING)
+
+
+# --- Conversions (valeur brute -> valeur Python) ---
+def _raw(value):
+    # Les valeurs ldb sont des bytes ; une MessageElement "texte" ou une valeur déjà décodée est acceptée
+    if value.__class__ is bytes:
+        return value
+    if hasattr(value, "get_value"):
+        value = value.get_value()
+    return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+def to_text(value):
+    if value.__class__ is bytes:
+        return value.decode("utf-8", "replace")
+    return _raw(value).decode("utf-8", "replace")
+
+def to_int(value):
+    try:
+        return int(_raw(value))
+    except ValueError:
+        return 0
+
+def to_bool(value):
+    return _raw(value) == b"TRUE"
+
+def to_sid(value):
+    """SID binaire -> "S-1-5-21-..." (une valeur déjà textuelle est renvoyée telle quelle)."""
+    value = _raw(value)
+    if value[:2] == b"S-":
+        return value.decode("ascii", "replace")
+    if len(value) < 8 or len(value) != 8 + 4 * value[1]:
+        return value.hex()
+    authority = int.from_bytes(value[2:8], "big")
+    sub = struct.unpack_from(f"<{value[1]}I", value, 8)
+    return "-".join(["S", str(value[0]), str(authority)] + [str(s) for s in sub])
+
+def to_guid(value):
+    value = _raw(value)
+    if len(value) != 16:
+        return value.decode("ascii", "replace")
+    return str(uuid.UUID(bytes_le=value))
+
+def to_generalized(value):
+    return _raw(value).decode("ascii", "replace")
+
+def to_binary(value):
+    return _raw(value)
+
+CONVERTERS = {
+    STRING: to_text, INTEGER: to_int, BOOLEAN: to_bool, SID: to_sid, GUID: to_guid,
+    FILETIME: to_int, GENERALIZED_TIME: to_generalized, BINARY: to_binary,
+}
+# Valeur d'un attribut absent, par type
+DEFAULTS = {INTEGER: 0, FILETIME: 0, BOOLEAN: False, BINARY: b""}
+
+def converter(attr):
+    return CONVERTERS[attribute_type(attr)]
+
+
+# --- Dates ---
+def filetime_from_epoch(seconds):
+    return int(seconds * FILETIME_PER_SECOND) + FILETIME_EPOCH_OFFSET
+
+def epoch_from_filetime(filetime):
+    """Date Unix d'un FILETIME, ou None pour "jamais" (0 ou valeur maximale)."""
+    if filetime <= 0 or filetime >= FILETIME_NEVER:
+        return None
+    return (filetime - FILETIME_EPOCH_OFFSET) / FILETIME_PER_SECOND
+
+def epoch_from_generalized(value):
+    """Date Unix d'une date LDAP GeneralizedTime (ex. whenCreated "20240131120000.0Z"), None si illisible."""
+    try:
+        return calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S"))
+    except ValueError:
+        return None
+
+
+# --- Lecture des entrées ---
+def first_text(msg, attr, default=""):
+    """Première valeur de 'attr' en texte, ou 'default' si l'attribut est absent."""
+    value = msg.get(attr, idx=0)
+    if value is None:
+        return default
+    return value.decode("utf-8", "replace") if value.__class__ is bytes else to_text(value)
+
+def first_value(msg, attr, default=None):
+    """Première valeur de 'attr' convertie selon son type (voir SCHEMA)."""
+    value = msg.get(attr, idx=0)
+    if value is None:
+        return DEFAULTS.get(attribute_type(attr), "") if default is None else default
+    return converter(attr)(value)
+
+class Decoder:
+    """
+    Décodage précompilé des premières valeurs d'un jeu fixe d'attributs, en une passe :
+    le convertisseur de chaque attribut est choisi une fois pour toutes, chaque valeur est
+    lue sans créer de MessageElement (msg.get(attr, idx=0)) et les autres attributs de
+    l'entrée ne sont pas décodés.
+    """
+
+    def __init__(self, attrs, types=None):
+        types = types or {}
+        self.attrs = tuple(attrs)
+        self._plan = tuple((attr, CONVERTERS[types.get(attr) or attribute_type(attr)],
+                            DEFAULTS.get(types.get(attr) or attribute_type(attr), ""))
+                           for attr in self.attrs)
+
+    def values(self, msg):
+        """Liste des valeurs, dans l'ordre des attributs."""
+        get = msg.get
+        out = []
+        for attr, convert, default in self._plan:
+            value = get(attr, idx=0)
+            if value is None:
+                out.append(default)
+            elif convert is to_text and value.__class__ is bytes:
+                out.append(value.decode("utf-8", "replace"))
+            else:
+                out.append(convert(value))
+        return out
+
+
+# --- Affichage et sérialisation ---
+def display_text(attr, value):
+    """
+    Texte affichable d'une valeur d'attribut selon son type, ou None si la valeur est
+    binaire (le visualiseur propose alors un aperçu hexadécimal).
+    """
+    kind = attribute_type(attr)
+    if kind == BINARY:
+        return None
+    if kind in (SID, GUID):
+        return CONVERTERS[kind](value)
+    if kind == FILETIME:
+        filetime = to_int(value)
+        seconds = epoch_from_filetime(filetime)
+        if seconds is None:
+            return f"jamais ({filetime})"
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))} ({filetime})"
+    if kind == GENERALIZED_TIME:
+        text = to_generalized(value)
+        seconds = epoch_from_generalized(text)
+        return text if seconds is None else f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))} ({text})"
+    try:
+        text = _raw(value).decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if any(ord(c) < 32 and c not in "\r\n\t" for c in text):
+        return None
+    return text.replace("\r", "\\r").replace("\n", "\\n")
+
+def json_value(attr, value):
+    """Valeur sérialisable en JSON : typée selon SCHEMA, {"base64": ...} pour le binaire."""
+    kind = attribute_type(attr)
+    if kind == STRING:
+        try:
+            return _raw(value).decode("utf-8")
+        except UnicodeDecodeError:
+            kind = BINARY
+    if kind == BINARY:
+        return {"base64": base64.b64encode(_raw(value)).decode("ascii")}
+    return CONVERTERS[kind](value)
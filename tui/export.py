@@ -0,0 +1,331 @@
+import argparse
+import getpass
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import ldb
+from cli import message_record
+from decode import to_text
+from samba_ad import (
+    detect_domain_settings, connection, iter_search_pages, iter_attribute_values, parse_range_name, get_sync_point,
+)
+
+# Catégories exportées : filtre LDAP (classes disjointes : un objet n'est que dans une catégorie).
+# Les liens de GPO (gPLink, gPOptions) sont portés par les OU et l'objet domaine.
+EXPORT_KINDS = {
+    "users": "(&(objectClass=user)(!(objectClass=computer)))",
+    "groups": "(objectClass=group)",
+    "computers": "(objectClass=computer)",
+    "ous": "(|(objectClass=organizationalUnit)(objectClass=domain))",
+    "gpos": "(objectClass=groupPolicyContainer)",
+}
+# Classe d'objet caractéristique de chaque catégorie (comptage des entrées d'un fragment par OU)
+KIND_CLASSES = [("computers", "computer"), ("users", "user"), ("groups", "group"),
+                ("gpos", "grouppolicycontainer"), ("ous", "organizationalunit"), ("ous", "domain")]
+FORMATS = {"jsonl": ".jsonl", "ldif": ".ldif"}
+# Niveau de compression gzip : l'export est limité par le processeur bien avant le disque
+COMPRESS_LEVEL = 4
+MANIFEST_NAME = "manifest.json"
+# Version du format du manifeste
+MANIFEST_FORMAT = 1
+
+# Connexion propre à chaque processus de travail (initialisée par _init_worker)
+_worker_domain = None
+
+
+# --- Répartition du travail ---
+def _slug(text):
+    return re.sub(r"[^a-z0-9_.-]+", "-", text.lower()).strip("-") or "racine"
+
+def plan_shards(samdb, domain_dn, kinds, shard_by="class"):
+    """
+    Fragments de l'export : dictionnaires (name, base, scope, filter), exportés chacun dans
+    son propre fichier par un processus de travail.
+    - "class" : un fragment par catégorie de 'kinds', sur tout le domaine ;
+    - "ou" : un fragment par sous-arbre fils du domaine (OU, CN=Users...) plus l'objet domaine
+      lui-même, avec le filtre de toutes les catégories : les fragments ne se recouvrent pas.
+    """
+    expression = "(|" + "".join(EXPORT_KINDS[kind] for kind in kinds) + ")"
+    if shard_by == "class":
+        return [{"name": kind, "base": domain_dn, "scope": ldb.SCOPE_SUBTREE, "filter": EXPORT_KINDS[kind]}
+                for kind in kinds]
+    shards = [{"name": "domaine", "base": domain_dn, "scope": ldb.SCOPE_BASE, "filter": expression}]
+    names = {"domaine"}
+    children = samdb.search(base=domain_dn, scope=ldb.SCOPE_ONELEVEL, expression="(objectClass=*)", attrs=["objectClass"])
+    for msg in sorted(children, key=lambda m: str(m.dn).lower()):
+        dn = str(msg.dn)
+        name = base_name = _slug(dn.split(",", 1)[0].replace("=", "-"))
+        counter = 2
+        while name in names:
+            name, counter = f"{base_name}-{counter}", counter + 1
+        names.add(name)
+        shards.append({"name": name, "base": dn, "scope": ldb.SCOPE_SUBTREE, "filter": expression})
+    return shards
+
+def kind_of(msg):
+    """Catégorie d'export d'une entrée (d'après objectClass), "autres" si elle n'en a pas."""
+    classes = {to_text(value).lower() for value in msg.get("objectClass", [])}
+    for kind, cls in KIND_CLASSES:
+        if cls in classes:
+            return kind
+    return "autres"
+
+
+# --- Écriture en flux ---
+class HashingFile:
+    """Fichier binaire dont les octets écrits sont comptés et hachés (SHA-256) au fil de l'eau."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+def complete_ranged(samdb, msg):
+    """Remplace les attributs renvoyés par tranche ("member;range=0-1499") par toutes leurs valeurs."""
+    for name in list(msg.keys()):
+        attr, low, high = parse_range_name(name)
+        if low is None:
+            continue
+        values = list(msg[name])
+        if high is not None:
+            for page in iter_attribute_values(samdb, str(msg.dn), attr, start=high + 1):
+                values.extend(page)
+        del msg[name]
+        msg[attr] = ldb.MessageElement(values, 0, attr)
+
+def _shard_file(shard, fmt, compress):
+    return shard["name"] + FORMATS[fmt] + (".gz" if compress else "")
+
+def _export_shard(shard, directory, fmt, compress, level, page_size):
+    """
+    Exporte un fragment dans son fichier (processus de travail) : les pages reçues sont
+    écrites aussitôt, sans conserver les entrées. Le fichier n'apparaît sous son nom définitif
+    qu'une fois complet. Renvoie l'entrée du manifeste pour ce fragment.
+    """
+    entry = dict(shard, file=_shard_file(shard, fmt, compress))
+    if isinstance(_worker_domain, str):
+        return dict(entry, error=_worker_domain)
+    samdb = _worker_domain["samdb"]
+    path = os.path.join(directory, entry["file"])
+    started = time.perf_counter()
+    counts = {}
+    entries = 0
+    try:
+        with connection(samdb) as conn, open(path + ".part", "wb") as raw:
+            hashed = HashingFile(raw)
+            # mtime=0 : même contenu, même fichier (et même somme de contrôle)
+            out = gzip.GzipFile(fileobj=hashed, mode="wb", compresslevel=level, mtime=0) if compress else hashed
+            for page in iter_search_pages(conn, shard["base"], shard["filter"], ["*"], scope=shard["scope"],
+                                          page_size=page_size):
+                chunks = []
+                for msg in page:
+                    complete_ranged(conn, msg)
+                    if fmt == "ldif":
+                        chunks.append(conn.write_ldif(msg, ldb.CHANGETYPE_NONE))
+                    else:
+                        chunks.append(json.dumps(message_record(msg), ensure_ascii=False) + "\n")
+                    kind = kind_of(msg)
+                    counts[kind] = counts.get(kind, 0) + 1
+                entries += len(page)
+                out.write("".join(chunks).encode("utf-8"))
+            if compress:
+                out.close()
+        os.replace(path + ".part", path)
+    except Exception as e:
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        return dict(entry, error=f"[ERROR] Export du fragment {shard['name']} impossible : {e}")
+    return dict(entry, entries=entries, counts=counts, bytes=hashed.size, sha256=hashed.sha256.hexdigest(),
+                seconds=time.perf_counter() - started)
+
+def _init_worker(admin_user, admin_password, url):
+    """Ouvre la connexion authentifiée du processus de travail (une seule pour tous ses fragments)."""
+    global _worker_domain
+    _worker_domain = detect_domain_settings(admin_user, admin_password, url=url, pool_size=1, use_cache=True)
+
+
+# --- Orchestration ---
+def export_directory(domain_info, admin_user, admin_password, directory, kinds=None, fmt="jsonl", shard_by="class",
+                     workers=4, compress=True, level=COMPRESS_LEVEL, page_size=None, on_shard=None):
+    """
+    Exporte l'annuaire dans 'directory' : un fichier par fragment (voir plan_shards), produit
+    par 'workers' processus ayant chacun sa connexion, puis le manifeste (MANIFEST_NAME) avec
+    les nombres d'entrées et les sommes SHA-256 des fichiers. 'on_shard' est appelé avec
+    l'entrée du manifeste de chaque fragment terminé. Un fragment en échec (y compris l'arrêt
+    brutal de son processus) figure dans le manifeste avec son erreur, sans fichier partiel.
+    Renvoie le manifeste.
+    """
+    samdb, domain_dn = domain_info["samdb"], domain_info["domain_dn"]
+    kinds = list(kinds or EXPORT_KINDS)
+    os.makedirs(directory, exist_ok=True)
+    started = time.time()
+    # Point de synchronisation relevé avant l'export : tout changement ultérieur a un USN supérieur
+    usn, server = get_sync_point(samdb)
+    shards = plan_shards(samdb, domain_dn, kinds, shard_by)
+    results = []
+
+    def done(shard, result=None, error=None):
+        if result is None:
+            result = dict(shard, file=_shard_file(shard, fmt, compress),
+                          error=f"[ERROR] Export du fragment {shard['name']} impossible : {error}")
+        results.append(result)
+        if on_shard:
+            on_shard(result)
+
+    def run(shards, workers):
+        """Exporte 'shards' ; renvoie ceux interrompus par l'arrêt brutal d'un processus."""
+        broken = []
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(shards))), initializer=_init_worker,
+                                 initargs=(admin_user, admin_password, domain_info.get("url"))) as pool:
+            futures = {pool.submit(_export_shard, shard, directory, fmt, compress, level, page_size): shard
+                       for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    done(futures[future], future.result())
+                except BrokenProcessPool:
+                    broken.append(futures[future])
+                except Exception as e:
+                    done(futures[future], error=e)
+        return broken
+
+    # L'arrêt d'un processus interrompt tous les fragments en cours : chacun est relancé seul,
+    # dans son propre processus, pour que seul le fragment fautif reste en échec
+    for shard in run(shards, workers):
+        if run([shard], 1):
+            done(shard, error="processus de travail arrêté brutalement")
+    # Fichiers partiels laissés par un processus arrêté en cours de fragment
+    for result in results:
+        if "error" in result:
+            for name in (result["file"], result["file"] + ".part"):
+                if os.path.exists(os.path.join(directory, name)):
+                    os.remove(os.path.join(directory, name))
+    results.sort(key=lambda r: r["name"])
+    totals = {"entries": 0, "bytes": 0, "counts": {}}
+    for result in results:
+        totals["entries"] += result.get("entries", 0)
+        totals["bytes"] += result.get("bytes", 0)
+        for kind, count in result.get("counts", {}).items():
+            totals["counts"][kind] = totals["counts"].get(kind, 0) + count
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "domain_dn": domain_dn,
+        "url": domain_info.get("url"),
+        "server": server,
+        "highestCommittedUSN": usn,
+        "started": started,
+        "finished": time.time(),
+        "output_format": fmt,
+        "compression": "gzip" if compress else None,
+        "shard_by": shard_by,
+        "kinds": {kind: EXPORT_KINDS[kind] for kind in kinds},
+        "shards": results,
+        "totals": totals,
+        "errors": sum(1 for r in results if "error" in r),
+    }
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+def verify_export(directory):
+    """Recalcule taille et somme SHA-256 de chaque fichier du manifeste. Renvoie la liste des erreurs."""
+    with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    errors = []
+    for shard in manifest["shards"]:
+        if "error" in shard:
+            errors.append(f"{shard['file']} : fragment en erreur lors de l'export")
+            continue
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(os.path.join(directory, shard["file"]), "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(block)
+                    size += len(block)
+        except OSError as e:
+            errors.append(f"{shard['file']} : {e}")
+            continue
+        if size != shard["bytes"] or sha256.hexdigest() != shard["sha256"]:
+            errors.append(f"{shard['file']} : somme de contrôle différente du manifeste")
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export parallèle de l'annuaire Samba AD (LDIF ou JSON Lines compressés).")
+    parser.add_argument("--user", default=os.environ.get("SAMBA_AD_USER"),
+                        help="compte administrateur Samba AD (défaut : $SAMBA_AD_USER)")
+    parser.add_argument("--url", help="URL de l'annuaire (défaut : $SAMBA_AD_URL ou ldap://localhost)")
+    parser.add_argument("--output", help="répertoire de l'export (défaut : export-<date>)")
+    parser.add_argument("--format", choices=list(FORMATS), default="jsonl")
+    parser.add_argument("--shard", choices=["class", "ou"], default="class",
+                        help="répartition : une catégorie par fragment, ou un sous-arbre du domaine par fragment")
+    parser.add_argument("--kinds", default=",".join(EXPORT_KINDS),
+                        help=f"catégories exportées, séparées par des virgules ({', '.join(EXPORT_KINDS)})")
+    parser.add_argument("--workers", type=int, default=4, help="nombre de connexions parallèles")
+    parser.add_argument("--no-compress", action="store_true", help="fichiers non compressés")
+    parser.add_argument("--level", type=int, default=COMPRESS_LEVEL, help="niveau de compression gzip (1-9)")
+    parser.add_argument("--page-size", type=int, help="entrées par page de recherche")
+    parser.add_argument("--verify", metavar="DIR", help="vérifier les sommes de contrôle d'un export existant")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        try:
+            errors = verify_export(args.verify)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] Manifeste illisible : {e}", file=sys.stderr)
+            return 1
+        for error in errors:
+            print(f"[ERROR] {error}")
+        print("[OK] Export intact." if not errors else f"[ERROR] {len(errors)} fichier(s) invalide(s).")
+        return 0 if not errors else 1
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in EXPORT_KINDS]
+    if unknown or not kinds:
+        print(f"[ERROR] Catégorie(s) inconnue(s) : {', '.join(unknown) or '(aucune)'}", file=sys.stderr)
+        return 2
+    if not args.user:
+        print("[ERROR] Compte administrateur requis (--user ou $SAMBA_AD_USER).", file=sys.stderr)
+        return 2
+    admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+    domain_info = detect_domain_settings(args.user, admin_password, url=args.url, pool_size=1)
+    if isinstance(domain_info, str):
+        print(domain_info, file=sys.stderr)
+        return 1
+
+    directory = args.output or time.strftime("export-%Y%m%d-%H%M%S")
+
+    def on_shard(result):
+        if "error" in result:
+            print(result["error"])
+        else:
+            print(f"[OK] {result['file']} : {result['entries']} entrées en {result['seconds']:.1f} s")
+
+    manifest = export_directory(domain_info, args.user, admin_password, directory, kinds, args.format, args.shard,
+                                args.workers, not args.no_compress, args.level, args.page_size, on_shard)
+    totals = manifest["totals"]
+    counts = ", ".join(f"{kind}: {count}" for kind, count in sorted(totals["counts"].items()))
+    elapsed = manifest["finished"] - manifest["started"]
+    print(f"[OK] {totals['entries']} entrées ({counts}) exportées dans {directory} en {elapsed:.1f} s.")
+    if manifest["errors"]:
+        print(f"[ERROR] {manifest['errors']} fragment(s) en échec, marqué(s) dans {MANIFEST_NAME} : export incomplet.")
+    return 0 if not manifest["errors"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
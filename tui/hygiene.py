@@ -0,0 +1,224 @@
+import argparse
+import csv
+import getpass
+import os
+import sys
+import time
+from array import array
+
+from samba_ad import detect_domain_settings, iter_search_pages
+from decode import Decoder, filetime_from_epoch, epoch_from_filetime, epoch_from_generalized
+
+# Seuil d'inactivité par défaut (jours)
+DEFAULT_DAYS = 90
+# Bits de userAccountControl
+UF_ACCOUNTDISABLE = 0x2
+UF_WORKSTATION_TRUST_ACCOUNT = 0x1000
+UF_SERVER_TRUST_ACCOUNT = 0x2000
+UF_DONT_EXPIRE_PASSWD = 0x10000
+# Règle LDAP de comparaison bit à bit (LDAP_MATCHING_RULE_BIT_AND)
+BIT_AND = "1.2.840.113556.1.4.803"
+
+ACCOUNT_ATTRS = ["sAMAccountName", "lastLogonTimestamp", "pwdLastSet", "userAccountControl", "whenCreated"]
+_ACCOUNT_DECODER = Decoder(ACCOUNT_ATTRS)
+
+# Rapports disponibles : clé -> libellé
+REPORTS = {
+    "stale": "Inactifs",
+    "never": "Jamais connectés",
+    "disabled": "Désactivés",
+    "noexpire": "Mot de passe sans expiration",
+    "all": "Tous les comptes signalés",
+}
+# Tris disponibles : clé -> (libellé, colonne de AccountTable)
+SORTS = {
+    "logon": ("dernière connexion", "last_logon"),
+    "password": ("mot de passe", "pwd_last_set"),
+    "created": ("création", "created"),
+    "name": ("nom", "names"),
+}
+CSV_COLUMNS = ["sAMAccountName", "type", "état", "lastLogonTimestamp", "jours sans connexion",
+               "pwdLastSet", "âge du mot de passe (jours)", "whenCreated", "dn"]
+
+
+# --- Conversion des dates (FILETIME : voir decode) ---
+def filetime_from_generalized(value):
+    """FILETIME d'une date LDAP GeneralizedTime (ex. whenCreated "20240131120000.0Z"), 0 si illisible."""
+    seconds = epoch_from_generalized(value)
+    return filetime_from_epoch(seconds) if seconds is not None else 0
+
+def generalized_from_epoch(seconds):
+    return time.strftime("%Y%m%d%H%M%S.0Z", time.gmtime(seconds))
+
+
+# --- Collecte ---
+class AccountTable:
+    """
+    Comptes (utilisateurs et ordinateurs) stockés par colonnes : les dates restent des
+    entiers FILETIME dans des tableaux compacts (array('q')), comparés directement à un
+    seuil FILETIME calculé une seule fois, sans conversion de date par compte.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold  # FILETIME en deçà duquel une date est "ancienne"
+        self.names = []
+        self.dns = []
+        self.uac = array("q")
+        self.last_logon = array("q")
+        self.pwd_last_set = array("q")
+        self.created = array("q")
+
+    def __len__(self):
+        return len(self.dns)
+
+    def add(self, msg):
+        name, last_logon, pwd_last_set, uac, created = _ACCOUNT_DECODER.values(msg)
+        self.names.append(name)
+        self.dns.append(str(msg.dn))
+        self.uac.append(uac)
+        self.last_logon.append(last_logon)
+        self.pwd_last_set.append(pwd_last_set)
+        self.created.append(filetime_from_generalized(created))
+
+    def select(self, report):
+        """Indices des comptes du rapport 'report' (voir REPORTS)."""
+        threshold = self.threshold
+        rows = zip(self.uac, self.last_logon, self.created)
+        if report == "stale":
+            # lastLogonTimestamp n'est répliqué que tous les 9 à 14 jours : le seuil doit rester large
+            return [i for i, (uac, last, _) in enumerate(rows)
+                    if not uac & UF_ACCOUNTDISABLE and 0 < last < threshold]
+        if report == "never":
+            # Les comptes créés depuis moins longtemps que le seuil ne sont pas signalés
+            return [i for i, (_, last, created) in enumerate(rows) if last == 0 and 0 < created < threshold]
+        if report == "disabled":
+            return [i for i, (uac, _, _) in enumerate(rows) if uac & UF_ACCOUNTDISABLE]
+        if report == "noexpire":
+            return [i for i, (uac, _, _) in enumerate(rows)
+                    if uac & UF_DONT_EXPIRE_PASSWD and not uac & UF_ACCOUNTDISABLE]
+        if report == "all":
+            return [i for i, (uac, last, created) in enumerate(rows)
+                    if uac & (UF_ACCOUNTDISABLE | UF_DONT_EXPIRE_PASSWD) or 0 < last < threshold
+                    or (last == 0 and 0 < created < threshold)]
+        raise ValueError(f"Rapport inconnu : {report}")
+
+    def sort(self, indices, key="logon"):
+        """Trie des indices selon une colonne de SORTS (dates : les plus anciennes d'abord)."""
+        column = getattr(self, SORTS[key][1])
+        if key == "name":
+            return sorted(indices, key=lambda i: column[i].lower())
+        return sorted(indices, key=column.__getitem__)
+
+    def counts(self):
+        return {report: len(self.select(report)) for report in REPORTS}
+
+    def kind(self, index):
+        if self.uac[index] & (UF_WORKSTATION_TRUST_ACCOUNT | UF_SERVER_TRUST_ACCOUNT):
+            return "ordinateur"
+        return "utilisateur"
+
+    def row(self, index, now=None):
+        """Ligne de rapport (affichage et export CSV) du compte 'index'."""
+        now = now or time.time()
+        uac = self.uac[index]
+        state = "désactivé" if uac & UF_ACCOUNTDISABLE else "actif"
+        if uac & UF_DONT_EXPIRE_PASSWD:
+            state += ", mot de passe sans expiration"
+        last = epoch_from_filetime(self.last_logon[index])
+        pwd = epoch_from_filetime(self.pwd_last_set[index])
+        created = epoch_from_filetime(self.created[index])
+        return {
+            "sAMAccountName": self.names[index],
+            "type": self.kind(index),
+            "état": state,
+            "lastLogonTimestamp": _format_date(last),
+            "jours sans connexion": _days_since(last, now),
+            "pwdLastSet": _format_date(pwd),
+            "âge du mot de passe (jours)": _days_since(pwd, now),
+            "whenCreated": _format_date(created),
+            "dn": self.dns[index],
+        }
+
+    def report(self, report, sort="logon", now=None):
+        return [self.row(i, now) for i in self.sort(self.select(report), sort)]
+
+def _format_date(seconds):
+    return time.strftime("%Y-%m-%d", time.localtime(seconds)) if seconds is not None else "jamais"
+
+def _days_since(seconds, now):
+    return int((now - seconds) // 86400) if seconds is not None else ""
+
+def account_filter(threshold):
+    """
+    Filtre LDAP des comptes susceptibles d'apparaître dans un rapport : le DC ne renvoie que
+    les comptes inactifs, jamais connectés, désactivés ou dont le mot de passe n'expire pas.
+    """
+    return ("(&(objectClass=user)(|"
+            f"(lastLogonTimestamp<={threshold})(!(lastLogonTimestamp=*))"
+            f"(userAccountControl:{BIT_AND}:={UF_ACCOUNTDISABLE})"
+            f"(userAccountControl:{BIT_AND}:={UF_DONT_EXPIRE_PASSWD})))")
+
+def fetch_accounts(samdb, domain_dn, days=DEFAULT_DAYS, now=None, page_size=None, cancelled=None):
+    """
+    Lit en une recherche paginée les comptes à signaler (voir account_filter) avec les seuls
+    attributs utiles aux rapports. Renvoie une AccountTable, ou un message "[ERROR] ...".
+    'cancelled' (facultatif) est consulté entre deux pages.
+    """
+    try:
+        now = now or time.time()
+        table = AccountTable(filetime_from_epoch(now - days * 86400))
+        for page in iter_search_pages(samdb, domain_dn, account_filter(table.threshold), ACCOUNT_ATTRS,
+                                      page_size=page_size):
+            for msg in page:
+                table.add(msg)
+            if cancelled and cancelled():
+                return "[ERROR] Analyse annulée."
+        return table
+    except Exception as e:
+        return f"[ERROR] Analyse des comptes impossible : {e}"
+
+def write_csv(path, rows):
+    """Exporte des lignes de rapport (AccountTable.report) en CSV."""
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return f"[OK] {len(rows)} compte(s) exporté(s) dans {path}."
+    except OSError as e:
+        return f"[ERROR] Export CSV impossible : {e}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapport d'hygiène des comptes Samba AD (comptes inactifs, désactivés...).")
+    parser.add_argument("--user", required=True, help="compte administrateur Samba AD")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="seuil d'inactivité en jours")
+    parser.add_argument("--report", choices=list(REPORTS), default="stale", help="rapport à produire")
+    parser.add_argument("--sort", choices=list(SORTS), default="logon", help="ordre des comptes")
+    parser.add_argument("--csv", help="fichier CSV de sortie (sinon affichage)")
+    args = parser.parse_args(argv)
+
+    admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+    domain_info = detect_domain_settings(args.user, admin_password)
+    if isinstance(domain_info, str):
+        print(domain_info)
+        return 1
+
+    started = time.perf_counter()
+    table = fetch_accounts(domain_info["samdb"], domain_info["domain_dn"], args.days)
+    if isinstance(table, str):
+        print(table)
+        return 1
+    counts = ", ".join(f"{REPORTS[report]} : {count}" for report, count in table.counts().items())
+    print(f"[OK] {len(table)} compte(s) analysé(s) en {time.perf_counter() - started:.1f} s ({counts}).")
+    rows = table.report(args.report, args.sort)
+    if args.csv:
+        message = write_csv(args.csv, rows)
+        print(message)
+        return 0 if message.startswith("[OK]") else 1
+    for row in rows:
+        print(f"{row['sAMAccountName']:<24} {row['type']:<12} {row['lastLogonTimestamp']:<10} "
+              f"{row['pwdLastSet']:<10} {row['état']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
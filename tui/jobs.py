@@ -0,0 +1,126 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche qui constate qu'on lui a demandé de s'arrêter."""
+
+
+class Job:
+    """
+    Opération d'annuaire exécutée en arrière-plan.
+    La tâche peut publier sa progression (report), un résultat partiel (partial)
+    et doit consulter cancelled()/check_cancelled() pour s'interrompre proprement.
+    """
+
+    def __init__(self, label, func, args, kwargs, on_done, with_job):
+        self.label = label
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.with_job = with_job
+        self.state = "en attente"
+        self.progress = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self.future = None
+
+    def report(self, progress):
+        self.progress = progress
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.state = "annulé"
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def outcome(self):
+        """Message à afficher une fois la tâche terminée."""
+        if self.state == "annulé":
+            return f"{self.label} : annulé."
+        if self.error is not None:
+            return f"[ERROR] {self.label} : {self.error}"
+        return self.result if isinstance(self.result, str) else f"[OK] {self.label} terminé."
+
+    def _run(self):
+        if self._cancel.is_set():
+            self.state = "annulé"
+            return
+        self.state = "en cours"
+        try:
+            if self.with_job:
+                self.result = self.func(*self.args, job=self, **self.kwargs)
+            else:
+                self.result = self.func(*self.args, **self.kwargs)
+            self.state = "annulé" if self._cancel.is_set() else "terminé"
+        except JobCancelled:
+            self.state = "annulé"
+        except Exception as e:
+            self.error = e
+            self.state = "erreur"
+
+
+class JobQueue:
+    """
+    File d'opérations exécutées hors du thread curses.
+    Un seul thread de travail par défaut : une instance SamDB ne doit pas être utilisée
+    par deux threads à la fois, les opérations sont donc exécutées dans l'ordre de soumission.
+    Les rappels 'on_done' sont exécutés dans le thread de l'interface, lors de poll().
+    """
+
+    def __init__(self, workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="samba-ad-job")
+        self._finished = queue.Queue()
+        self._jobs = []
+
+    def submit(self, label, func, *args, on_done=None, with_job=False, **kwargs):
+        """
+        Met en file func(*args, **kwargs) ; avec with_job=True la tâche reçoit aussi
+        son objet Job (argument nommé 'job') pour publier sa progression.
+        """
+        job = Job(label, func, args, kwargs, on_done, with_job)
+        self._jobs.append(job)
+        job.future = self._executor.submit(job._run)
+        job.future.add_done_callback(lambda _future: self._finished.put(job))
+        return job
+
+    def poll(self):
+        """Traite les tâches terminées (à appeler régulièrement depuis la boucle de l'interface)."""
+        done = []
+        while True:
+            try:
+                job = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            if job in self._jobs:
+                self._jobs.remove(job)
+            if job.future.cancelled():
+                job.state = "annulé"
+            done.append(job)
+            if job.on_done:
+                job.on_done(job)
+        return done
+
+    def active(self):
+        """Tâches en attente ou en cours, dans l'ordre d'exécution."""
+        return list(self._jobs)
+
+    def cancel_all(self):
+        for job in self._jobs:
+            job.cancel()
+        return len(self._jobs)
+
+    def shutdown(self):
+        """Annule les tâches en attente et attend la fin de la tâche en cours."""
+        self.cancel_all()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,275 @@
+import re
+import time
+from array import array
+
+
+def _dn_key(dn):
+    """Normalise un DN (ldb.Dn, chaîne ou octets) pour servir de clé."""
+    if isinstance(dn, bytes):
+        dn = dn.decode("utf-8", errors="replace")
+    return str(dn).lower()
+
+def _rdns(dn):
+    """Composantes (RDN) d'un DN, en tenant compte des virgules échappées."""
+    return re.split(r"(?<!\\),", str(dn)) if str(dn) else []
+
+
+class MembershipGraph:
+    """
+    Graphe des appartenances aux groupes (attribut 'member'), interrogé en mémoire.
+    - Chaque DN rencontré (groupe ou membre) reçoit un indice entier ; les membres directs
+      de chaque groupe sont stockés dans un tableau compact d'indices (array('I')).
+    - L'index inverse (groupes directs d'un objet) est construit au chargement puis tenu à jour.
+    - Les appartenances par groupe principal (primaryGroupID, ex. "Domain Users")
+      n'apparaissent pas dans 'member' et ne sont donc pas représentées.
+    Les méthodes de mise à jour (set_members, remove_node, rename_node) sont sans effet
+    tant que le graphe n'a pas été chargé (voir samba_ad.load_membership).
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.dns = []          # indice -> DN (None si l'objet a été supprimé)
+        self.ids = {}          # DN normalisé -> indice
+        self.members = {}      # indice de groupe -> array('I') des membres directs
+        self._parents = None   # indice -> array('I') des groupes directs
+        self._cycles = None
+        self.version = 0
+        self.loaded = False
+        self.loaded_at = None
+
+    # --- Construction ---
+    def _id(self, dn):
+        key = _dn_key(dn)
+        index = self.ids.get(key)
+        if index is None:
+            index = len(self.dns)
+            self.ids[key] = index
+            self.dns.append(dn.decode("utf-8", errors="replace") if isinstance(dn, bytes) else str(dn))
+        return index
+
+    def _set_members(self, group_dn, member_dns):
+        group = self._id(group_dn)
+        new = array("I", sorted({self._id(dn) for dn in member_dns}))
+        old = self.members.get(group, array("I"))
+        self.members[group] = new
+        if self._parents is not None:
+            old_set, new_set = set(old), set(new)
+            for member in old_set - new_set:
+                parents = self._parents.get(member)
+                if parents is not None and group in parents:
+                    parents.remove(group)
+            for member in new_set - old_set:
+                self._parents.setdefault(member, array("I")).append(group)
+        self._cycles = None
+        self.version += 1
+
+    def load(self, groups):
+        """Remplace le graphe par les couples (DN du groupe, DN des membres directs) de 'groups'."""
+        self.clear()
+        for group_dn, member_dns in groups:
+            self._set_members(group_dn, member_dns)
+        self._parent_index()
+        self.loaded = True
+        self.loaded_at = time.time()
+
+    def _parent_index(self):
+        if self._parents is None:
+            parents = {}
+            for group, members in self.members.items():
+                for member in members:
+                    parents.setdefault(member, array("I")).append(group)
+            self._parents = parents
+        return self._parents
+
+    # --- Mises à jour incrémentales (écritures faites depuis la TUI) ---
+    def set_members(self, group_dn, member_dns):
+        """Remplace les membres directs d'un groupe (modification de 'member')."""
+        if self.loaded:
+            self._set_members(group_dn, member_dns)
+
+    def add_members(self, group_dn, member_dns):
+        if self.loaded:
+            self._set_members(group_dn, self.direct_members(group_dn) + list(member_dns))
+
+    def remove_members(self, group_dn, member_dns):
+        if self.loaded:
+            removed = {_dn_key(dn) for dn in member_dns}
+            self._set_members(group_dn, [dn for dn in self.direct_members(group_dn) if _dn_key(dn) not in removed])
+
+    def _subtree(self, dn):
+        """Indices de l'objet 'dn' et de ses descendants."""
+        key = _dn_key(dn)
+        suffix = "," + key
+        return [index for k, index in self.ids.items() if k == key or k.endswith(suffix)]
+
+    def remove_node(self, dn):
+        """Retire un objet supprimé (et ses descendants) du graphe et des groupes qui le contenaient."""
+        if not self.loaded:
+            return
+        parents = self._parent_index()
+        for index in self._subtree(dn):
+            for group in parents.pop(index, ()):
+                if group in self.members:
+                    self.members[group] = array("I", (m for m in self.members[group] if m != index))
+            for member in self.members.pop(index, ()):
+                if member in parents and index in parents[member]:
+                    parents[member].remove(index)
+            del self.ids[_dn_key(self.dns[index])]
+            self.dns[index] = None
+        self._cycles = None
+        self.version += 1
+
+    def rename_node(self, old_dn, new_dn):
+        """
+        Renomme ou déplace un objet (et ses descendants) sans changer ses appartenances.
+        'new_dn' est un DN complet, ou un RDN seul (ex. "CN=nouveau_nom") pour un renommage
+        sur place.
+        """
+        if not self.loaded:
+            return
+        index = self.ids.get(_dn_key(old_dn))
+        old_rdns = _rdns(self.dns[index] if index is not None else old_dn)
+        new_rdns = _rdns(new_dn)
+        if len(new_rdns) == 1:
+            new_rdns += old_rdns[1:]
+        new_dn = ",".join(new_rdns)
+        for index in self._subtree(old_dn):
+            dn = self.dns[index]
+            # Seules les composantes propres au descendant sont conservées (casse d'origine)
+            rdns = _rdns(dn)
+            renamed = ",".join(rdns[:len(rdns) - len(old_rdns)] + [new_dn])
+            del self.ids[_dn_key(dn)]
+            self.ids[_dn_key(renamed)] = index
+            self.dns[index] = renamed
+        self.version += 1
+
+    # --- Requêtes ---
+    def is_group(self, dn):
+        return self.ids.get(_dn_key(dn)) in self.members
+
+    def direct_members(self, group_dn):
+        index = self.ids.get(_dn_key(group_dn))
+        return [self.dns[m] for m in self.members.get(index, ())]
+
+    def direct_groups(self, dn):
+        index = self.ids.get(_dn_key(dn))
+        return [self.dns[g] for g in self._parent_index().get(index, ())]
+
+    def _closure(self, start, adjacency):
+        """Indices atteignables depuis 'start' (exclu, sauf s'il fait partie d'un cycle)."""
+        seen = bytearray(len(self.dns))
+        stack = list(adjacency.get(start, ()))
+        found = []
+        while stack:
+            index = stack.pop()
+            if seen[index]:
+                continue
+            seen[index] = 1
+            found.append(index)
+            stack.extend(adjacency.get(index, ()))
+        return found
+
+    def effective_members(self, group_dn, groups_only=False):
+        """Membres directs et indirects (via les groupes imbriqués) d'un groupe."""
+        index = self.ids.get(_dn_key(group_dn))
+        if index is None:
+            return []
+        found = self._closure(index, self.members)
+        if groups_only:
+            found = [i for i in found if i in self.members]
+        return sorted((self.dns[i] for i in found), key=str.lower)
+
+    def member_of(self, dn):
+        """Groupes dont l'objet est membre, directement ou par imbrication."""
+        index = self.ids.get(_dn_key(dn))
+        if index is None:
+            return []
+        return sorted((self.dns[i] for i in self._closure(index, self._parent_index())), key=str.lower)
+
+    def is_member(self, dn, group_dn):
+        """Vrai si 'dn' est membre (direct ou indirect) de 'group_dn' ; s'arrête dès qu'il est trouvé."""
+        index, target = self.ids.get(_dn_key(dn)), self.ids.get(_dn_key(group_dn))
+        if index is None or target is None:
+            return False
+        parents = self._parent_index()
+        seen = bytearray(len(self.dns))
+        stack = list(parents.get(index, ()))
+        while stack:
+            group = stack.pop()
+            if group == target:
+                return True
+            if not seen[group]:
+                seen[group] = 1
+                stack.extend(parents.get(group, ()))
+        return False
+
+    def cycles(self):
+        """
+        Groupes imbriqués les uns dans les autres de façon circulaire : composantes fortement
+        connexes (algorithme de Tarjan, itératif) de plus d'un groupe ou groupe membre de lui-même.
+        Le résultat est conservé jusqu'à la prochaine modification du graphe.
+        """
+        if self._cycles is not None:
+            return self._cycles
+        order = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        cycles = []
+        for root in self.members:
+            if root in order:
+                continue
+            work = [(root, iter(self.members[root]))]
+            order[root] = low[root] = len(order)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in self.members:
+                        continue
+                    if child not in order:
+                        order[child] = low[child] = len(order)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.members[child])))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], order[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == order[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.members[node]:
+                            cycles.append(sorted((self.dns[i] for i in component), key=str.lower))
+        self._cycles = cycles
+        return cycles
+
+    def describe(self, dn):
+        """Appartenances d'un objet, regroupées par libellé (affichage dans la TUI)."""
+        view = {}
+        if self.is_group(dn):
+            view["Membres directs"] = self.direct_members(dn)
+            view["Membres effectifs"] = self.effective_members(dn)
+            key = _dn_key(dn)
+            for number, cycle in enumerate(self.cycles(), 1):
+                if any(_dn_key(group) == key for group in cycle):
+                    view[f"Cycle d'imbrication {number}"] = cycle
+        view["Groupes directs"] = self.direct_groups(dn)
+        view["Groupes (imbrication comprise)"] = self.member_of(dn)
+        return view
+
+    def stats(self):
+        edges = sum(len(members) for members in self.members.values())
+        return {"groupes": len(self.members), "objets": len(self.ids), "appartenances": edges}
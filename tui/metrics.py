@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes supérieures (secondes) des intervalles des histogrammes de durée (comme Prometheus)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Opérations SamDB mesurées (voir instrumented)
+LDAP_OPERATIONS = ("search", "add", "modify", "delete", "rename")
+# Préfixe des métriques exportées au format Prometheus
+PROMETHEUS_PREFIX = "samba_ad_tui"
+# Nombre d'entrées d'un résultat de recherche dont la taille est mesurée (estimation des octets)
+BYTES_SAMPLE = 32
+
+
+# --- Histogrammes ---
+class Histogram:
+    """Durées observées réparties par intervalles fixes (LATENCY_BUCKETS), avec compteurs associés."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier intervalle : au-delà de la dernière borne
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.entries = 0
+        self.bytes = 0
+
+    def observe(self, seconds, entries=0, nbytes=0):
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.entries += entries
+        self.bytes += nbytes
+
+    def quantile(self, q):
+        """Estimation du quantile 'q' (0..1) : borne supérieure de l'intervalle qui le contient."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+# --- Registre ---
+class Metrics:
+    """
+    Mesures regroupées par famille ("ldap", "décodage", "affichage") et par nom (opération,
+    catégorie, fonction). Utilisable depuis plusieurs threads (tâches de fond et interface).
+    'enabled' à False rend toutes les mesures inopérantes.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("SAMBA_AD_METRICS", "1") != "0"
+        self.started = time.time()
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family, name, seconds, entries=0, nbytes=0):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._series.get((family, name))
+            if histogram is None:
+                histogram = self._series[(family, name)] = Histogram()
+            histogram.observe(seconds, entries, nbytes)
+
+    @contextmanager
+    def timed(self, family, name, entries=0):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(family, name, time.perf_counter() - started, entries)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started = time.time()
+
+    def series(self):
+        """Copie des mesures : [(famille, nom, Histogram)] triée par famille puis par nom."""
+        with self._lock:
+            items = sorted(self._series.items())
+            copies = []
+            for (family, name), histogram in items:
+                copy = Histogram(histogram.buckets)
+                copy.__dict__.update(histogram.__dict__, counts=list(histogram.counts))
+                copies.append((family, name, copy))
+        return copies
+
+    def rows(self):
+        """Lignes du panneau de la TUI : (série, nombre, moyenne, p95, max en ms, entrées, octets)."""
+        return [(f"{family}/{name}", h.count, h.sum / h.count * 1000, h.quantile(0.95) * 1000,
+                 h.max * 1000, h.entries, h.bytes)
+                for family, name, h in self.series() if h.count]
+
+    # --- Export ---
+    def to_prometheus(self):
+        """Format texte Prometheus (collecteur "textfile" de node_exporter, passerelle...)."""
+        p = PROMETHEUS_PREFIX
+        lines = [f"# HELP {p}_duration_seconds Durée des opérations (LDAP, décodage, affichage).",
+                 f"# TYPE {p}_duration_seconds histogram"]
+        totals = []
+        for family, name, h in self.series():
+            labels = f'family="{_label(family)}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f'{p}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{p}_duration_seconds_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{p}_duration_seconds_count{{{labels}}} {h.count}")
+            totals.append((labels, h))
+        lines += [f"# HELP {p}_entries_total Entrées renvoyées ou traitées.", f"# TYPE {p}_entries_total counter"]
+        lines += [f"{p}_entries_total{{{labels}}} {h.entries}" for labels, h in totals]
+        lines += [f"# HELP {p}_bytes_total Octets de valeurs d'attributs reçus (estimation).", f"# TYPE {p}_bytes_total counter"]
+        lines += [f"{p}_bytes_total{{{labels}}} {h.bytes}" for labels, h in totals]
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        return json.dumps({
+            "started": self.started,
+            "exported": time.time(),
+            "buckets": list(LATENCY_BUCKETS),
+            "series": [{"family": family, "name": name, "count": h.count, "sum": h.sum, "max": h.max,
+                        "p50": h.quantile(0.5), "p95": h.quantile(0.95), "entries": h.entries, "bytes": h.bytes,
+                        "counts": h.counts}
+                       for family, name, h in self.series()],
+        }, ensure_ascii=False, indent=1)
+
+    def export(self, path):
+        """Écrit les mesures dans 'path' : JSON si le nom finit par .json, sinon texte Prometheus."""
+        try:
+            text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            # Remplacement atomique : un collecteur ne lit jamais un fichier à moitié écrit
+            os.replace(tmp_path, path)
+            return f"[OK] Mesures exportées dans {path}."
+        except OSError as e:
+            return f"[ERROR] Export des mesures impossible : {e}"
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Registre de la session (partagé par samba_ad et la TUI)
+metrics = Metrics()
+
+
+# --- Mesure des accès à l'annuaire ---
+def result_size(result, sample=BYTES_SAMPLE):
+    """
+    (entrées, octets estimés des valeurs d'attributs) d'un résultat de recherche.
+    Seules 'sample' entrées réparties sur le résultat sont mesurées, puis extrapolées :
+    le coût ne dépend pas de la taille du résultat, que le décodage parcourt déjà.
+    """
+    entries = len(result)
+    if not entries:
+        return 0, 0
+    step = max(entries // sample, 1)
+    measured = nbytes = 0
+    for index in range(0, entries, step):
+        msg = result[index]
+        measured += 1
+        for attr in msg.keys():
+            if attr != "dn":
+                nbytes += sum(len(value) for value in msg[attr])
+    return entries, nbytes * entries // measured
+
+_instrumented = {}
+
+def instrumented(cls, registry=metrics):
+    """
+    Sous-classe de 'cls' (SamDB) dont chaque opération de LDAP_OPERATIONS est mesurée dans
+    'registry' (famille "ldap") : durée, entrées renvoyées et octets reçus (estimés par
+    échantillon, voir result_size) pour une recherche.
+    Une sous-classe (et non un objet intermédiaire) : les connexions restent des ldb.Ldb
+    utilisables partout (ldb.Dn(conn, ...), transactions...).
+    """
+    key = (cls, id(registry))
+    if key in _instrumented:
+        return _instrumented[key]
+
+    def wrap(name):
+        method = getattr(cls, name)
+
+        def timed(self, *args, **kwargs):
+            if not registry.enabled:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                registry.observe("ldap", f"{name} (erreur)", time.perf_counter() - started)
+                raise
+            elapsed = time.perf_counter() - started
+            entries, nbytes = result_size(result) if name == "search" else (1, 0)
+            registry.observe("ldap", name, elapsed, entries, nbytes)
+            return result
+        timed.__name__ = name
+        timed.__doc__ = method.__doc__
+        return timed
+
+    subclass = type(cls.__name__, (cls,), {name: wrap(name) for name in LDAP_OPERATIONS if hasattr(cls, name)})
+    _instrumented[key] = subclass
+    return subclass
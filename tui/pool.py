@@ -0,0 +1,87 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    Réserve de connexions authentifiées à l'annuaire, partagée entre threads.
+    - 'connect()' ouvre une nouvelle connexion ; au plus 'size' connexions existent à la fois.
+    - Une connexion restée inutilisée plus de 'health_interval' secondes est vérifiée par
+      'check(conn)' avant d'être rendue ; si la vérification échoue elle est rouverte.
+    - La dernière connexion rendue est réutilisée en premier (les autres peuvent expirer
+      côté serveur sans gêner un usage séquentiel).
+    - 'lost(exc)' indique si une exception signifie que la connexion est perdue (elle est
+      alors abandonnée au lieu d'être rendue).
+    """
+
+    def __init__(self, connect, size=2, check=None, health_interval=60, lost=None):
+        self._connect = connect
+        self._check = check
+        self.lost = lost or (lambda exc: False)
+        self.size = size
+        self.health_interval = health_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self.reconnects = 0
+
+    def _open(self):
+        """Ouvre une connexion dans un emplacement déjà réservé (libéré en cas d'échec)."""
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def acquire(self, timeout=None):
+        """Emprunte une connexion (en ouvre une si la limite n'est pas atteinte, sinon attend)."""
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            # Vérification et réservation de l'emplacement sous le même verrou
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                return self._open()
+            conn, last_used = self._idle.get(timeout=timeout)
+        if self._check is not None and time.monotonic() - last_used > self.health_interval:
+            try:
+                self._check(conn)
+            except Exception:
+                # La connexion rouverte reprend l'emplacement de celle abandonnée
+                with self._lock:
+                    self.reconnects += 1
+                return self._open()
+        return conn
+
+    def release(self, conn):
+        """Rend une connexion en bon état."""
+        self._idle.put((conn, time.monotonic()))
+
+    def discard(self, conn):
+        """Abandonne une connexion perdue ; la suivante sera rouverte à la demande."""
+        with self._lock:
+            self._opened -= 1
+            self.reconnects += 1
+
+    @contextmanager
+    def lease(self):
+        """Connexion empruntée le temps d'un bloc 'with' (rendue, ou abandonnée si elle a été perdue)."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException as e:
+            if self.lost(e):
+                self.discard(conn)
+            else:
+                self.release(conn)
+            raise
+        self.release(conn)
+
+    def stats(self):
+        return {"ouvertes": self._opened, "disponibles": self._idle.qsize(), "reconnexions": self.reconnects}
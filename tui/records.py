@@ -0,0 +1,100 @@
+import re
+import sys
+from collections.abc import Mapping
+
+# Séparation RDN / parent d'un DN (virgule non échappée)
+_DN_SPLIT = re.compile(r"(?<!\\),")
+# Valeur absente de update() (un DN peut valoir None)
+_UNSET = object()
+
+
+class Record(Mapping):
+    """
+    Enregistrement compact d'une liste de la TUI : champs fixes en __slots__ (pas de
+    dictionnaire par objet ni de clés répétées), lu comme un dictionnaire en lecture seule
+    (record["cn"], record.get(...), record.items(), dict(record)...).
+    - Le DN est conservé en chaîne, découpé en RDN et DN parent ; le parent est internalisé
+      et donc partagé par tous les objets d'un même conteneur (CN=Users,DC=... n'existe
+      qu'une fois en mémoire). Quand le RDN n'est que le champ 'rdn_field' précédé de son
+      type (CN=<cn>), seul le type est gardé. Aucune référence au message ldb n'est gardée.
+    - Les champs de 'interned' (valeurs souvent répétées, ex. description) sont internalisés,
+      et des champs de même valeur (cn et sAMAccountName...) partagent la même chaîne.
+    Les sous-classes définissent 'fields' (ordre d'affichage, "dn" compris) et __slots__.
+    """
+
+    __slots__ = ("_rdn", "_parent")
+    fields = ()
+    interned = ()
+    rdn_field = None
+
+    def __init__(self, **values):
+        self.update(values)
+
+    def update(self, values):
+        """Met à jour les champs sur place (les clés inconnues sont ignorées)."""
+        dn = values.get("dn", _UNSET)
+        if dn is _UNSET and self.rdn_field in values and hasattr(self, "_rdn"):
+            # Le RDN abrégé dépend du champ de nommage : le DN actuel est réappliqué après coup
+            dn = self.dn
+        seen = {}
+        for key in self.fields:
+            if key == "dn" or key not in values:
+                continue
+            value = values[key]
+            if isinstance(value, str) and value:
+                value = sys.intern(value) if key in self.interned else seen.setdefault(value, value)
+            setattr(self, key, value)
+        # Le DN en dernier : son RDN est comparé aux nouvelles valeurs des champs
+        if dn is not _UNSET:
+            self._set_dn(dn)
+
+    def _set_dn(self, dn):
+        if dn is None:
+            self._rdn, self._parent = None, ""
+            return
+        parts = _DN_SPLIT.split(str(dn), maxsplit=1)
+        rdn = parts[0]
+        kind = rdn.split("=", 1)[0]
+        if self.rdn_field and rdn == f"{kind}={getattr(self, self.rdn_field, '')}":
+            rdn = sys.intern(kind)
+        self._rdn = rdn
+        self._parent = sys.intern(parts[1]) if len(parts) > 1 else ""
+
+    @property
+    def dn(self):
+        rdn = self._rdn
+        if rdn is None:
+            return None
+        if "=" not in rdn:
+            rdn = f"{rdn}={getattr(self, self.rdn_field, '')}"
+        return f"{rdn},{self._parent}" if self._parent else rdn
+
+    def __getitem__(self, key):
+        if key == "dn":
+            return self.dn
+        if key in self.fields:
+            return getattr(self, key, "")
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+def record_type(name, fields, interned=(), rdn_field=None):
+    """Crée une classe d'enregistrement aux champs 'fields' (dont "dn")."""
+    slots = tuple(field for field in fields if field != "dn")
+    return type(name, (Record,), {"__slots__": slots, "fields": tuple(fields), "interned": tuple(interned),
+                                  "rdn_field": rdn_field})
+
+# Enregistrements des catégories de samba_ad.CATEGORIES (mêmes clés que les anciens dictionnaires)
+OURecord = record_type("OURecord", ("name", "dn"), rdn_field="name")
+GroupRecord = record_type("GroupRecord", ("name", "description", "dn"), interned=("description",), rdn_field="name")
+GPORecord = record_type("GPORecord", ("name", "dn"))
+UserRecord = record_type("UserRecord", ("cn", "sAMAccountName", "description", "dn"), interned=("description",),
+                         rdn_field="cn")
+ComputerRecord = record_type("ComputerRecord", ("name", "sAMAccountName", "dn"), rdn_field="name")
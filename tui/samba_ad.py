@@ -1,25 +1,236 @@
+import base64
+import json
+import os
+import re
 import subprocess
-from samba.samdb import SamDB
-from samba import credentials
-from samba.param import LoadParm
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+import ldb
+from cache import (
+    AttributeCache, DEFAULT_SNAPSHOT_PATH, SNAPSHOT_TTL, save_snapshot, load_snapshot,
+    load_domain_info, save_domain_info,
+)
+from membership import MembershipGraph
+from metrics import metrics, instrumented
+from records import OURecord, GroupRecord, GPORecord, UserRecord, ComputerRecord
+from decode import Decoder, first_text, to_text
+from pool import ConnectionPool
+
+# Taille de page par défaut des recherches paginées (contrôle LDAP "paged results").
+# Les listes sont transmises par le DC page par page au lieu d'un seul bloc.
+PAGE_SIZE = 1000
+
+# Cache mémoire des attributs consultés (touches 'a' et 't' de la TUI)
+attribute_cache = AttributeCache()
+
+# Graphe des appartenances aux groupes (touche 'g' de la TUI), chargé à la demande par
+# load_membership puis tenu à jour par les fonctions d'écriture de ce module
+membership = MembershipGraph()
 
 # --- Connexion au domaine Samba AD ---
-def detect_domain_settings(admin_user, admin_password):
+# Adresse de l'annuaire : ldap://..., ldapi://..., chemin d'un sam.ldb ou "local" (voir resolve_url)
+DEFAULT_URL = os.environ.get("SAMBA_AD_URL", "ldap://localhost")
+# Nombre maximal de connexions ouvertes simultanément par session
+POOL_SIZE = 2
+
+# Erreurs LDAP signalant une connexion perdue (DC redémarré, délai d'inactivité dépassé...)
+_LOST_CONNECTION_STATUS = ("NT_STATUS_CONNECTION", "NT_STATUS_IO_TIMEOUT", "NT_STATUS_END_OF_FILE",
+                           "NT_STATUS_PIPE", "NT_STATUS_INVALID_NETWORK_RESPONSE")
+
+def connection_lost(exc):
+    """Vrai si l'exception indique que la connexion à l'annuaire est perdue (et non une erreur de requête)."""
+    if not isinstance(exc, ldb.LdbError):
+        return False
+    code, message = (tuple(exc.args) + (None, ""))[:2]
+    if code in (ldb.ERR_UNAVAILABLE, ldb.ERR_BUSY):
+        return True
+    return any(status in str(message) for status in _LOST_CONNECTION_STATUS)
+
+def resolve_url(url, lp):
+    """
+    "local" : accès direct à la base du DC lorsque la TUI tourne sur le DC lui-même, sans
+    pile réseau — fichier sam.ldb s'il est accessible (root), sinon socket ldapi ;
+    à défaut ldap://localhost. Toute autre valeur est renvoyée telle quelle.
+    """
+    if url != "local":
+        return url
+    sam_path = lp.private_path("sam.ldb")
+    if os.access(sam_path, os.R_OK | os.W_OK):
+        return sam_path
+    ldapi_path = lp.private_path("ldapi")
+    if os.path.exists(ldapi_path):
+        return "ldapi://" + urllib.parse.quote(ldapi_path, safe="")
+    return "ldap://localhost"
+
+def open_connection(url, creds, lp):
+    """
+    Ouvre une connexion SamDB ; un sam.ldb local est ouvert avec les droits système.
+    Les opérations de la connexion sont mesurées (voir metrics.instrumented).
+    """
+    from samba.samdb import SamDB
+    SamDB = instrumented(SamDB)
+    if "://" not in url:
+        from samba.auth import system_session
+        return SamDB(url=url, session_info=system_session(), lp=lp)
+    return SamDB(url=url, credentials=creds, lp=lp)
+
+class PooledSamDB:
+    """
+    Remplace une instance SamDB unique : chaque appel (search, add, modify...) emprunte une
+    connexion d'un ConnectionPool, vérifiée et rouverte au besoin.
+    - Une lecture (search) interrompue par une perte de connexion est rejouée une fois sur une
+      connexion rouverte ; une écriture ne l'est pas (l'erreur est renvoyée, la connexion
+      suivante sera rouverte).
+    - Les suites d'appels liés (pages d'une recherche, transaction) doivent rester sur une même
+      connexion : voir connection(samdb) ; pendant ce temps, les autres appels du même thread
+      utilisent cette connexion.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._local = threading.local()
+
+    @contextmanager
+    def lease(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        with self.pool.lease() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    def _call(self, name, *args, **kwargs):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            return getattr(held, name)(*args, **kwargs)
+        retries = 1 if name == "search" else 0
+        while True:
+            conn = self.pool.acquire()
+            try:
+                result = getattr(conn, name)(*args, **kwargs)
+            except Exception as e:
+                self._give_back(conn, e)
+                if not connection_lost(e):
+                    raise
+                if not retries:
+                    raise
+                retries -= 1
+                continue
+            self.pool.release(conn)
+            return result
+
+    def transaction_start(self):
+        """Une transaction garde sa connexion (pour ce thread) jusqu'à validation ou annulation."""
+        conn = self.pool.acquire()
+        try:
+            conn.transaction_start()
+        except Exception as e:
+            self._give_back(conn, e)
+            raise
+        self._local.conn = conn
+
+    def _end_transaction(self, name):
+        conn = self._local.conn
+        self._local.conn = None
+        try:
+            getattr(conn, name)()
+        except Exception as e:
+            self._give_back(conn, e)
+            raise
+        self.pool.release(conn)
+
+    def _give_back(self, conn, exc):
+        if connection_lost(exc):
+            self.pool.discard(conn)
+        else:
+            self.pool.release(conn)
+
+    def transaction_commit(self):
+        self._end_transaction("transaction_commit")
+
+    def transaction_cancel(self):
+        self._end_transaction("transaction_cancel")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+@contextmanager
+def connection(samdb):
+    """
+    Connexion SamDB réelle à utiliser pour une suite d'appels liés (recherche paginée,
+    transaction, construction d'un ldb.Dn) : connexion empruntée au pool pour un PooledSamDB,
+    l'instance elle-même sinon.
+    """
+    if isinstance(samdb, PooledSamDB):
+        with samdb.lease() as conn:
+            yield conn
+    else:
+        yield samdb
+
+def detect_domain_settings(admin_user, admin_password, url=None, pool_size=POOL_SIZE,
+                           kerberos=False, use_cache=False, timings=None):
     """
     Connexion au domaine Samba AD avec authentification.
     Renvoie un dictionnaire contenant :
-      - samdb : l'instance SamDB
+      - samdb : l'accès à l'annuaire (PooledSamDB : au plus 'pool_size' connexions,
+        vérifiées et rouvertes automatiquement)
       - domain_dn : le DN du domaine
       - domain_name : le nom du domaine (extrait du DC)
       - user : le nom d'utilisateur administrateur
+      - url : l'adresse de l'annuaire utilisée
+    'url' : voir DEFAULT_URL (variable d'environnement SAMBA_AD_URL).
+    'kerberos' : authentification par le cache de tickets Kerberos (kinit, $KRB5CCNAME)
+    au lieu du mot de passe ('admin_password' est alors ignoré).
+    'use_cache' : reprend le DN et le nom du domaine mémorisés lors d'une connexion précédente
+    (voir cache.load_domain_info) ; aucune requête n'est alors faite ici et l'authentification
+    a lieu à la première recherche.
+    'timings' (facultatif) : dictionnaire complété par la durée (s) de chaque étape.
     """
-    lp = LoadParm()
-    creds = credentials.Credentials()
+    started = time.perf_counter()
+
+    def step(name):
+        nonlocal started
+        if timings is not None:
+            now = time.perf_counter()
+            timings[name] = now - started
+            started = now
+
     try:
-        creds.set_username(admin_user)
-        creds.set_password(admin_password)
-        creds.guess(lp)
-        samdb = SamDB(url="ldap://localhost", credentials=creds, lp=lp)
+        # La pile samba est chargée à la première connexion seulement (démarrage plus rapide)
+        from samba import credentials
+        from samba.param import LoadParm
+        step("chargement de samba")
+        lp = LoadParm()
+        creds = credentials.Credentials()
+        if kerberos:
+            creds.guess(lp)
+            creds.set_kerberos_state(credentials.MUST_USE_KERBEROS)
+            if os.environ.get("KRB5CCNAME"):
+                creds.set_named_ccache(os.environ["KRB5CCNAME"], credentials.SPECIFIED, lp)
+            admin_user = admin_user or creds.get_username()
+        else:
+            creds.set_username(admin_user)
+            creds.set_password(admin_password)
+            creds.guess(lp)
+        url = resolve_url(url or DEFAULT_URL, lp)
+        pool = ConnectionPool(lambda: open_connection(url, creds, lp), size=pool_size,
+                              check=lambda conn: conn.search(base="", scope=ldb.SCOPE_BASE, attrs=["currentTime"]),
+                              lost=connection_lost)
+        samdb = PooledSamDB(pool)
+        step("identifiants")
+        cached = load_domain_info(url) if use_cache else None
+        if cached:
+            step("contexte du domaine (mémorisé)")
+            return {"samdb": samdb, "domain_dn": cached["domain_dn"], "domain_name": cached["domain_name"],
+                    "user": admin_user, "url": url}
         # Récupération du contexte par défaut
         result = samdb.search(base="", scope=0, attrs=["defaultNamingContext"])
         domain_dn = result[0]["defaultNamingContext"][0]
@@ -31,21 +242,217 @@ def detect_domain_settings(admin_user, admin_password):
             domain_dn = domain_dn.decode("utf-8", errors="replace")
         if isinstance(domain_name, bytes):
             domain_name = domain_name.decode("utf-8", errors="replace")
-        return {"samdb": samdb, "domain_dn": domain_dn, "domain_name": domain_name, "user": admin_user}
+        save_domain_info(url, domain_dn, domain_name)
+        step("connexion et contexte du domaine")
+        return {"samdb": samdb, "domain_dn": domain_dn, "domain_name": domain_name, "user": admin_user, "url": url}
     except Exception as e:
         return f"[ERROR] Connexion échouée : {e}"
 
+# --- Recherches paginées ---
+def _paged_cookie(res):
+    """Extrait le cookie du contrôle paged_results renvoyé par le DC (vide = dernière page)."""
+    for ctrl in res.controls or []:
+        ctrl = str(ctrl)
+        if ctrl.startswith("paged_results"):
+            return ctrl.rsplit(":", 1)[-1]
+    return ""
+
+def iter_search_pages(samdb, base, expression, attrs, scope=ldb.SCOPE_SUBTREE, page_size=None, sort_attr=None):
+    """
+    Générateur de recherche paginée : renvoie les résultats page par page
+    (au plus 'page_size' entrées chacune) au fur et à mesure de leur arrivée.
+    Avec 'sort_attr', les entrées sont triées par le DC (contrôle server_sort) selon cet attribut.
+    """
+    sort = [f"server_sort:1:0:{sort_attr}"] if sort_attr else []
+    size = page_size or PAGE_SIZE
+    # Le cookie de pagination n'est valable que sur la connexion qui l'a émis ; si elle est
+    # perdue avant la première page, la recherche est relancée sur une nouvelle connexion.
+    for attempt in (1, 2):
+        yielded = False
+        try:
+            with connection(samdb) as conn:
+                cookie = ""
+                while True:
+                    control = f"paged_results:1:{size}:{cookie}" if cookie else f"paged_results:1:{size}"
+                    res = conn.search(base=base, scope=scope, expression=expression, attrs=attrs,
+                                      controls=sort + [control])
+                    yielded = True
+                    yield res
+                    cookie = _paged_cookie(res)
+                    if not cookie:
+                        return
+        except Exception as e:
+            if yielded or attempt == 2 or not connection_lost(e):
+                raise
+
+# Les enregistrements sont compacts (records.Record : champs fixes, DN en chaîne) et ne
+# gardent aucune référence au message ldb, qui peut ainsi être libéré aussitôt.
+# Seuls les attributs affichés sont décodés, en une passe (decode.Decoder).
+_OU_ATTRS = Decoder(["ou"])
+_GROUP_ATTRS = Decoder(["cn", "description"])
+_GPO_ATTRS = Decoder(["displayName"])
+_USER_ATTRS = Decoder(["cn", "sAMAccountName", "description"])
+_COMPUTER_ATTRS = Decoder(["cn", "sAMAccountName"])
+
+def _ou_record(msg):
+    name, = _OU_ATTRS.values(msg)
+    return OURecord(name=name, dn=msg.dn)
+
+def _group_record(msg):
+    name, description = _GROUP_ATTRS.values(msg)
+    return GroupRecord(name=name, description=description, dn=msg.dn)
+
+def _gpo_record(msg):
+    name, = _GPO_ATTRS.values(msg)
+    return GPORecord(name=name, dn=msg.dn)
+
+def _user_record(msg):
+    cn, sam, description = _USER_ATTRS.values(msg)
+    return UserRecord(cn=cn, sAMAccountName=sam, description=description, dn=msg.dn)
+
+def _computer_record(msg):
+    name, sam = _COMPUTER_ATTRS.values(msg)
+    return ComputerRecord(name=name, sAMAccountName=sam, dn=msg.dn)
+
+# Type d'enregistrement de chaque catégorie (instantané local relu par load_data)
+RECORD_TYPES = {"ous": OURecord, "groupes": GroupRecord, "gpos": GPORecord, "users": UserRecord,
+                "computers": ComputerRecord}
+
+# Catégories affichées par la TUI : clé dans 'data', base de recherche (relative au DN
+# du domaine), filtre LDAP, attributs demandés et conversion d'une entrée en enregistrement.
+CATEGORIES = {
+    "ous": ("{domain_dn}", "(objectClass=organizationalUnit)", ["ou"], _ou_record),
+    "groupes": ("CN=Users,{domain_dn}", "(objectClass=group)", ["cn", "description"], _group_record),
+    "gpos": ("CN=Policies,CN=System,{domain_dn}", "(objectClass=groupPolicyContainer)", ["displayName"], _gpo_record),
+    "users": ("{domain_dn}", "(&(objectClass=user)(!(sAMAccountName=krbtgt)))",
+              ["cn", "sAMAccountName", "description"], _user_record),
+    "computers": ("{domain_dn}", "(objectClass=computer)", ["cn", "sAMAccountName"], _computer_record),
+}
+
+def _iter_category_messages(samdb, domain_dn, category, page_size=None, since_usn=None, sort_attr=None):
+    """
+    Renvoie, page par page, les entrées LDAP brutes d'une catégorie (avec leur objectGUID).
+    Si 'since_usn' est fourni, seules les entrées modifiées depuis cet USN sont demandées.
+    """
+    base, expression, attrs, convert = CATEGORIES[category]
+    if since_usn is not None:
+        expression = f"(&{expression}(uSNChanged>={since_usn}))"
+    yield from iter_search_pages(samdb, base.format(domain_dn=domain_dn), expression,
+                                 attrs + ["objectGUID"], page_size=page_size, sort_attr=sort_attr)
+
+# Classe d'objet caractéristique de chaque catégorie : permet de répartir côté client
+# les entrées d'une recherche unique sur tout le domaine (voir _iter_all_messages).
+CATEGORY_CLASSES = {
+    "ous": "organizationalunit",
+    "groupes": "group",
+    "gpos": "grouppolicycontainer",
+    "users": "user",
+    "computers": "computer",
+}
+
+def _categories_of(msg, bases):
+    """Catégories de 'bases' auxquelles appartient l'entrée (mêmes critères que leurs filtres)."""
+    classes = {to_text(value).lower() for value in msg.get("objectClass", [])}
+    dn = str(msg.dn).lower()
+    categories = []
+    for category in bases:
+        if CATEGORY_CLASSES[category] not in classes or not (dn == bases[category] or dn.endswith("," + bases[category])):
+            continue
+        if category == "users" and first_text(msg, "sAMAccountName").lower() == "krbtgt":
+            continue
+        categories.append(category)
+    return categories
+
+def _iter_all_messages(samdb, domain_dn, page_size=None, categories=None):
+    """
+    Recherche unique couvrant plusieurs catégories (toutes par défaut) avec un filtre OU
+    sur leurs classes d'objet : un seul parcours du domaine au lieu d'une recherche par
+    catégorie, soit autant d'allers-retours en moins vers le DC. Renvoie, page par page,
+    des couples (entrée, catégories de l'entrée) ; les entrées hors catégories sont ignorées.
+    """
+    categories = list(categories or CATEGORIES)
+    bases = {category: CATEGORIES[category][0].format(domain_dn=domain_dn).lower() for category in categories}
+    attrs = sorted({attr for category in categories for attr in CATEGORIES[category][2]} | {"objectClass", "objectGUID"})
+    classes = sorted({CATEGORY_CLASSES[category] for category in categories})
+    expression = "(|" + "".join(f"(objectClass={cls})" for cls in classes) + ")"
+    for page in iter_search_pages(samdb, domain_dn, expression, attrs, page_size=page_size):
+        yield [(msg, categories) for msg in page for categories in [_categories_of(msg, bases)] if categories]
+
+def iter_category_pages(samdb, domain_dn, category, page_size=None, sort_attr=None):
+    """
+    Renvoie, page par page, les enregistrements (dictionnaires) d'une catégorie de CATEGORIES,
+    triés par le DC selon 'sort_attr' s'il est fourni.
+    """
+    convert = CATEGORIES[category][3]
+    for page in _iter_category_messages(samdb, domain_dn, category, page_size, sort_attr=sort_attr):
+        with metrics.timed("décodage", category, len(page)):
+            records = [convert(msg) for msg in page]
+        yield records
+
+def iter_category(samdb, domain_dn, category, page_size=None, sort_attr=None):
+    """Renvoie un à un les enregistrements d'une catégorie, au fil des pages reçues."""
+    for page in iter_category_pages(samdb, domain_dn, category, page_size, sort_attr):
+        yield from page
+
+# --- Listes triées par le DC, parcourues par fenêtres (Virtual List View) ---
+# Attribut de tri des catégories qui peuvent être parcourues sans être chargées
+VLV_SORT = {"users": "sAMAccountName", "computers": "sAMAccountName"}
+
+def _vlv_response(res):
+    """(position de la cible (1 = première), nombre total d'entrées, contexte) de la réponse VLV."""
+    for ctrl in res.controls or []:
+        fields = str(ctrl).split(":")
+        if fields[0] == "vlv_resp":
+            return int(fields[2]), int(fields[3]), fields[6] if len(fields) > 6 else ""
+    raise ValueError("le DC n'a pas renvoyé de réponse VLV")
+
+def vlv_window(samdb, base, expression, attrs, sort_attr, start=0, count=100, value=None, context=None):
+    """
+    Fenêtre d'une liste triée par le DC (contrôles server_sort et VLV) : 'count' entrées à partir
+    de la position 'start' (0 = première), ou à partir de la première entrée dont 'sort_attr'
+    est supérieur ou égal à 'value'. Seules ces entrées sont transférées.
+    'context' est le contexte VLV d'une fenêtre précédente de la même liste : le DC réutilise
+    alors son tri au lieu de le refaire. Renvoie (entrées, position de la première entrée,
+    nombre total d'entrées, contexte).
+    """
+    if value is not None:
+        target = value.replace(":", "")
+    else:
+        target = f"{start + 1}:0"
+    for ctx in ([context, None] if context else [None]):
+        control = f"vlv:1:0:{count - 1}:{target}" + (f":{ctx}" if ctx else "")
+        try:
+            with connection(samdb) as conn:
+                res = conn.search(base=base, scope=ldb.SCOPE_SUBTREE, expression=expression, attrs=attrs,
+                                  controls=[f"server_sort:1:0:{sort_attr}", control])
+            break
+        except ldb.LdbError:
+            # Contexte expiré, ou ouvert sur une autre connexion du pool : nouvelle liste
+            if not ctx:
+                raise
+    position, total, context = _vlv_response(res)
+    return list(res), position - 1, total, context
+
+def vlv_category_window(samdb, domain_dn, category, start=0, count=100, value=None, context=None):
+    """
+    Fenêtre d'enregistrements d'une catégorie de VLV_SORT, triée par le DC (voir vlv_window).
+    Renvoie (enregistrements, position du premier, nombre total, contexte) ou un message "[ERROR] ...".
+    """
+    base, expression, attrs, convert = CATEGORIES[category]
+    try:
+        msgs, position, total, context = vlv_window(samdb, base.format(domain_dn=domain_dn), expression,
+                                                    attrs + ["objectGUID"], VLV_SORT[category], start, count,
+                                                    value, context)
+        return [convert(msg) for msg in msgs], position, total, context
+    except Exception as e:
+        return f"[ERROR] Parcours trié de la liste impossible : {e}"
+
 # --- Fonctions de gestion des Organizational Units (OUs) ---
+def iter_ous(samdb, domain_dn, page_size=None):
+    return iter_category(samdb, domain_dn, "ous", page_size)
+
 def list_ous(samdb, domain_dn):
-    ous = samdb.search(base=domain_dn, expression="(objectClass=organizationalUnit)", attrs=["ou", "dn"])
-    result = []
-    if ous:
-        for ou in ous:
-            name = ou["ou"][0]
-            if isinstance(name, bytes):
-                name = name.decode("utf-8", errors="replace")
-            result.append({"name": name, "dn": ou.get("dn")})
-    return result
+    return list(iter_ous(samdb, domain_dn))
 
 def create_ou(samdb, domain_dn, ou_name):
     try:
@@ -59,32 +466,24 @@ def delete_ou(samdb, domain_dn, ou_name):
     try:
         ou_dn = f"OU={ou_name},{domain_dn}"
         samdb.delete(ou_dn)
+        attribute_cache.invalidate(ou_dn)
+        membership.remove_node(ou_dn)
         return f"[OK] OU '{ou_name}' supprimée."
     except Exception as e:
         return f"[ERROR] Impossible de supprimer l'OU : {e}"
 
 # --- Fonctions de gestion des Groupes ---
+def iter_groups(samdb, domain_dn, page_size=None):
+    return iter_category(samdb, domain_dn, "groupes", page_size)
+
 def list_groups(samdb, domain_dn):
-    base = f"CN=Users,{domain_dn}"
-    groups = samdb.search(base=base, expression="(objectClass=group)", attrs=["cn", "description", "dn"])
-    result = []
-    if groups:
-        for group in groups:
-            name = group["cn"][0]
-            if isinstance(name, bytes):
-                name = name.decode("utf-8", errors="replace")
-            description = ""
-            if "description" in group and group["description"]:
-                description = group["description"][0]
-                if isinstance(description, bytes):
-                    description = description.decode("utf-8", errors="replace")
-            result.append({"name": name, "description": description, "dn": group.get("dn")})
-    return result
+    return list(iter_groups(samdb, domain_dn))
 
 def create_group(samdb, domain_dn, group_name):
     try:
         group_dn = f"CN={group_name},CN=Users,{domain_dn}"
         samdb.add({"dn": group_dn, "objectClass": ["top", "group"], "sAMAccountName": group_name})
+        membership.set_members(group_dn, [])
         return f"[OK] Groupe '{group_name}' créé."
     except Exception as e:
         return f"[ERROR] Impossible de créer le groupe : {e}"
@@ -93,65 +492,64 @@ def delete_group(samdb, domain_dn, group_name):
     try:
         group_dn = f"CN={group_name},CN=Users,{domain_dn}"
         samdb.delete(group_dn)
+        attribute_cache.invalidate(group_dn)
+        membership.remove_node(group_dn)
         return f"[OK] Groupe '{group_name}' supprimé."
     except Exception as e:
         return f"[ERROR] Impossible de supprimer le groupe : {e}"
 
 # --- Fonctions de gestion des GPOs ---
+def iter_gpos(samdb, domain_dn, page_size=None):
+    return iter_category(samdb, domain_dn, "gpos", page_size)
+
 def list_gpos(samdb, domain_dn):
-    gpo_base = f"CN=Policies,CN=System,{domain_dn}"
-    gpos = samdb.search(base=gpo_base, expression="(objectClass=groupPolicyContainer)", attrs=["displayName", "dn"])
-    result = []
-    if gpos:
-        for gpo in gpos:
-            name = gpo["displayName"][0]
-            if isinstance(name, bytes):
-                name = name.decode("utf-8", errors="replace")
-            result.append({"name": name, "dn": gpo.get("dn")})
-    return result
-
-def create_full_gpo(gpo_name):
+    return list(iter_gpos(samdb, domain_dn))
+
+def create_full_gpo(gpo_name, cancelled=None):
+    """
+    Crée un GPO complet (objet LDAP + SYSVOL) via samba-tool.
+    'cancelled' : fonction facultative consultée pendant l'exécution ; si elle renvoie
+    True, le processus samba-tool est interrompu.
+    """
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             ["samba-tool", "gpo", "create", gpo_name],
-            check=True,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True
         )
-        return f"[OK] GPO '{gpo_name}' créé.\n{result.stdout}"
-    except subprocess.CalledProcessError as e:
-        return f"[ERROR] La création du GPO a échoué : {e.stderr}"
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=0.2)
+                break
+            except subprocess.TimeoutExpired:
+                if cancelled and cancelled():
+                    proc.kill()
+                    proc.communicate()
+                    return f"[ERROR] Création du GPO '{gpo_name}' annulée."
+        if proc.returncode != 0:
+            return f"[ERROR] La création du GPO a échoué : {stderr}"
+        return f"[OK] GPO '{gpo_name}' créé.\n{stdout}"
+    except OSError as e:
+        return f"[ERROR] La création du GPO a échoué : {e}"
 
 def delete_gpo(samdb, domain_dn, gpo_name):
     try:
         gpo_base = f"CN=Policies,CN=System,{domain_dn}"
         gpo_dn = f"CN={gpo_name},{gpo_base}"
         samdb.delete(gpo_dn)
+        attribute_cache.invalidate(gpo_dn)
+        membership.remove_node(gpo_dn)
         return f"[OK] GPO '{gpo_name}' supprimé."
     except Exception as e:
         return f"[ERROR] Impossible de supprimer le GPO : {e}"
 
 # --- Fonctions de gestion des Utilisateurs ---
-def list_users(samdb, domain_dn):
-    users = samdb.search(base=domain_dn, expression="(&(objectClass=user)(!(sAMAccountName=krbtgt)))", 
-                         attrs=["cn", "sAMAccountName", "description", "dn"])
-    result = []
-    if users:
-        for user in users:
-            cn = user.get("cn", [b""])[0]
-            if isinstance(cn, bytes):
-                cn = cn.decode("utf-8", errors="replace")
-            sam = user.get("sAMAccountName", [b""])[0]
-            if isinstance(sam, bytes):
-                sam = sam.decode("utf-8", errors="replace")
-            desc = ""
-            if "description" in user and user["description"]:
-                desc = user["description"][0]
-                if isinstance(desc, bytes):
-                    desc = desc.decode("utf-8", errors="replace")
-            result.append({"cn": cn, "sAMAccountName": sam, "description": desc, "dn": user.get("dn")})
-    return result
+def iter_users(samdb, domain_dn, page_size=None, sort_attr=None):
+    return iter_category(samdb, domain_dn, "users", page_size, sort_attr)
+
+def list_users(samdb, domain_dn, sort_attr=None):
+    return list(iter_users(samdb, domain_dn, sort_attr=sort_attr))
 
 def create_user(samdb, domain_dn, user_name, password):
     try:
@@ -171,6 +569,8 @@ def delete_user(samdb, domain_dn, user_name):
     try:
         user_dn = f"CN={user_name},CN=Users,{domain_dn}"
         samdb.delete(user_dn)
+        attribute_cache.invalidate(user_dn)
+        membership.remove_node(user_dn)
         return f"[OK] Utilisateur '{user_name}' supprimé."
     except Exception as e:
         return f"[ERROR] Impossible de supprimer l'utilisateur : {e}"
@@ -194,19 +594,11 @@ def reset_password(samdb, domain_dn, username, new_password):
 
 
 # --- Fonctions de gestion des Ordinateurs ---
-def list_computers(samdb, domain_dn):
-    computers = samdb.search(base=domain_dn, expression="(objectClass=computer)", attrs=["cn", "sAMAccountName", "dn"])
-    result = []
-    if computers:
-        for comp in computers:
-            cn = comp.get("cn", [b""])[0]
-            if isinstance(cn, bytes):
-                cn = cn.decode("utf-8", errors="replace")
-            sam = comp.get("sAMAccountName", [b""])[0]
-            if isinstance(sam, bytes):
-                sam = sam.decode("utf-8", errors="replace")
-            result.append({"name": cn, "sAMAccountName": sam, "dn": comp.get("dn")})
-    return result
+def iter_computers(samdb, domain_dn, page_size=None, sort_attr=None):
+    return iter_category(samdb, domain_dn, "computers", page_size, sort_attr)
+
+def list_computers(samdb, domain_dn, sort_attr=None):
+    return list(iter_computers(samdb, domain_dn, sort_attr=sort_attr))
 
 def create_computer(samdb, domain_dn, computer_name):
     try:
@@ -225,6 +617,8 @@ def delete_computer(samdb, domain_dn, computer_name):
     try:
         computer_dn = f"CN={computer_name},CN=Computers,{domain_dn}"
         samdb.delete(computer_dn)
+        attribute_cache.invalidate(computer_dn)
+        membership.remove_node(computer_dn)
         return f"[OK] Ordinateur '{computer_name}' supprimé."
     except Exception as e:
         return f"[ERROR] Impossible de supprimer l'ordinateur : {e}"
@@ -234,6 +628,8 @@ def move_computer(samdb, domain_dn, computer_name, target_ou):
         old_dn = f"CN={computer_name},CN=Computers,{domain_dn}"
         new_dn = f"CN={computer_name},OU={target_ou},{domain_dn}"
         samdb.rename(old_dn, new_dn)
+        attribute_cache.invalidate(old_dn)
+        membership.rename_node(old_dn, new_dn)
         return f"[OK] Ordinateur '{computer_name}' déplacé vers l'OU '{target_ou}'."
     except Exception as e:
         return f"[ERROR] Impossible de déplacer l'ordinateur : {e}"
@@ -244,47 +640,339 @@ def modify_object(samdb, dn, modifications):
     Modifie un objet en remplaçant ses attributs.
     'modifications' est un dictionnaire où chaque clé est le nom d'un attribut et
     chaque valeur est une liste des nouvelles valeurs.
-    Exemple : {"description": ["Nouvelle description"]}
+    Exemple : {"description": ["Nouvelle description"]} ; une liste vide supprime l'attribut.
     """
+    template = [("replace", attr, values if isinstance(values, list) else [values])
+                for attr, values in modifications.items()]
     try:
-        samdb.modify(dn, modifications)
+        with connection(samdb) as conn:
+            _apply_template(conn, dn, template)
         return f"[OK] Objet {dn} modifié."
     except Exception as e:
         return f"[ERROR] Modification de l'objet {dn} a échoué : {e}"
 
-def get_object_attributes(samdb, dn, all_attrs=False):
+# --- Modifications par lots ---
+# Nombre d'objets modifiés par transaction
+BATCH_CHUNK = 200
+# Journaux d'annulation des lots (un fichier JSONL par lot)
+ROLLBACK_DIR = os.path.join(os.path.dirname(DEFAULT_SNAPSHOT_PATH), "rollback")
+
+_MOD_FLAGS = {"add": ldb.FLAG_MOD_ADD, "replace": ldb.FLAG_MOD_REPLACE, "delete": ldb.FLAG_MOD_DELETE}
+
+def parse_modification_template(text):
+    """
+    Analyse un modèle de modification, une opération par élément séparé par ';' :
+      attr=valeur   remplace l'attribut        +attr=valeur  ajoute une valeur
+      -attr=valeur  retire une valeur          -attr         supprime l'attribut
+    Plusieurs valeurs d'un même attribut s'obtiennent en répétant l'élément.
+    Renvoie une liste [(opération, attribut, [valeurs])] ou un message "[ERROR] ...".
+    """
+    operations = {}
+    for part in text.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        op = "replace"
+        if part[0] in "+-":
+            op = "add" if part[0] == "+" else "delete"
+            part = part[1:].strip()
+        attr, sep, value = part.partition("=")
+        attr = attr.strip()
+        if not attr or (not sep and op != "delete"):
+            return f"[ERROR] Élément de modèle invalide : '{part}'"
+        known = operations.setdefault(attr.lower(), (op, attr, []))
+        if known[0] != op:
+            return f"[ERROR] Une seule opération par attribut ('{attr}')."
+        if sep:
+            known[2].append(value.strip())
+    if not operations:
+        return "[ERROR] Modèle de modification vide."
+    return list(operations.values())
+
+def _log_value(value):
+    """Valeur d'attribut sérialisable en JSON (les valeurs binaires sont encodées en base64)."""
+    if hasattr(value, "get_value"):
+        value = value.get_value()
+    if isinstance(value, bytes):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+def _unlog_value(value):
+    return base64.b64decode(value["base64"]) if isinstance(value, dict) else value
+
+def _read_before(conn, dns, attrs):
+    """Valeurs actuelles de 'attrs' pour un lot d'objets, en une seule recherche."""
+    expression = "(|" + "".join(f"(distinguishedName={ldb.binary_encode(str(dn))})" for dn in dns) + ")"
+    before = {}
+    for page in iter_search_pages(conn, conn.domain_dn(), expression, attrs):
+        for msg in page:
+            before[str(msg.dn).lower()] = {attr: [_log_value(v) for v in msg[attr]] if attr in msg else []
+                                           for attr in attrs}
+    return before
+
+def _undo_operations(template, before):
+    """Opérations inverses d'un modèle : l'annulation ré-applique l'état d'avant la modification."""
+    undo = []
+    for op, attr, values in reversed(template):
+        if op == "add":
+            undo.append(("delete", attr, values))
+        elif op == "delete" and values:
+            undo.append(("add", attr, values))
+        else:
+            undo.append(("replace", attr, before.get(attr, [])))
+    return undo
+
+def _apply_template(conn, dn, template):
+    msg = ldb.Message()
+    msg.dn = ldb.Dn(conn, str(dn))
+    for op, attr, values in template:
+        msg[attr] = ldb.MessageElement([_unlog_value(v) for v in values], _MOD_FLAGS[op], attr)
+    conn.modify(msg)
+    attribute_cache.invalidate(dn)
+    for op, attr, values in template:
+        if attr.lower() == "member":
+            if op == "add":
+                membership.add_members(dn, values)
+            elif op == "delete" and values:
+                membership.remove_members(dn, values)
+            else:
+                membership.set_members(dn, values)
+
+def _apply_batches(samdb, changes, total, chunk_size, log, on_progress, cancelled):
+    """
+    Applique des couples (dn, modèle) par lots de 'chunk_size', chaque lot dans une transaction.
+    'log' (facultatif) reçoit, après validation de chaque lot, une ligne JSON d'annulation par
+    objet modifié. Renvoie (modifiés, erreurs [(dn, message)], durée en secondes).
+    """
+    started = time.perf_counter()
+    done = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal done
+        undo_lines = []
+        with connection(samdb) as conn:
+            replaced = sorted({attr for _, template in chunk for op, attr, values in template
+                               if op == "replace" or (op == "delete" and not values)})
+            before = _read_before(conn, [dn for dn, _ in chunk], replaced) if replaced and log else {}
+            conn.transaction_start()
+            try:
+                for dn, template in chunk:
+                    try:
+                        _apply_template(conn, dn, template)
+                    except ldb.LdbError as e:
+                        errors.append((str(dn), str(e.args[-1] if e.args else e)))
+                        continue
+                    done += 1
+                    if log:
+                        undo = _undo_operations(template, before.get(str(dn).lower(), {}))
+                        undo_lines.append(json.dumps({"dn": str(dn), "undo": undo}))
+            except BaseException:
+                conn.transaction_cancel()
+                raise
+            conn.transaction_commit()
+        if log and undo_lines:
+            log.write("\n".join(undo_lines) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        chunk.clear()
+        if on_progress:
+            on_progress(done, total, len(errors))
+
+    for dn, template in changes:
+        chunk.append((dn, template))
+        if len(chunk) >= chunk_size:
+            flush()
+            if cancelled and cancelled():
+                break
+    if chunk and not (cancelled and cancelled()):
+        flush()
+    return done, errors, time.perf_counter() - started
+
+def _batch_report(verb, done, total, errors, elapsed, log_path=None):
+    rate = done / elapsed * 60 if elapsed > 0 else 0
+    status = "[OK]" if not errors else "[ERROR]"
+    message = f"{status} {done}/{total} objets {verb} en {elapsed:.1f} s ({rate:.0f}/min)"
+    if errors:
+        message += f", {len(errors)} erreurs (ex. {errors[0][0]} : {errors[0][1]})"
+    if log_path:
+        message += f" ; journal d'annulation : {log_path}"
+    return message + "."
+
+def new_rollback_path():
+    """Chemin d'un nouveau journal d'annulation, daté, dans ROLLBACK_DIR."""
+    os.makedirs(ROLLBACK_DIR, mode=0o700, exist_ok=True)
+    return os.path.join(ROLLBACK_DIR, time.strftime("lot-%Y%m%d-%H%M%S.jsonl"))
+
+def batch_modify(samdb, dns, template, chunk_size=None, rollback_path=None, on_progress=None, cancelled=None):
+    """
+    Applique le même modèle de modification (voir parse_modification_template) à tous les objets
+    de 'dns', par lots de 'chunk_size' objets (BATCH_CHUNK par défaut) exécutés chacun dans une
+    transaction. Une erreur sur un objet n'interrompt pas le lot : elle est comptée et signalée.
+    Avant chaque lot, les valeurs remplacées ou supprimées sont relues en une recherche ; après
+    chaque lot, les opérations inverses sont ajoutées au journal 'rollback_path' (JSONL, voir
+    rollback_batch ; new_rollback_path() par défaut, "" = pas de journal).
+    Sur une connexion ldap://, une transaction ldb n'est pas atomique côté serveur : seul le
+    journal permet alors de revenir en arrière.
+    'on_progress(modifiés, total, erreurs)' est appelé après chaque lot.
+    """
+    try:
+        if isinstance(template, str):
+            template = parse_modification_template(template)
+            if isinstance(template, str):
+                return template
+        dns = list(dns)
+        if rollback_path is None:
+            rollback_path = new_rollback_path()
+        log = open(rollback_path, "a", encoding="utf-8") if rollback_path else None
+        try:
+            if log:
+                os.chmod(rollback_path, 0o600)
+            done, errors, elapsed = _apply_batches(samdb, ((dn, template) for dn in dns), len(dns),
+                                                   chunk_size or BATCH_CHUNK, log, on_progress, cancelled)
+        finally:
+            if log:
+                log.close()
+        return _batch_report("modifiés", done, len(dns), errors, elapsed, rollback_path)
+    except Exception as e:
+        return f"[ERROR] Modification par lots interrompue : {e}"
+
+def rollback_batch(samdb, rollback_path, chunk_size=None, on_progress=None, cancelled=None):
+    """Annule un lot de batch_modify en appliquant les opérations de son journal, du dernier objet au premier."""
+    try:
+        with open(rollback_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        entries.reverse()
+        changes = ((entry["dn"], entry["undo"]) for entry in entries)
+        done, errors, elapsed = _apply_batches(samdb, changes, len(entries), chunk_size or BATCH_CHUNK,
+                                               None, on_progress, cancelled)
+        return _batch_report("restaurés", done, len(entries), errors, elapsed)
+    except Exception as e:
+        return f"[ERROR] Annulation du lot impossible : {e}"
+
+# Lecture par tranches des attributs multivalués volumineux (groupes de plusieurs milliers
+# de membres) : "member;range=0-1499", puis "member;range=1500-2999", etc.
+RANGE_SIZE = 1500
+RANGED_ATTRS = ("member", "memberOf")
+
+def parse_range_name(name):
+    """
+    Décompose un nom d'attribut renvoyé par tranche :
+    'member;range=0-1499' -> ('member', 0, 1499) ; dernière tranche 'member;range=1500-*' -> ('member', 1500, None).
+    Un nom sans plage donne (name, None, None).
+    """
+    attr, sep, bounds = name.partition(";range=")
+    if not sep:
+        return name, None, None
+    low, _, high = bounds.partition("-")
+    return attr, int(low), None if high == "*" else int(high)
+
+def read_attribute_range(samdb, dn, attr, start=0, size=None):
+    """
+    Lit au plus 'size' valeurs de l'attribut 'attr' à partir de l'indice 'start'.
+    Renvoie (valeurs, indice de la tranche suivante ou None s'il n'y en a plus).
+    """
+    size = size or RANGE_SIZE
+    res = samdb.search(base=dn, scope=0, attrs=[f"{attr};range={start}-{start + size - 1}"])
+    if not res:
+        return [], None
+    msg = res[0]
+    for name in msg.keys():
+        base, low, high = parse_range_name(name)
+        if base.lower() != attr.lower():
+            continue
+        values = list(msg[name])
+        if low is None:
+            # Le serveur a ignoré la plage et renvoyé toutes les valeurs
+            return values[start:start + size], (start + size if len(values) > start + size else None)
+        return values, (None if high is None else high + 1)
+    return [], None
+
+def iter_attribute_values(samdb, dn, attr, size=None, start=0):
+    """
+    Renvoie les valeurs de l'attribut 'attr' tranche par tranche (listes d'au plus 'size' valeurs),
+    à partir de l'indice 'start'.
+    """
+    while start is not None:
+        values, start = read_attribute_range(samdb, dn, attr, start, size)
+        yield values
+
+def get_object_attributes(samdb, dn, all_attrs=False, use_cache=True):
     """
     Récupère les attributs de l'objet identifié par 'dn'.
     - all_attrs=False : on récupère un ensemble limité d'attributs (plus rapide et stable)
     - all_attrs=True  : on récupère tous les attributs (attrs=["*"]), ce qui est complet mais peut être lourd
+    Les attributs de RANGED_ATTRS ne sont renvoyés que pour leurs RANGE_SIZE premières valeurs
+    (nom "member;range=0-1499") : la suite se lit avec read_attribute_range.
+    Les résultats sont conservés dans 'attribute_cache' ; une entrée expirée est revalidée
+    par une simple lecture de uSNChanged avant d'être de nouveau téléchargée en entier.
     """
     try:
+        cached = attribute_cache.lookup(dn, all_attrs) if use_cache else None
+        if cached:
+            value, usn, expired = cached
+            if not expired:
+                return value
+            current = samdb.search(base=dn, scope=0, attrs=["uSNChanged"])
+            if current and first_text(current[0], "uSNChanged") == usn:
+                attribute_cache.touch(dn, all_attrs)
+                return value
+        first_range = [f"{attr};range=0-{RANGE_SIZE - 1}" for attr in RANGED_ATTRS]
         if all_attrs:
-            result = samdb.search(base=dn, scope=0, attrs=["*"])
+            result = samdb.search(base=dn, scope=0, attrs=["*"] + first_range)
         else:
-            default_attrs = ["cn", "description", "member", "objectClass", "distinguishedName"]
-            result = samdb.search(base=dn, scope=0, attrs=default_attrs)
-        return result[0] if result else None
+            default_attrs = ["cn", "description", "objectClass", "distinguishedName", "uSNChanged"]
+            result = samdb.search(base=dn, scope=0, attrs=default_attrs + first_range[:1])
+        if not result:
+            attribute_cache.invalidate(dn)
+            return None
+        attribute_cache.store(dn, all_attrs, result[0], first_text(result[0], "uSNChanged"))
+        return result[0]
     except Exception as e:
         return f"[ERROR] Impossible d'obtenir les attributs de l'objet {dn} : {e}"
 
-def search_objects(samdb, base, filter_expr, attrs=None):
+def search_objects(samdb, base, filter_expr, attrs=None, cancelled=None):
     """
     Effectue une recherche dans l'annuaire à partir d'une base DN, d'une expression filtre,
     et d'une liste d'attributs à récupérer (ou tous si None).
+    La recherche est paginée ; 'cancelled' (facultatif) est consulté entre deux pages
+    pour pouvoir l'interrompre.
     """
     try:
-        results = samdb.search(base=base, expression=filter_expr, attrs=attrs)
+        results = []
+        for page in iter_search_pages(samdb, base, filter_expr, attrs):
+            results.extend(page)
+            if cancelled and cancelled():
+                return "[ERROR] Recherche annulée."
         return results
     except Exception as e:
         return f"[ERROR] Recherche échouée : {e}"
 
+def delete_object(samdb, dn):
+    """
+    Supprime l'objet identifié par son DN (quel que soit son type).
+    """
+    try:
+        samdb.delete(dn)
+        attribute_cache.invalidate(dn)
+        membership.remove_node(dn)
+        return f"[OK] Objet '{dn}' supprimé."
+    except Exception as e:
+        return f"[ERROR] Impossible de supprimer '{dn}': {e}"
+
 def move_object(samdb, current_dn, new_dn):
     """
     Déplace (ou renomme) un objet de 'current_dn' vers 'new_dn'.
     """
     try:
         samdb.rename(current_dn, new_dn)
+        attribute_cache.invalidate(current_dn)
+        attribute_cache.invalidate(new_dn)
+        membership.rename_node(current_dn, new_dn)
         return f"[OK] Objet déplacé de {current_dn} vers {new_dn}."
     except Exception as e:
         return f"[ERROR] Échec du déplacement de l'objet : {e}"
@@ -293,28 +981,419 @@ def rename_object(samdb, old_dn, new_rdn):
     """
     Renomme un objet en changeant son RDN.
     Par exemple, pour renommer un utilisateur, 'new_rdn' pourra être "CN=nouveau_nom".
+    Un DN complet est aussi accepté.
     """
     try:
-        samdb.rename(old_dn, new_rdn)
+        parent = _split_dn(old_dn)[1]
+        new_dn = new_rdn if _dn_depth(new_rdn) > 1 or not parent else f"{new_rdn},{parent}"
+        samdb.rename(old_dn, new_dn)
+        attribute_cache.invalidate(old_dn)
+        attribute_cache.invalidate(new_dn)
+        membership.rename_node(old_dn, new_dn)
         return f"[OK] Objet renommé en {new_rdn}."
     except Exception as e:
         return f"[ERROR] Échec du renommage de l'objet : {e}"
 
-def refresh_data(domain_info):
-    """
-    Rafraîchit et retourne les données pour chaque onglet (OUs, Groupes, GPOs, Utilisateurs, Ordinateurs).
-    """
-    data = {}
-    data['ous'] = list_ous(domain_info["samdb"], domain_info["domain_dn"])
-    data['groupes'] = list_groups(domain_info["samdb"], domain_info["domain_dn"])
-    data['gpos'] = list_gpos(domain_info["samdb"], domain_info["domain_dn"])
-    data['users'] = list_users(domain_info["samdb"], domain_info["domain_dn"])
-    data['computers'] = list_computers(domain_info["samdb"], domain_info["domain_dn"])
-    data['dashboard'] = {
-         "OUs": len(data['ous']),
-         "Groupes": len(data['groupes']),
-         "GPOs": len(data['gpos']),
-         "Utilisateurs": len(data['users']),
-         "Ordinateurs": len(data['computers'])
-    }
+# --- Suppressions et déplacements groupés ---
+# Fréquence des rappels de progression (en objets traités)
+PROGRESS_EVERY = 25
+
+def _split_dn(dn):
+    """Sépare un DN en (RDN, DN parent), en tenant compte des virgules échappées."""
+    parts = re.split(r"(?<!\\),", str(dn), maxsplit=1)
+    return parts[0], (parts[1] if len(parts) > 1 else "")
+
+def _dn_depth(dn):
+    return len(re.split(r"(?<!\\),", str(dn)))
+
+def _apply_each(samdb, dns, action, on_progress=None, cancelled=None):
+    """
+    Applique 'action(conn, dn)' à chaque DN, à la suite sur une même connexion, sans relecture
+    de l'annuaire entre deux objets. Une erreur sur un objet est notée et n'arrête pas la suite,
+    sauf perte de la connexion. Renvoie (traités, erreurs [(dn, message)], durée en secondes).
+    """
+    started = time.perf_counter()
+    done = 0
+    errors = []
+    with connection(samdb) as conn:
+        for count, dn in enumerate(dns, 1):
+            if cancelled and cancelled():
+                break
+            try:
+                action(conn, dn)
+                done += 1
+            except ldb.LdbError as e:
+                if connection_lost(e):
+                    raise
+                errors.append((str(dn), str(e.args[-1] if e.args else e)))
+            if on_progress and (count % PROGRESS_EVERY == 0 or count == len(dns)):
+                on_progress(done, len(dns), len(errors))
+    return done, errors, time.perf_counter() - started
+
+def delete_objects(samdb, dns, on_progress=None, cancelled=None):
+    """
+    Supprime une liste d'objets (sélection multiple de la TUI), les plus profonds d'abord :
+    un objet sélectionné avec son conteneur est supprimé avant lui.
+    'on_progress(supprimés, total, erreurs)' est appelé au fil de l'eau.
+    """
+    def delete(conn, dn):
+        conn.delete(dn)
+        attribute_cache.invalidate(dn)
+        membership.remove_node(dn)
+    try:
+        dns = sorted({str(dn) for dn in dns}, key=_dn_depth, reverse=True)
+        done, errors, elapsed = _apply_each(samdb, dns, delete, on_progress, cancelled)
+        return _batch_report("supprimés", done, len(dns), errors, elapsed)
+    except Exception as e:
+        return f"[ERROR] Suppression groupée interrompue : {e}"
+
+def move_objects(samdb, dns, target_dn, on_progress=None, cancelled=None):
+    """
+    Déplace une liste d'objets dans le conteneur 'target_dn' en conservant leur RDN.
+    'on_progress(déplacés, total, erreurs)' est appelé au fil de l'eau.
+    """
+    def move(conn, dn):
+        new_dn = f"{_split_dn(dn)[0]},{target_dn}"
+        conn.rename(dn, new_dn)
+        attribute_cache.invalidate(dn)
+        attribute_cache.invalidate(new_dn)
+        membership.rename_node(dn, new_dn)
+    try:
+        dns = [str(dn) for dn in dns]
+        done, errors, elapsed = _apply_each(samdb, dns, move, on_progress, cancelled)
+        return _batch_report("déplacés", done, len(dns), errors, elapsed)
+    except Exception as e:
+        return f"[ERROR] Déplacement groupé interrompu : {e}"
+
+def load_membership(samdb, domain_dn, page_size=None, cancelled=None):
+    """
+    Charge dans 'membership' l'attribut 'member' de tous les groupes du domaine, en une
+    recherche paginée ; les tranches suivantes des groupes renvoyés par tranche
+    ("member;range=0-1499") sont lues ensuite. 'cancelled' (facultatif) est consulté
+    entre deux pages pour pouvoir interrompre le chargement.
+    """
+    try:
+        groups = []
+        for page in iter_search_pages(samdb, domain_dn, "(objectClass=group)", ["member"], page_size=page_size):
+            for msg in page:
+                members = []
+                for name in msg.keys():
+                    attr, start, end = parse_range_name(name)
+                    if attr.lower() != "member":
+                        continue
+                    members.extend(msg[name])
+                    if end is not None:
+                        for values in iter_attribute_values(samdb, msg.dn, "member", start=end + 1):
+                            members.extend(values)
+                groups.append((msg.dn, members))
+            if cancelled and cancelled():
+                return "[ERROR] Chargement des appartenances annulé."
+        membership.load(groups)
+        stats = membership.stats()
+        return f"[OK] {stats['groupes']} groupes, {stats['appartenances']} appartenances directes chargées."
+    except Exception as e:
+        return f"[ERROR] Impossible de charger les appartenances aux groupes : {e}"
+
+# Libellés du tableau de bord, par catégorie
+DASHBOARD_LABELS = {
+    "ous": "OUs",
+    "groupes": "Groupes",
+    "gpos": "GPOs",
+    "users": "Utilisateurs",
+    "computers": "Ordinateurs",
+}
+
+def new_data():
+    """
+    Données vides de la TUI : aucune catégorie chargée. Les catégories sont ensuite chargées
+    à la demande (load_categories) ; data['sync'] contient, par catégorie chargée, l'USN de
+    la dernière mise à jour ('usns'), sa date ('refreshed') et l'index objectGUID -> enregistrement.
+    """
+    data = {category: [] for category in CATEGORIES}
+    data['sync'] = {"server": None, "usns": {}, "refreshed": {}, "index": {}}
+    data['counts'] = {}
+    update_dashboard(data)
     return data
+
+def loaded_categories(data):
+    """Catégories dont la liste complète a été chargée (et peut être synchronisée)."""
+    return list(data['sync']["usns"])
+
+def update_dashboard(data):
+    """
+    Recalcule les compteurs du tableau de bord : taille de la liste pour les catégories
+    chargées, sinon nombre obtenu par count_categories, sinon "?".
+    """
+    loaded = data['sync']["usns"]
+    counts = data.get('counts', {})
+    data['dashboard'] = {label: len(data[category]) if category in loaded else counts.get(category, "?")
+                         for category, label in DASHBOARD_LABELS.items()}
+    return data['dashboard']
+
+def count_category(samdb, domain_dn, category):
+    """
+    Nombre d'entrées d'une catégorie sans les transférer : 'contentCount' de la réponse VLV
+    (une seule entrée demandée). Si le DC refuse le contrôle VLV, comptage d'une recherche
+    paginée ne renvoyant que les DN.
+    """
+    base, expression, attrs, convert = CATEGORIES[category]
+    base = base.format(domain_dn=domain_dn)
+    try:
+        res = samdb.search(base=base, scope=ldb.SCOPE_SUBTREE, expression=expression, attrs=["cn"],
+                           controls=["server_sort:1:0:cn", "vlv:1:0:0:1:0"])
+        for ctrl in res.controls or []:
+            fields = str(ctrl).split(":")
+            if fields[0] == "vlv_resp":
+                return int(fields[3])
+    except ldb.LdbError:
+        pass
+    return sum(len(page) for page in iter_search_pages(samdb, base, expression, ["dn"]))
+
+def count_categories(domain_info, data, categories=None):
+    """
+    Compte les entrées des catégories non chargées (ou de 'categories') pour le tableau de bord.
+    Renvoie data['counts'].
+    """
+    if categories is None:
+        categories = [category for category in CATEGORIES if category not in data['sync']["usns"]]
+    for category in categories:
+        data['counts'][category] = count_category(domain_info["samdb"], domain_info["domain_dn"], category)
+        update_dashboard(data)
+    return data['counts']
+
+def get_sync_point(samdb):
+    """
+    Renvoie (highestCommittedUSN, dsServiceName) du DC : les USN n'ont de sens
+    que pour le DC qui les a attribués.
+    """
+    result = samdb.search(base="", scope=0, attrs=["highestCommittedUSN", "dsServiceName"])
+    return int(first_text(result[0], "highestCommittedUSN")), first_text(result[0], "dsServiceName")
+
+def load_categories(domain_info, data, categories=None, page_size=None, on_page=None, merged=True):
+    """
+    (Re)charge intégralement les catégories données (toutes par défaut) dans 'data', sur place.
+    Les listes sont remplies page par page ; si 'on_page' est fourni, il est appelé avec
+    'data' après chaque page reçue (affichage progressif dans la TUI).
+    L'état de synchronisation de chaque catégorie (USN, date, index objectGUID -> enregistrement)
+    est conservé dans data['sync'] pour permettre ensuite des mises à jour incrémentales
+    (sync_data). Un même objet peut figurer dans plusieurs catégories (un ordinateur est
+    aussi un "user"), d'où un index par catégorie.
+    Par défaut une seule recherche couvre toutes les catégories demandées, réparties côté
+    client ; merged=False effectue une recherche par catégorie.
+    Renvoie les durées (en secondes) :
+      - merged=True : 'recherche' = attente des pages du DC, par catégorie = conversion des entrées ;
+      - merged=False : par catégorie = durée complète de sa recherche ;
+      - 'total' dans les deux cas.
+    """
+    samdb = domain_info["samdb"]
+    domain_dn = domain_info["domain_dn"]
+    categories = list(categories or CATEGORIES)
+    started = time.perf_counter()
+    state = data['sync']
+    usn, server = get_sync_point(samdb)
+    if server != state["server"]:
+        # Les USN d'un autre DC ne sont pas comparables : les autres catégories seront rechargées
+        for category in loaded_categories(data):
+            _forget_category(data, category)
+        state["server"] = server
+    for category in categories:
+        _forget_category(data, category)
+        data[category] = []
+        state["index"][category] = {}
+    timings = {category: 0.0 for category in categories}
+    update_dashboard(data)
+
+    def add(category, msg):
+        record = CATEGORIES[category][3](msg)
+        data[category].append(record)
+        if "objectGUID" in msg:
+            state["index"][category][bytes(msg["objectGUID"][0])] = record
+
+    def page_done():
+        update_dashboard(data)
+        if on_page:
+            on_page(data)
+
+    if merged and len(categories) > 1:
+        timings["recherche"] = 0.0
+        pages = _iter_all_messages(samdb, domain_dn, page_size, categories)
+        while True:
+            mark = time.perf_counter()
+            page = next(pages, None)
+            timings["recherche"] += time.perf_counter() - mark
+            if page is None:
+                break
+            decoded = {category: (timings[category], len(data[category])) for category in categories}
+            for msg, msg_categories in page:
+                for category in msg_categories:
+                    mark = time.perf_counter()
+                    add(category, msg)
+                    timings[category] += time.perf_counter() - mark
+            for category, (elapsed, count) in decoded.items():
+                if len(data[category]) > count:
+                    metrics.observe("décodage", category, timings[category] - elapsed, len(data[category]) - count)
+            page_done()
+    else:
+        for category in categories:
+            mark = time.perf_counter()
+            for page in _iter_category_messages(samdb, domain_dn, category, page_size):
+                decode_started = time.perf_counter()
+                for msg in page:
+                    add(category, msg)
+                metrics.observe("décodage", category, time.perf_counter() - decode_started, len(page))
+                timings[category] += time.perf_counter() - mark
+                page_done()
+                mark = time.perf_counter()
+    now = time.time()
+    for category in categories:
+        state["usns"][category] = usn
+        state["refreshed"][category] = now
+    update_dashboard(data)
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+def _forget_category(data, category):
+    """Marque une catégorie comme non chargée (sa liste reste affichée jusqu'au prochain chargement)."""
+    state = data['sync']
+    state["usns"].pop(category, None)
+    state["refreshed"].pop(category, None)
+    state["index"].pop(category, None)
+
+def refresh_data(domain_info, page_size=None, on_page=None, merged=True, categories=None):
+    """
+    Charge et retourne les données de toutes les catégories (ou de 'categories') :
+    voir load_categories. Les durées sont renvoyées dans data['timings'].
+    """
+    data = new_data()
+    data['timings'] = load_categories(domain_info, data, categories, page_size, on_page, merged)
+    return data
+
+def _remove_records(data, removed):
+    """Retire des listes les enregistrements donnés ({catégorie: [enregistrements]}) en une passe par liste."""
+    for category, records in removed.items():
+        if not records:
+            continue
+        ids = {id(record) for record in records}
+        data[category][:] = [record for record in data[category] if id(record) not in ids]
+
+def sync_data(domain_info, data, page_size=None, categories=None):
+    """
+    Synchronisation incrémentale des catégories chargées (ou de celles de 'categories') :
+    ne récupère que les entrées créées, modifiées, déplacées ou supprimées depuis l'USN de
+    chaque catégorie (data['sync']) et corrige 'data' sur place.
+    Renvoie le nombre d'entrées traitées, ou un message d'erreur (un rechargement complet
+    via load_categories est alors nécessaire).
+    """
+    try:
+        samdb = domain_info["samdb"]
+        domain_dn = domain_info["domain_dn"]
+        state = data['sync']
+        highest, server = get_sync_point(samdb)
+        if server != state["server"]:
+            return f"[ERROR] Les données proviennent d'un autre DC ({state['server']})."
+        usns = state["usns"]
+        pending = [category for category in (categories or CATEGORIES)
+                   if category in usns and usns[category] < highest]
+        now = time.time()
+        for category in categories or CATEGORIES:
+            if category in usns and category not in pending:
+                state["refreshed"][category] = now
+        if not pending:
+            return 0
+        since = min(usns[category] for category in pending) + 1
+        changed = 0
+        seen = set()
+        removed = {category: [] for category in pending}
+        # Entrées créées ou modifiées, catégorie par catégorie (recherches indexées sur uSNChanged)
+        for category in pending:
+            convert = CATEGORIES[category][3]
+            index = state["index"][category]
+            for page in _iter_category_messages(samdb, domain_dn, category, page_size, since_usn=usns[category] + 1):
+                for msg in page:
+                    guid = bytes(msg["objectGUID"][0])
+                    seen.add((category, guid))
+                    record = convert(msg)
+                    known = index.get(guid)
+                    if known is not None:
+                        # Mêmes clés pour toute la catégorie : mise à jour sur place sans vider
+                        # l'enregistrement (il peut être lu au même moment par l'interface).
+                        known.update(record)
+                    else:
+                        data[category].append(record)
+                        index[guid] = record
+                    changed += 1
+        # Entrées modifiées qui ne correspondent plus à leur catégorie (déplacées hors de sa base, etc.).
+        # Les catégories n'ont pas toutes le même USN : une entrée n'est retirée que si elle a
+        # changé après le chargement de la catégorie.
+        for page in iter_search_pages(samdb, domain_dn, f"(uSNChanged>={since})", ["objectGUID", "uSNChanged"]):
+            for msg in page:
+                guid = bytes(msg["objectGUID"][0])
+                usn = int(first_text(msg, "uSNChanged") or highest)
+                for category in pending:
+                    index = state["index"][category]
+                    if guid in index and usn > usns[category] and (category, guid) not in seen:
+                        removed[category].append(index.pop(guid))
+                        changed += 1
+        # Entrées supprimées (objets "tombstone" du conteneur Deleted Objects)
+        deleted = samdb.search(base=f"CN=Deleted Objects,{domain_dn}", scope=ldb.SCOPE_SUBTREE,
+                               expression=f"(&(isDeleted=TRUE)(uSNChanged>={since}))",
+                               attrs=["objectGUID"], controls=["show_deleted:1"])
+        for msg in deleted:
+            guid = bytes(msg["objectGUID"][0])
+            for category in pending:
+                index = state["index"][category]
+                if guid in index:
+                    removed[category].append(index.pop(guid))
+                    changed += 1
+        _remove_records(data, removed)
+        for category in pending:
+            usns[category] = highest
+            state["refreshed"][category] = now
+        update_dashboard(data)
+        return changed
+    except Exception as e:
+        return f"[ERROR] Synchronisation incrémentale impossible : {e}"
+
+def load_data(domain_info, data=None, snapshot_path=DEFAULT_SNAPSHOT_PATH, max_age=SNAPSHOT_TTL, page_size=None,
+              on_page=None, categories=()):
+    """
+    Prépare les données des onglets (dans 'data', ou de nouvelles données) en repartant,
+    si possible, de l'instantané local ('snapshot_path', ignoré s'il vaut None) : seuls
+    les changements survenus depuis sont alors demandés au DC (sync_data). Les catégories
+    de 'categories' absentes de l'instantané sont ensuite chargées intégralement ; les
+    autres le seront à la demande (load_categories). Un nouvel instantané est enregistré
+    si des données ont été obtenues du DC.
+    """
+    if data is None:
+        data = new_data()
+    changed = 0
+    restored = (load_snapshot(snapshot_path, domain_info["domain_dn"], CATEGORIES, max_age,
+                              make_record=lambda category, values: RECORD_TYPES[category](**values))
+                if snapshot_path else None)
+    if restored is not None:
+        for category in restored['sync']["usns"]:
+            data[category] = restored[category]
+        data['sync'] = restored['sync']
+        update_dashboard(data)
+        if on_page:
+            on_page(data)
+        changed = sync_data(domain_info, data, page_size)
+        if isinstance(changed, str):
+            # Instantané inutilisable (autre DC, USN trop ancien...) : rechargement de ses catégories
+            stale = loaded_categories(data)
+            data['sync'] = new_data()['sync']
+            load_categories(domain_info, data, stale, page_size, on_page)
+    missing = [category for category in categories if category not in data['sync']["usns"]]
+    if missing:
+        load_categories(domain_info, data, missing, page_size, on_page)
+    if snapshot_path and (changed or missing or restored is None) and loaded_categories(data):
+        save_snapshot(snapshot_path, domain_info["domain_dn"], data)
+    if on_page:
+        on_page(data)
+    return data
+
+if __name__ == "__main__":
+    # "python -m samba_ad ..." : interface en ligne de commande (voir cli.py)
+    import sys
+    from cli import main
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import unicodedata
+from collections.abc import Mapping
+
+
+def normalize(value):
+    """Clé de recherche : minuscules, sans accents, espaces multiples réduits."""
+    value = str(value).lower()
+    if not value.isascii():
+        value = "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+    return " ".join(value.split())
+
+
+class SearchIndex:
+    """
+    Index de recherche d'une liste d'éléments (un onglet de la TUI), construit une seule fois.
+    - 'fields' associe un préfixe de requête à une clé des enregistrements,
+      ex. {"sam": "sAMAccountName", "desc": "description"} pour "sam:jdoe desc:contractor".
+    - Les termes sans préfixe portent sur l'ensemble des champs.
+    - Une requête qui précise la précédente (frappe au fil de l'eau) ne filtre que le
+      résultat précédent au lieu de reparcourir toute la liste.
+    """
+
+    def __init__(self, items, fields=None):
+        self.fields = fields or {}
+        self.size = len(items)
+        self.keys = {}
+        for alias, key in self.fields.items():
+            self.keys[alias] = [normalize(item.get(key, "")) if isinstance(item, Mapping) else ""
+                                for item in items]
+        if self.fields:
+            self.keys[None] = ["\n".join(values) for values in zip(*(self.keys[a] for a in self.fields))]
+        else:
+            self.keys[None] = [normalize(item) for item in items]
+        self._last_terms = None
+        self._last_ids = None
+
+    def parse(self, query):
+        """Découpe la requête en termes (champ ou None, valeur normalisée)."""
+        terms = []
+        for token in query.split():
+            field, sep, value = token.partition(":")
+            if sep and field.lower() in self.fields:
+                terms.append((field.lower(), normalize(value)))
+            else:
+                terms.append((None, normalize(token)))
+        return [term for term in terms if term[1]]
+
+    @staticmethod
+    def _narrows(previous, terms):
+        """Vrai si chaque terme précédent est impliqué par un terme de la nouvelle requête."""
+        return all(any(f == pf and pv in v for f, v in terms) for pf, pv in previous)
+
+    def search(self, query):
+        """Renvoie la liste des indices des éléments correspondant à tous les termes de 'query'."""
+        terms = self.parse(query)
+        ids = None
+        if self._last_ids is not None and self._narrows(self._last_terms, terms):
+            ids = self._last_ids
+        # Le terme le plus long est en général le plus sélectif : il réduit d'abord les candidats
+        for field, value in sorted(terms, key=lambda term: -len(term[1])):
+            keys = self.keys[field]
+            if ids is None:
+                ids = [i for i, key in enumerate(keys) if value in key]
+            else:
+                ids = [i for i in ids if value in keys[i]]
+        if ids is None:
+            ids = list(range(self.size))
+        self._last_terms, self._last_ids = terms, ids
+        return ids
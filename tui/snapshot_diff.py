@@ -0,0 +1,280 @@
+import argparse
+import getpass
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import zlib
+
+import ldb
+from cli import iter_ldif_records, message_record
+from export import EXPORT_KINDS, MANIFEST_NAME, complete_ranged
+from samba_ad import detect_domain_settings, connection, iter_search_pages
+
+# Nombre de partitions (fichiers temporaires par instantané) : pour 500 000 entrées, environ
+# 8 000 entrées d'un seul instantané en mémoire à la fois
+PARTITIONS = 64
+# Attributs qui changent sans action d'un administrateur (connexions, réplication) ;
+# comparés seulement avec --all-attributes
+VOLATILE_ATTRS = {
+    "usnchanged", "whenchanged", "dscorepropagationdata", "lastlogon", "lastlogontimestamp", "lastlogoff",
+    "logoncount", "badpwdcount", "badpasswordtime", "lockouttime", "replpropertymetadata", "replupdatevector",
+    "msds-lastsuccessfulinteractivelogontime", "msds-lastfailedinteractivelogontime", "pwdlastset",
+    "msds-revealedlist", "repsfrom", "repsto", "modifytimestamp",
+}
+# Attributs déjà couverts par le changement de DN
+DN_ATTRS = {"distinguishedname", "dn"}
+# Séparation RDN / parent d'un DN (virgule non échappée)
+_DN_SPLIT = re.compile(r"(?<!\\),")
+
+
+# --- Lecture des instantanés ---
+def _open_text(path):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+def iter_file_records(path):
+    """Enregistrements (dictionnaires de cli.message_record) d'un fichier .jsonl ou .ldif, compressé ou non."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open_text(path) as f:
+        if name.endswith(".ldif"):
+            parser = ldb.Ldb()
+            for text in iter_ldif_records(f):
+                for _, msg in parser.parse_ldif(text):
+                    yield message_record(msg)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def iter_snapshot(path):
+    """Enregistrements d'un export (répertoire avec manifeste) ou d'un fichier isolé."""
+    if not os.path.isdir(path):
+        yield from iter_file_records(path)
+        return
+    manifest = read_manifest(path)
+    for shard in manifest["shards"]:
+        if "error" in shard:
+            raise ValueError(f"export incomplet : fragment {shard['name']} en erreur")
+        yield from iter_file_records(os.path.join(path, shard["file"]))
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+def iter_live(domain_info, kinds=None):
+    """Enregistrements de l'annuaire, lus comme par tui/export.py (mêmes catégories et attributs)."""
+    samdb, domain_dn = domain_info["samdb"], domain_info["domain_dn"]
+    with connection(samdb) as conn:
+        for kind, expression in (kinds or EXPORT_KINDS).items():
+            for page in iter_search_pages(conn, domain_dn, expression, ["*"]):
+                for msg in page:
+                    complete_ranged(conn, msg)
+                    yield message_record(msg)
+
+
+# --- Comparaison ---
+def record_key(record):
+    """Clé d'alignement : objectGUID, ou le DN (en minuscules) à défaut."""
+    guid = record.get("objectGUID")
+    if isinstance(guid, list):
+        guid = guid[0] if guid else None
+    return str(guid).lower() if guid else "dn:" + str(record.get("dn", "")).lower()
+
+def _partition(key, count):
+    return zlib.crc32(key.encode("utf-8")) % count
+
+def _values(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def _value_key(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+
+def diff_attributes(old, new, ignored=VOLATILE_ATTRS):
+    """Valeurs ajoutées et retirées par attribut (comparées comme des ensembles, noms sans casse)."""
+    old_names = {name.lower(): name for name in old}
+    new_names = {name.lower(): name for name in new}
+    changes = {}
+    for key in sorted(old_names.keys() | new_names.keys()):
+        if key in DN_ATTRS or key in ignored:
+            continue
+        before = _values(old.get(old_names.get(key)))
+        after = _values(new.get(new_names.get(key)))
+        if before == after:
+            continue
+        before_keys = {_value_key(v): v for v in before}
+        after_keys = {_value_key(v): v for v in after}
+        change = {}
+        added = sorted(after_keys.keys() - before_keys.keys())
+        removed = sorted(before_keys.keys() - after_keys.keys())
+        if added:
+            change["add"] = [after_keys[k] for k in added]
+        if removed:
+            change["delete"] = [before_keys[k] for k in removed]
+        if change:
+            changes[new_names.get(key) or old_names[key]] = change
+    return changes
+
+def diff_entry(old, new, ignored=VOLATILE_ATTRS):
+    """Changement d'un objet (None s'il est inchangé) ; 'old' ou 'new' vaut None pour un ajout ou une suppression."""
+    if old is None:
+        return {"change": "add", "objectGUID": new.get("objectGUID"), "dn": new.get("dn"),
+                "attributes": diff_attributes({}, new, ignored)}
+    if new is None:
+        return {"change": "delete", "objectGUID": old.get("objectGUID"), "dn": old.get("dn"),
+                "attributes": diff_attributes(old, {}, ignored)}
+    attributes = diff_attributes(old, new, ignored)
+    old_dn, new_dn = str(old.get("dn")), str(new.get("dn"))
+    if old_dn != new_dn:
+        same_parent = _DN_SPLIT.split(old_dn, 1)[-1].lower() == _DN_SPLIT.split(new_dn, 1)[-1].lower()
+        return {"change": "rename" if same_parent else "move", "objectGUID": new.get("objectGUID"), "dn": new_dn,
+                "old_dn": old_dn, "attributes": attributes}
+    if attributes:
+        return {"change": "modify", "objectGUID": new.get("objectGUID"), "dn": new_dn, "attributes": attributes}
+    return None
+
+def _split(records, directory, prefix, count, ignored=VOLATILE_ATTRS):
+    """Répartit les enregistrements, sans les attributs ignorés, dans 'count' fichiers selon leur clé."""
+    files = [open(os.path.join(directory, f"{prefix}-{i}.jsonl"), "w", encoding="utf-8") for i in range(count)]
+    total = 0
+    try:
+        for record in records:
+            key = record_key(record)
+            if ignored:
+                record = {name: value for name, value in record.items() if name.lower() not in ignored}
+            # Ligne "clé<TAB>enregistrement" (JSON tous deux : la clé ne contient pas de tabulation)
+            files[_partition(key, count)].write(json.dumps(key) + "\t" + json.dumps(record, ensure_ascii=False) + "\n")
+            total += 1
+    finally:
+        for f in files:
+            f.close()
+    return total
+
+class DiffRun:
+    """Changements entre deux suites d'enregistrements alignées par objectGUID ; décomptes dans 'summary'."""
+
+    def __init__(self, old_records, new_records, partitions=PARTITIONS, ignored=VOLATILE_ATTRS, workdir=None):
+        self.old_records = old_records
+        self.new_records = new_records
+        self.partitions = max(1, partitions)
+        self.ignored = ignored
+        self.workdir = workdir
+        self.summary = {"old": 0, "new": 0, "unchanged": 0, "add": 0, "delete": 0, "move": 0, "rename": 0, "modify": 0}
+
+    def __iter__(self):
+        with tempfile.TemporaryDirectory(prefix="samba-ad-diff-", dir=self.workdir) as directory:
+            self.summary["old"] = _split(self.old_records, directory, "old", self.partitions, self.ignored)
+            self.summary["new"] = _split(self.new_records, directory, "new", self.partitions, self.ignored)
+            for index in range(self.partitions):
+                yield from self._diff_partition(directory, index)
+
+    def _diff_partition(self, directory, index):
+        # Ancien instantané : lignes brutes, décodées seulement pour les objets à comparer
+        with open(os.path.join(directory, f"old-{index}.jsonl"), encoding="utf-8") as f:
+            old = dict(line.split("\t", 1) for line in f)
+        # Un objet déplacé pendant un export par OU peut figurer dans deux fragments : compté une fois
+        seen = set()
+        with open(os.path.join(directory, f"new-{index}.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                key, text = line.split("\t", 1)
+                if key in seen:
+                    continue
+                seen.add(key)
+                old_text = old.pop(key, None)
+                if old_text == text:
+                    self.summary["unchanged"] += 1
+                    continue
+                change = diff_entry(json.loads(old_text) if old_text is not None else None, json.loads(text),
+                                    self.ignored)
+                if change is None:
+                    self.summary["unchanged"] += 1
+                    continue
+                self.summary[change["change"]] += 1
+                yield change
+        for text in old.values():
+            change = diff_entry(json.loads(text), None, self.ignored)
+            self.summary["delete"] += 1
+            yield change
+
+
+# --- Sortie ---
+def _text_value(value):
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+def format_change(change):
+    """Lignes de texte d'un changement (--format text)."""
+    symbol = {"add": "+", "delete": "-", "move": ">", "rename": ">", "modify": "~"}[change["change"]]
+    head = f"{symbol} {change['dn']}"
+    if "old_dn" in change:
+        head = f"{symbol} {change['old_dn']} -> {change['dn']}"
+    lines = [head]
+    if change["change"] in ("add", "delete"):
+        return lines
+    for attr, values in change["attributes"].items():
+        lines.extend(f"    {attr}: -{_text_value(v)}" for v in values.get("delete", []))
+        lines.extend(f"    {attr}: +{_text_value(v)}" for v in values.get("add", []))
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Différences entre deux instantanés de l'annuaire (alignés par objectGUID).",
+                                     epilog="Code de sortie : 0 sans changement, 1 s'il y en a, 2 en cas d'erreur.")
+    parser.add_argument("old", help="ancien instantané : répertoire d'export ou fichier .jsonl/.ldif[.gz]")
+    parser.add_argument("new", nargs="?", help="nouvel instantané (sinon --live)")
+    parser.add_argument("--live", action="store_true", help="comparer avec l'annuaire actuel")
+    parser.add_argument("--user", default=os.environ.get("SAMBA_AD_USER"),
+                        help="compte administrateur Samba AD pour --live (défaut : $SAMBA_AD_USER)")
+    parser.add_argument("--url", help="URL de l'annuaire pour --live (défaut : $SAMBA_AD_URL ou ldap://localhost)")
+    parser.add_argument("--format", choices=["jsonl", "text"], default="jsonl")
+    parser.add_argument("--output", help="fichier des changements (défaut : sortie standard)")
+    parser.add_argument("--all-attributes", action="store_true",
+                        help="comparer aussi les attributs volatils (dernière connexion, réplication...)")
+    parser.add_argument("--partitions", type=int, default=PARTITIONS, help="fichiers temporaires par instantané")
+    parser.add_argument("--tmpdir", help="répertoire des fichiers temporaires")
+    args = parser.parse_args(argv)
+
+    if bool(args.new) == args.live:
+        print("[ERROR] Indiquer soit un nouvel instantané, soit --live.", file=sys.stderr)
+        return 2
+    if args.live:
+        if not args.user:
+            print("[ERROR] Compte administrateur requis (--user ou $SAMBA_AD_USER).", file=sys.stderr)
+            return 2
+        admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+        domain_info = detect_domain_settings(args.user, admin_password, url=args.url, pool_size=1)
+        if isinstance(domain_info, str):
+            print(domain_info, file=sys.stderr)
+            return 2
+        # Mêmes catégories que l'export de référence
+        kinds = read_manifest(args.old).get("kinds") if os.path.isdir(args.old) else None
+        new_records = iter_live(domain_info, kinds)
+    else:
+        new_records = iter_snapshot(args.new)
+
+    run = DiffRun(iter_snapshot(args.old), new_records, args.partitions,
+                  set() if args.all_attributes else VOLATILE_ATTRS, args.tmpdir)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for change in run:
+            if args.format == "text":
+                out.write("\n".join(format_change(change)) + "\n")
+            else:
+                out.write(json.dumps(change, ensure_ascii=False) + "\n")
+    except BrokenPipeError:
+        return 0
+    except (OSError, ValueError, KeyError, ldb.LdbError) as e:
+        print(f"[ERROR] Comparaison impossible : {e}", file=sys.stderr)
+        return 2
+    finally:
+        if args.output:
+            out.close()
+    s = run.summary
+    print(f"[OK] {s['old']} -> {s['new']} objets : {s['add']} ajout(s), {s['delete']} suppression(s), "
+          f"{s['move']} déplacement(s), {s['rename']} renommage(s), {s['modify']} modification(s), "
+          f"{s['unchanged']} inchangé(s).", file=sys.stderr)
+    return 1 if any(s[kind] for kind in ("add", "delete", "move", "rename", "modify")) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
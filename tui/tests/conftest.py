@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules de la TUI sont importés à plat (import samba_ad, import records...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
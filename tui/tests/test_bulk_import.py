@@ -0,0 +1,107 @@
+import os
+import stat
+
+import pytest
+
+ldb = pytest.importorskip("ldb")
+import bulk_import
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_read_csv_records_source_lines(tmp_path):
+    path = write(tmp_path / "users.csv",
+                 "username,password,ou,groups\n"
+                 "jdoe,Secret1!,OU=Finance,G1; G2 \n"
+                 "asmith,,,\n")
+    records = bulk_import.read_csv(path)
+    assert [r["username"] for r in records] == ["jdoe", "asmith"]
+    assert records[0]["groups"] == ["G1", "G2"]
+    assert records[0]["ou"] == "OU=Finance"
+    # L'en-tête compte : la première entrée est à la ligne 2
+    assert [r["source"] for r in records] == ["Ligne 2", "Ligne 3"]
+
+
+def test_read_ldif_fields_are_text(tmp_path):
+    path = write(tmp_path / "users.ldif",
+                 "dn: CN=John Doe,OU=Finance,DC=ex,DC=com\n"
+                 "sAMAccountName: jdoe\n"
+                 "givenName: John\n"
+                 "sn: Doe\n"
+                 "userPassword: Secret1!\n"
+                 "memberOf: CN=Compta,OU=Groups,DC=ex,DC=com\n"
+                 "\n"
+                 "dn: CN=asmith,CN=Users,DC=ex,DC=com\n"
+                 "sAMAccountName: asmith\n")
+    first, second = bulk_import.read_ldif(path)
+    assert first["username"] == "jdoe"
+    assert first["password"] == "Secret1!"
+    assert first["given_name"] == "John" and first["surname"] == "Doe"
+    assert first["ou"] == "OU=Finance,DC=ex,DC=com"
+    assert first["groups"] == ["CN=Compta,OU=Groups,DC=ex,DC=com"]
+    for record in (first, second):
+        for field in bulk_import.CSV_FIELDS:
+            value = record[field]
+            assert all(type(v) is str for v in value) if field == "groups" else type(value) is str
+    assert second["groups"] == []
+    assert [first["source"], second["source"]] == ["Enregistrement 1", "Enregistrement 2"]
+
+
+class Result(list):
+    pass
+
+
+class AccountSearch:
+    """SamDB minimal : la recherche de comptes renvoie des valeurs en octets, comme pyldb."""
+
+    def __init__(self, names):
+        self.names = names
+
+    def search(self, base=None, expression=None, attrs=None, scope=None):
+        return Result({"sAMAccountName": [name.encode()]} for name in self.names if f"={name})" in expression)
+
+
+def test_existing_accounts_decodes_values():
+    samdb = AccountSearch(["JDoe", "other"])
+    assert bulk_import._existing_accounts(samdb, "DC=ex,DC=com", {"jdoe", "JDoe"}) == {"jdoe"}
+
+
+def test_validation_reports_source_line(tmp_path):
+    path = write(tmp_path / "users.csv", "username\nok\nbad*name\n")
+    records = bulk_import.read_csv(path)
+
+    class Directory(AccountSearch):
+        def search(self, base=None, expression=None, attrs=None, scope=None):
+            if scope == ldb.SCOPE_BASE:
+                return Result([object()])
+            return super().search(base, expression, attrs, scope)
+
+    # Reprise : la première entrée est déjà traitée, l'erreur garde la ligne du fichier
+    errors, _ = bulk_import.validate_records(Directory([]), "DC=ex,DC=com", records[1:])
+    assert errors == [("Ligne 3", "bad*name", "caractère interdit dans le nom d'utilisateur")]
+
+
+def test_report_round_trip(tmp_path):
+    path = str(tmp_path / "report.csv")
+    f, writer = bulk_import.open_report(path)
+    writer.writerow(["jdoe", "CN=jdoe,CN=Users,DC=ex,DC=com", "PARTIAL", "groupe", "pw"])
+    writer.writerow(["asmith", "CN=asmith,CN=Users,DC=ex,DC=com", "ERROR", "refus", ""])
+    f.close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    f, writer = bulk_import.open_report(path, append=True)
+    writer.writerow(["asmith", "CN=asmith,CN=Users,DC=ex,DC=com", "OK", "", "pw2"])
+    f.close()
+    with open(path, encoding="utf-8") as report:
+        assert report.read().count("username,dn") == 1
+    assert bulk_import.load_report(path) == {"jdoe": "CN=jdoe,CN=Users,DC=ex,DC=com",
+                                             "asmith": "CN=asmith,CN=Users,DC=ex,DC=com"}
+
+
+def test_generate_password_has_all_classes():
+    password = bulk_import.generate_password(16)
+    assert len(password) == 16
+    assert any(c.islower() for c in password) and any(c.isupper() for c in password)
+    assert any(c.isdigit() for c in password) and any(not c.isalnum() for c in password)
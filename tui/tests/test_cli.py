@@ -0,0 +1,34 @@
+import io
+import json
+import types
+
+import pytest
+
+pytest.importorskip("ldb")
+import cli
+
+
+def run(tmp_path, lines, monkeypatch):
+    monkeypatch.setitem(cli.OPERATIONS, "echo", (lambda samdb, domain_dn, name: f"[OK] {name} dans {domain_dn}",
+                                                 ["domain_dn", "name"]))
+    path = tmp_path / "ops.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    out = io.StringIO()
+    counts = cli.cmd_run({"samdb": None, "domain_dn": "DC=ex,DC=com"},
+                         types.SimpleNamespace(file=str(path), stop_on_error=False), out)
+    return counts, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_run_reports_invalid_lines_and_continues(tmp_path, monkeypatch):
+    lines = ['5', '[]', '"x"', '{"op": ["echo"]}', '{"op": {"a": 1}}', '{"op": "nope"}', 'pas du json',
+             '{"op": "echo"}', '{"op": "echo", "name": "jdoe"}']
+    (done, errors), results = run(tmp_path, lines, monkeypatch)
+    assert (done, errors) == (1, 8)
+    assert [r["status"] for r in results] == ["ERROR"] * 8 + ["OK"]
+    assert results[-1]["message"] == "[OK] jdoe dans DC=ex,DC=com"
+    assert [r["line"] for r in results] == list(range(1, 10))
+
+
+def test_iter_ldif_records_splits_on_blank_lines():
+    stream = io.StringIO("version: 1\n# commentaire\ndn: CN=a\ncn: a\n\n\ndn: CN=b\ncn: b\n")
+    assert list(cli.iter_ldif_records(stream)) == ["dn: CN=a\ncn: a\n", "dn: CN=b\ncn: b\n"]
@@ -0,0 +1,61 @@
+from membership import MembershipGraph
+
+D = "DC=ex,DC=com"
+ADMINS, STAFF, ALL = f"CN=Admins,{D}", f"CN=Staff,{D}", f"CN=All,{D}"
+JDOE = f"CN=Doe\\, John,OU=Sales,{D}"
+
+
+def graph():
+    g = MembershipGraph()
+    g.load([(ADMINS, [JDOE]), (STAFF, [ADMINS, f"CN=asmith,{D}"]), (ALL, [STAFF])])
+    return g
+
+
+def test_not_loaded_updates_are_ignored():
+    g = MembershipGraph()
+    g.set_members(ADMINS, [JDOE])
+    assert not g.loaded and g.direct_members(ADMINS) == []
+
+
+def test_effective_members_and_member_of():
+    g = graph()
+    assert g.direct_groups(JDOE.lower()) == [ADMINS]
+    assert g.member_of(JDOE) == [ADMINS, ALL, STAFF]
+    assert g.effective_members(ALL, groups_only=True) == [ADMINS, STAFF]
+    assert g.is_member(JDOE, ALL) and not g.is_member(ALL, JDOE)
+
+
+def test_incremental_updates():
+    g = graph()
+    g.add_members(ADMINS, [f"CN=bob,{D}"])
+    g.remove_members(STAFF, [ADMINS.upper()])
+    assert g.direct_members(ADMINS) == [JDOE, f"CN=bob,{D}"]
+    assert not g.is_member(JDOE, ALL)
+    g.remove_node(f"OU=Sales,{D}")
+    assert g.direct_members(ADMINS) == [f"CN=bob,{D}"]
+    assert g.direct_groups(JDOE) == []
+
+
+def test_cycles():
+    g = graph()
+    g.add_members(ADMINS, [ALL])
+    assert g.cycles() == [[ADMINS, ALL, STAFF]]
+    assert "Cycle d'imbrication 1" in g.describe(STAFF)
+
+
+def test_rename_with_rdn_keeps_parent_and_descendants():
+    g = graph()
+    child = f"CN=laptop,{JDOE}"
+    g.add_members(ALL, [child])
+    g.rename_node(JDOE.lower(), "CN=Doe\\, Jane")
+    renamed = f"CN=Doe\\, Jane,OU=Sales,{D}"
+    assert g.direct_members(ADMINS) == [renamed]
+    assert g.direct_groups(f"CN=laptop,{renamed}") == [ALL]
+    assert g.direct_groups(JDOE) == []
+
+
+def test_move_with_full_dn():
+    g = graph()
+    g.rename_node(f"OU=Sales,{D}", f"OU=Ventes,OU=Europe,{D}")
+    assert g.direct_members(ADMINS) == [f"CN=Doe\\, John,OU=Ventes,OU=Europe,{D}"]
+    assert g.member_of(f"cn=doe\\, john,ou=ventes,ou=europe,{D}") == [ADMINS, ALL, STAFF]
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from pool import ConnectionPool
+
+
+class Connector:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        if self.fail:
+            raise OSError("DC injoignable")
+        with self.lock:
+            self.opened += 1
+            number = self.opened
+        time.sleep(self.delay)
+        return f"conn{number}"
+
+
+class YieldingLock:
+    """Verrou qui cède la main à sa libération : élargit la fenêtre entre deux sections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        time.sleep(0.001)
+
+
+def test_concurrent_acquire_never_exceeds_size():
+    connect = Connector(delay=0.02)
+    pool = ConnectionPool(connect, size=3)
+    pool._lock = YieldingLock()
+    threads = [threading.Thread(target=lambda: pool.release(pool.acquire())) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert connect.opened == 3
+    assert pool.stats() == {"ouvertes": 3, "disponibles": 3, "reconnexions": 0}
+
+
+def test_last_released_is_reused_first():
+    pool = ConnectionPool(Connector(), size=2)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire() == second
+
+
+def test_failed_open_releases_the_slot():
+    connect = Connector(fail=True)
+    pool = ConnectionPool(connect, size=1)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()["ouvertes"] == 0
+    connect.fail = False
+    assert pool.acquire() == "conn1"
+
+
+def test_failed_health_check_reopens_in_same_slot():
+    def check(conn):
+        raise OSError("expirée")
+    pool = ConnectionPool(Connector(), size=1, check=check, health_interval=-1)
+    pool.release(pool.acquire())
+    assert pool.acquire() == "conn2"
+    assert pool.stats() == {"ouvertes": 1, "disponibles": 0, "reconnexions": 1}
+
+
+def test_lease_discards_lost_connections():
+    pool = ConnectionPool(Connector(), size=1, lost=lambda exc: isinstance(exc, ConnectionError))
+    with pytest.raises(ConnectionError):
+        with pool.lease():
+            raise ConnectionError()
+    with pytest.raises(ValueError):
+        with pool.lease():
+            raise ValueError()
+    assert pool.stats() == {"ouvertes": 1, "disponibles": 1, "reconnexions": 1}
@@ -0,0 +1,56 @@
+import sys
+
+from records import GroupRecord, UserRecord, record_type
+
+DN = "CN=John Doe,OU=Sales,DC=ex,DC=com"
+
+
+def user(**values):
+    return UserRecord(**dict({"cn": "John Doe", "sAMAccountName": "jdoe", "description": "Ventes", "dn": DN},
+                             **values))
+
+
+def test_reads_like_a_dict():
+    record = user()
+    assert record["dn"] == DN
+    assert dict(record) == {"cn": "John Doe", "sAMAccountName": "jdoe", "description": "Ventes", "dn": DN}
+    assert record.get("missing", "x") == "x"
+    assert not hasattr(record, "__dict__")
+
+
+def test_rdn_shortcut_and_shared_parent():
+    first, second = user(), user(cn="Jane", dn="CN=Jane,OU=Sales,DC=ex,DC=com")
+    assert first._rdn == "CN"
+    assert first._parent is second._parent
+    other = user(dn="CN=Someone Else,OU=Sales,DC=ex,DC=com")
+    assert other._rdn == "CN=Someone Else"
+    assert other.dn == "CN=Someone Else,OU=Sales,DC=ex,DC=com"
+
+
+def test_update_naming_field_without_dn_keeps_dn():
+    record = user()
+    record.update({"cn": "Johnny"})
+    assert record["cn"] == "Johnny"
+    assert record.dn == DN
+    # Le DN suit le renommage quand il est fourni
+    record.update({"dn": "CN=Johnny,OU=Sales,DC=ex,DC=com"})
+    assert record._rdn == "CN"
+    assert record.dn == "CN=Johnny,OU=Sales,DC=ex,DC=com"
+    # Retour à la valeur du RDN : le raccourci est rétabli
+    record = user(dn="CN=Johnny,OU=Sales,DC=ex,DC=com")
+    record.update({"cn": "Johnny"})
+    assert record._rdn == "CN" and record.dn == "CN=Johnny,OU=Sales,DC=ex,DC=com"
+
+
+def test_escaped_comma_and_interning():
+    record = GroupRecord(name="Doe, J", description="Groupe", dn="CN=Doe\\, J,OU=G,DC=ex,DC=com")
+    assert record.dn == "CN=Doe\\, J,OU=G,DC=ex,DC=com"
+    assert record["description"] is sys.intern("Groupe")
+
+
+def test_record_without_dn():
+    Plain = record_type("Plain", ("name", "dn"))
+    record = Plain(name="x", dn=None)
+    assert record["dn"] is None
+    record.update({"name": "y"})
+    assert dict(record) == {"name": "y", "dn": None}
@@ -0,0 +1,38 @@
+from search_index import SearchIndex, normalize
+
+FIELDS = {"sam": "sAMAccountName", "desc": "description"}
+ITEMS = [
+    {"sAMAccountName": "jdoe", "description": "Prestataire externe"},
+    {"sAMAccountName": "jdupont", "description": "Comptabilité"},
+    {"sAMAccountName": "asmith", "description": "Prestataire"},
+]
+
+
+def test_normalize_strips_accents_case_and_spaces():
+    assert normalize("  Comptabilité   Générale ") == "comptabilite generale"
+
+
+def test_free_and_field_terms():
+    index = SearchIndex(ITEMS, FIELDS)
+    assert index.search("jd") == [0, 1]
+    assert index.search("sam:jd desc:comptabilite") == [1]
+    assert index.search("PRESTATAIRE") == [0, 2]
+    # Un préfixe inconnu reste un terme libre
+    assert index.search("x:jdoe") == []
+    assert index.search("") == [0, 1, 2]
+
+
+def test_narrowing_reuses_previous_result():
+    index = SearchIndex(ITEMS, FIELDS)
+    assert index.search("j") == [0, 1]
+    # "jdo" précise "j" : seul le résultat précédent est filtré (l'élément 2, hors du
+    # résultat précédent, n'est pas relu)
+    index.keys[None][2] = "jdo"
+    assert index.search("jdo") == [0]
+    # Une requête qui ne précise pas la précédente reparcourt la liste
+    assert index.search("sam:smith") == [2]
+
+
+def test_plain_items_without_fields():
+    index = SearchIndex(["CN=Alpha", "CN=Bêta"])
+    assert index.search("beta") == [1]
@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("ldb")
+import snapshot_diff
+from snapshot_diff import DiffRun, diff_attributes, diff_entry, record_key
+
+
+def user(guid, dn, **attrs):
+    return dict({"dn": dn, "objectGUID": guid}, **attrs)
+
+
+def run(old, new, **kwargs):
+    diff = DiffRun(old, new, partitions=4, **kwargs)
+    return sorted(diff, key=lambda c: (c["change"], c["dn"])), diff.summary
+
+
+def test_record_key_prefers_guid():
+    assert record_key({"objectGUID": "ABC", "dn": "CN=x"}) == "abc"
+    assert record_key({"dn": "CN=X,DC=ex"}) == "dn:cn=x,dc=ex"
+
+
+def test_diff_attributes_compares_sets_and_ignores_case():
+    old = {"member": ["a", "b"], "Description": "x", "uSNChanged": "1"}
+    new = {"member": ["b", "c"], "description": "y", "usnchanged": "2"}
+    assert diff_attributes(old, new) == {
+        "member": {"add": ["c"], "delete": ["a"]},
+        "description": {"add": ["y"], "delete": ["x"]},
+    }
+    assert diff_attributes({"member": ["a", "b"]}, {"member": ["b", "a"]}) == {}
+    assert "usnchanged" in diff_attributes(old, new, ignored=set())
+
+
+def test_diff_entry_move_and_rename():
+    old = user("g", "CN=Doe\\, J,OU=A,DC=ex")
+    renamed = diff_entry(old, user("g", "CN=Doe\\, K,OU=A,DC=ex"))
+    assert renamed["change"] == "rename" and renamed["old_dn"] == old["dn"]
+    # Même RDN, parent différent (la virgule échappée fait partie du RDN)
+    assert diff_entry(old, user("g", "CN=Doe\\, J,OU=B,DC=ex"))["change"] == "move"
+    assert diff_entry(old, dict(old)) is None
+
+
+def test_run_aligns_by_guid():
+    old = [user("1", "CN=a,DC=ex", description="x"), user("2", "CN=b,DC=ex"), user("3", "CN=c,DC=ex"),
+           user("4", "CN=d,DC=ex", lastLogon="1")]
+    new = [user("1", "CN=a,DC=ex", description="y"), user("2", "CN=b2,DC=ex"), user("5", "CN=e,DC=ex"),
+           user("4", "CN=d,DC=ex", lastLogon="2"), user("5", "CN=e,DC=ex")]
+    changes, summary = run(old, new)
+    assert [(c["change"], c["dn"]) for c in changes] == [
+        ("add", "CN=e,DC=ex"), ("delete", "CN=c,DC=ex"), ("modify", "CN=a,DC=ex"), ("rename", "CN=b2,DC=ex")]
+    assert summary["unchanged"] == 1
+    assert (summary["old"], summary["new"]) == (4, 5)
+    changes, summary = run(old, new, ignored=set())
+    assert ("modify", "CN=d,DC=ex") in [(c["change"], c["dn"]) for c in changes]
+
+
+def test_iter_snapshot_reads_compressed_jsonl(tmp_path):
+    path = tmp_path / "users.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(user("1", "CN=a,DC=ex")) + "\n\n")
+    assert list(snapshot_diff.iter_snapshot(str(path))) == [user("1", "CN=a,DC=ex")]
@@ -0,0 +1,61 @@
+from vlv import VirtualList
+
+PLACEHOLDER = {"name": "...", "dn": None}
+
+
+def make(window=10, max_windows=2, retry_delay=5):
+    calls = []
+    vlist = VirtualList(lambda start, size: calls.append((start, size)), PLACEHOLDER, window=window,
+                        max_windows=max_windows, retry_delay=retry_delay)
+    return vlist, calls
+
+
+def test_missing_window_is_requested_once():
+    vlist, calls = make()
+    vlist.start()
+    vlist.store(0, list(range(10)), 100)
+    assert vlist[25] is PLACEHOLDER
+    assert vlist[26] is PLACEHOLDER
+    assert calls == [(0, 10), (20, 10)]
+    vlist.store(20, list(range(20, 30)), 100)
+    assert vlist[25] == 25
+    assert len(vlist) == 100
+
+
+def test_old_windows_are_evicted():
+    vlist, calls = make(max_windows=2)
+    vlist.start()
+    for start in (0, 10, 20):
+        vlist.store(start, list(range(start, start + 10)), 100)
+    assert list(vlist) == list(range(10, 30))
+    assert vlist[5] is PLACEHOLDER
+    assert calls[-1] == (0, 10)
+
+
+def test_failed_window_is_retried_after_delay(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("vlv.time.monotonic", lambda: now[0])
+    vlist, calls = make(retry_delay=5)
+    vlist.start()
+    vlist.store(0, list(range(10)), 100)
+    assert vlist[15] is PLACEHOLDER
+    vlist.failed(10)
+    assert vlist[15] is PLACEHOLDER
+    assert calls == [(0, 10), (10, 10)]
+    now[0] += 6
+    assert vlist[15] is PLACEHOLDER
+    assert calls == [(0, 10), (10, 10), (10, 10)]
+    vlist.store(10, list(range(10, 20)), 100)
+    assert vlist[15] == 15
+
+
+def test_total_change_forgets_windows():
+    vlist, calls = make()
+    vlist.start()
+    vlist.store(0, list(range(10)), 100)
+    version = vlist.version
+    vlist.resize(90)
+    assert vlist.version > version
+    assert list(vlist) == []
+    vlist.invalidate()
+    assert calls[-1] == (0, 10)
@@ -1,7 +1,14 @@
+import argparse
 import curses
 import getpass
+import os
+import sys
 import time
 import textwrap
+from collections.abc import Mapping
+
+# Début du démarrage (--profile-startup) : les modules suivants sont comptés dans "imports"
+_startup_mark = time.perf_counter()
 
 # Import des fonctions Samba AD depuis samba_ad.py
 from samba_ad import (
@@ -11,10 +18,52 @@ from samba_ad import (
     list_gpos, create_full_gpo, delete_gpo,
     list_users, create_user, delete_user,
     list_computers, create_computer, delete_computer, move_computer,
-    refresh_data,
-    modify_object, get_object_attributes, search_objects, move_object, rename_object,
+    new_data, loaded_categories, load_categories, count_categories, sync_data, load_data,
+    DASHBOARD_LABELS,
+    modify_object, get_object_attributes, read_attribute_range, parse_range_name,
+    membership, load_membership, search_objects, move_object, rename_object, delete_object,
+    parse_modification_template, batch_modify, rollback_batch, new_rollback_path,
+    delete_objects, move_objects, VLV_SORT, vlv_category_window,
     reset_password
 )
+from cache import DEFAULT_SNAPSHOT_PATH, save_snapshot
+from search_index import SearchIndex
+from jobs import JobQueue
+from vlv import VirtualList
+from metrics import metrics
+from decode import display_text
+from hygiene import DEFAULT_DAYS, REPORTS, SORTS, fetch_accounts, write_csv
+
+# Fichier témoin : l'animation d'intro n'est jouée qu'au premier lancement
+INTRO_MARKER = os.path.join(os.path.dirname(DEFAULT_SNAPSHOT_PATH), "intro-vue")
+
+# --- Mesure du démarrage (--profile-startup) ---
+# Étapes du démarrage : [(nom, durée en s)], dans l'ordre
+startup_phases = []
+# Étapes dont la durée dépend de l'utilisateur (saisie) : exclues du total
+STARTUP_INTERACTIVE = {"saisie des identifiants"}
+
+def startup_phase(name, details=None):
+    """
+    Enregistre la durée écoulée depuis l'étape précédente sous le nom 'name'.
+    'details' : durées des sous-étapes déjà mesurées ({nom: s}), enregistrées à la place.
+    """
+    global _startup_mark
+    now = time.perf_counter()
+    elapsed = now - _startup_mark
+    for detail, duration in (details or {}).items():
+        startup_phases.append((f"{name} : {detail}", duration))
+        elapsed -= duration
+    if not details or elapsed >= 0.001:
+        startup_phases.append((name, elapsed))
+    _startup_mark = now
+
+def startup_report():
+    """Détail des étapes du démarrage et temps jusqu'à la première image (hors saisie)."""
+    lines = [f"  {name:<44} {elapsed * 1000:8.1f} ms" + (" (non compté)" if name in STARTUP_INTERACTIVE else "")
+             for name, elapsed in startup_phases]
+    total = sum(elapsed for name, elapsed in startup_phases if name not in STARTUP_INTERACTIVE)
+    return "\n".join(["[INFO] Démarrage :"] + lines + [f"  {'total jusqu’à la première image':<44} {total * 1000:8.1f} ms"])
 
 # --- Fonctions utilitaires pour éviter les erreurs "addstr() returned ERR" ---
 def safe_addstr(win, y, x, text, style=0):
@@ -105,7 +154,7 @@ def animate_intro(stdscr):
 
 def draw_ascii_header(win, domain_info):
     """Affiche l'ASCII art, le spinner et les infos de domaine/utilisateur en haut."""
-    win.clear()
+    win.erase()
     ascii_art = [
         "	__  ______     ______ _   __       ",
         "  	/| )/  )/__)/  )__/(   /  /_| /__) ", 
@@ -122,14 +171,18 @@ def draw_ascii_header(win, domain_info):
     row = start_y + len(ascii_art) + 1
     col = max((max_x - len(info_str)) // 2, 0)
     safe_addstr(win, row, col, info_str, curses.A_BOLD)
-    spinner = get_spinner()
-    safe_addstr(win, 0, max_x - 3, spinner, curses.color_pair(1) | curses.A_BOLD)
     safe_hline(win, start_y + len(ascii_art) + 2, 0, curses.ACS_HLINE, max_x)
-    win.refresh()
+    draw_spinner(win)
 
-def draw_tab_bar(win, current_tab, tabs):
-    """Affiche la barre d'onglets."""
-    win.clear()
+def draw_spinner(win):
+    """Met à jour la seule case du spinner dans l'en-tête."""
+    max_y, max_x = win.getmaxyx()
+    safe_addstr(win, 0, max_x - 3, get_spinner(), curses.color_pair(1) | curses.A_BOLD)
+    win.noutrefresh()
+
+def draw_tab_bar(win, current_tab, tabs, marker=""):
+    """Affiche la barre d'onglets, et à droite l'indication 'marker' (fraîcheur des données)."""
+    win.erase()
     max_y, max_x = win.getmaxyx()
     x = 2
     for idx, tab in enumerate(tabs):
@@ -139,19 +192,34 @@ def draw_tab_bar(win, current_tab, tabs):
         else:
             safe_addstr(win, 0, x, text)
         x += len(text) + 1
+    if marker and x + len(marker) + 2 < max_x:
+        safe_addstr(win, 0, max_x - len(marker) - 2, marker, curses.A_DIM)
     safe_hline(win, 1, 0, curses.ACS_HLINE, max_x)
-    win.refresh()
+    win.noutrefresh()
 
 def draw_status_bar(win, message):
     """
     Affiche la barre de statut en bas.
     Par défaut, on affiche "h = Aide | ESC = Quitter".
     """
-    win.clear()
+    win.erase()
     max_y, max_x = win.getmaxyx()
     status = message if message else "h = Aide | ESC = Quitter"
     safe_addstr(win, 0, 0, status[:max_x-1], curses.color_pair(4))
-    win.refresh()
+    win.noutrefresh()
+
+# Catégorie de données (samba_ad.CATEGORIES) affichée par chaque onglet
+TAB_CATEGORIES = {1: "ous", 2: "groupes", 3: "gpos", 4: "users", 5: "computers"}
+
+# Au-delà de ce nombre d'objets (compté pour le tableau de bord), les onglets des catégories
+# de VLV_SORT sont parcourus par fenêtres triées par le DC au lieu d'être chargés en entier.
+VLV_THRESHOLD = 20000
+# Élément affiché à la place d'une entrée dont la fenêtre n'est pas encore reçue
+VLV_PLACEHOLDER = {"name": "...", "sAMAccountName": "...", "cn": "", "dn": None}
+
+def data_version(current_tab, data):
+    """USN de la dernière mise à jour des données de l'onglet (change à chaque synchronisation)."""
+    return data['sync']["usns"].get(TAB_CATEGORIES.get(current_tab))
 
 def get_items_for_tab(current_tab, data):
     """Retourne la liste d'éléments correspondant à l'onglet courant."""
@@ -169,78 +237,145 @@ def get_items_for_tab(current_tab, data):
         return data['computers']
     elif current_tab == 6:
         return data.get('recherche', [])
+    elif current_tab == 7:
+        return data.get('hygiene', [])
     return []
 
-def draw_sidebar(win, current_tab, data, selected_index, filter_str):
-    """Affiche la sidebar avec surbrillance sur l'élément sélectionné."""
-    win.clear()
+# Champs interrogeables par onglet avec le filtre '/' (ex. "sam:jdoe desc:prestataire")
+SEARCH_FIELDS = {
+    1: {"name": "name", "dn": "dn"},
+    2: {"name": "name", "desc": "description", "dn": "dn"},
+    3: {"name": "name", "dn": "dn"},
+    4: {"sam": "sAMAccountName", "cn": "cn", "desc": "description", "dn": "dn"},
+    5: {"name": "name", "sam": "sAMAccountName", "dn": "dn"},
+    7: {"sam": "sAMAccountName", "type": "type", "dn": "dn"},
+}
+
+# Index de recherche par onglet, reconstruits uniquement quand les données de l'onglet changent
+_search_indexes = {}
+# Dernier résultat du filtre '/' (clé : onglet, filtre et index utilisé)
+_filter_cache = {}
+
+def get_search_index(current_tab, items, data):
+    """Retourne l'index de recherche de l'onglet, construit une seule fois par état des données."""
+    key = (id(items), len(items), data_version(current_tab, data))
+    cached = _search_indexes.get(current_tab)
+    if cached is None or cached[0] != key:
+        cached = (key, SearchIndex(items, SEARCH_FIELDS.get(current_tab)))
+        _search_indexes[current_tab] = cached
+    return cached[1]
+
+def filter_items(current_tab, data, filter_str):
+    """
+    Retourne les éléments de l'onglet courant qui correspondent au filtre '/'.
+    Le résultat est mémorisé tant que l'onglet, le filtre et les données sont inchangés :
+    la liste n'est pas refiltrée à chaque rafraîchissement de l'écran.
+    """
     items = get_items_for_tab(current_tab, data)
-    if filter_str:
-        items = [item for item in items if filter_str.lower() in str(item).lower()]
+    if not filter_str:
+        return items
+    index = get_search_index(current_tab, items, data)
+    key = (current_tab, filter_str, id(index))
+    if _filter_cache.get('key') != key:
+        _filter_cache['key'] = key
+        _filter_cache['items'] = [items[i] for i in index.search(filter_str)]
+    return _filter_cache['items']
+
+def format_sidebar_item(current_tab, item):
+    """Retourne le libellé d'un élément dans la sidebar."""
+    if current_tab == 0:
+        key, value = item
+        return f"{str(key).ljust(20)} : {value}"
+    if isinstance(item, Mapping):
+        if current_tab == 1:
+            return f"OU : {item.get('name', '')}"
+        elif current_tab == 2:
+            return f"Groupe : {item.get('name', '')}"
+        elif current_tab == 3:
+            return f"GPO : {item.get('name', '')}"
+        elif current_tab == 4:
+            sam = item.get("sAMAccountName", "")
+            cn  = item.get("cn", "")
+            return f"User : {sam} ({cn})"
+        elif current_tab == 5:
+            return f"PC : {item.get('name', '')}"
+        elif current_tab == 6:
+            return str(item.get("dn", str(item)))
+        elif current_tab == 7:
+            return f"{item['sAMAccountName']} ({item['type']}) : {item['lastLogonTimestamp']}"
+        return str(item)
+    if current_tab == 1:
+        return f"OU : {item}"
+    elif current_tab == 2:
+        return f"Groupe : {item}"
+    elif current_tab == 3:
+        return f"GPO : {item}"
+    elif current_tab == 4:
+        return f"Utilisateur : {item}"
+    elif current_tab == 5:
+        return f"Ordinateur : {item}"
+    return str(item)
+
+def sidebar_page_size(win):
+    """Nombre de lignes d'éléments visibles dans la sidebar (hors bordure)."""
+    return max(win.getmaxyx()[0] - 2, 1)
+
+def follow_selection(selected_index, scroll_offset, page_size):
+    """Ajuste le décalage de défilement pour que l'élément sélectionné reste visible."""
+    if selected_index < scroll_offset:
+        return selected_index
+    if selected_index >= scroll_offset + page_size:
+        return selected_index - page_size + 1
+    return scroll_offset
+
+def item_dn(item):
+    """DN d'un élément de liste (chaîne), ou None s'il n'en a pas (tableau de bord)."""
+    if isinstance(item, Mapping) or hasattr(item, "dn"):
+        dn = item.get("dn") if isinstance(item, Mapping) else item.dn
+        return str(dn) if dn is not None else None
+    return None
+
+def draw_sidebar(win, current_tab, items, selected_index, scroll_offset, marked=None):
+    """
+    Affiche la sidebar avec surbrillance sur l'élément sélectionné.
+    Seules les lignes visibles (à partir de 'scroll_offset') sont formatées et dessinées :
+    le coût d'affichage dépend de la hauteur de la fenêtre, pas de la taille de la liste.
+    Lorsque des éléments sont sélectionnés ('marked', ensemble de DN), chaque ligne est
+    précédée d'une case [x] / [ ].
+    """
+    win.erase()
     height, width = win.getmaxyx()
     max_len = width - 3
-    if current_tab == 0:
-        key_width = 20
-        for idx, (key, value) in enumerate(items):
-            line = f"{str(key).ljust(key_width)} : {value}"
-            if len(line) > max_len:
-                line = line[:max_len]
-            style = curses.color_pair(3) if idx == selected_index else 0
-            safe_addstr(win, idx + 1, 1, line, style)
-    else:
-        for idx, item in enumerate(items):
-            if isinstance(item, dict):
-                if current_tab == 1:
-                    display_text = f"OU : {item.get('name', '')}"
-                elif current_tab == 2:
-                    display_text = f"Groupe : {item.get('name', '')}"
-                elif current_tab == 3:
-                    display_text = f"GPO : {item.get('name', '')}"
-                elif current_tab == 4:
-                    sam = item.get("sAMAccountName", "")
-                    cn  = item.get("cn", "")
-                    display_text = f"User : {sam} ({cn})"
-                elif current_tab == 5:
-                    display_text = f"PC : {item.get('name', '')}"
-                elif current_tab == 6:
-                    display_text = item.get("dn", str(item))
-                else:
-                    display_text = str(item)
-            else:
-                if current_tab == 1:
-                    display_text = f"OU : {item}"
-                elif current_tab == 2:
-                    display_text = f"Groupe : {item}"
-                elif current_tab == 3:
-                    display_text = f"GPO : {item}"
-                elif current_tab == 4:
-                    display_text = f"Utilisateur : {item}"
-                elif current_tab == 5:
-                    display_text = f"Ordinateur : {item}"
-                else:
-                    display_text = str(item)
-            if len(display_text) > max_len:
-                display_text = display_text[:max_len]
-            style = curses.color_pair(3) if idx == selected_index else 0
-            safe_addstr(win, idx + 1, 1, display_text, style)
+    page_size = sidebar_page_size(win)
+    for row, item in enumerate(items[scroll_offset:scroll_offset + page_size]):
+        idx = scroll_offset + row
+        display_text = format_sidebar_item(current_tab, item)
+        if marked:
+            display_text = ("[x] " if item_dn(item) in marked else "[ ] ") + display_text
+        if len(display_text) > max_len:
+            display_text = display_text[:max_len]
+        style = curses.color_pair(3) if idx == selected_index else 0
+        safe_addstr(win, row + 1, 1, display_text, style)
     win.box()
-    win.refresh()
+    if len(items) > page_size or marked:
+        position = f" {selected_index + 1}/{len(items)} "
+        if marked:
+            position = f" {len(marked)} sélectionné(s) -{position}"
+        safe_addstr(win, height - 1, max(width - len(position) - 2, 1), position)
+    win.noutrefresh()
 
-def draw_content(win, current_tab, data, selected_index, filter_str):
+def draw_content(win, current_tab, items, selected_index):
     """Affiche le contenu détaillé de l'élément sélectionné."""
-    win.clear()
+    win.erase()
     height, width = win.getmaxyx()
-    items = get_items_for_tab(current_tab, data)
-    if filter_str:
-        items = [item for item in items if filter_str.lower() in str(item).lower()]
     if items:
         selected_item = items[selected_index]
         if current_tab == 0:
             details = f"{selected_item[0]} : {selected_item[1]}"
-        elif current_tab == 6 and isinstance(selected_item, dict):
+        elif current_tab == 6 and isinstance(selected_item, Mapping):
             lines = [f"{k}: {v}" for k, v in selected_item.items()]
             details = "\n".join(lines)
-        elif isinstance(selected_item, dict):
+        elif isinstance(selected_item, Mapping):
             lines = [f"{k}: {v}" for k, v in selected_item.items()]
             details = "\n".join(lines)
         else:
@@ -264,43 +399,213 @@ def draw_content(win, current_tab, data, selected_index, filter_str):
         safe_addstr(win, row, 2, wline)
         row += 1
     win.box()
-    win.refresh()
+    win.noutrefresh()
+
+def draw_metrics(win, registry):
+    """Panneau des mesures (F2) à la place du détail : durées par opération LDAP, décodage et affichage."""
+    win.erase()
+    height, width = win.getmaxyx()
+    safe_addstr(win, 1, 2, f"Mesures de la session, début {format_age(time.time() - registry.started)} (F2 = fermer, W = exporter)",
+                curses.A_BOLD)
+    header = f"{'Opération':<28}{'nb':>6}{'moy ms':>8}{'p95 ms':>8}{'max ms':>8}{'entrées':>8}{'Ko':>6}"
+    safe_addstr(win, 3, 2, header[:width - 4], curses.A_UNDERLINE)
+    row = 4
+    for name, count, mean, p95, peak, entries, nbytes in registry.rows():
+        if row >= height - 1:
+            break
+        line = f"{name[:27]:<28}{count:>6}{mean:>8.1f}{p95:>8.1f}{peak:>8.1f}{entries:>8}{nbytes // 1024:>6}"
+        safe_addstr(win, row, 2, line[:width - 4])
+        row += 1
+    if row == 4:
+        safe_addstr(win, row, 2, "Aucune mesure" if registry.enabled else "Mesures désactivées (SAMBA_AD_METRICS=0)")
+    win.box()
+    win.noutrefresh()
+
+# Nombre d'octets montrés par l'aperçu hexadécimal d'une valeur binaire
+HEX_PREVIEW_BYTES = 256
+
+def hex_preview(value, limit=HEX_PREVIEW_BYTES):
+    """Aperçu hexadécimal (16 octets par ligne) des 'limit' premiers octets d'une valeur binaire."""
+    if hasattr(value, "get_value"):
+        value = value.get_value()
+    value = bytes(value)
+    lines = []
+    for offset in range(0, min(len(value), limit), 16):
+        chunk = value[offset:offset + 16]
+        hexa = " ".join(f"{b:02x}" for b in chunk)
+        text = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
+        lines.append(f"{offset:04x}  {hexa:<47}  {text}")
+    if len(value) > limit:
+        lines.append(f"... {len(value) - limit} octets de plus")
+    return lines
 
-def parse_samba_attrs(attrs):
+def attribute_rows(attrs):
     """
-    Parse et formate clairement les attributs LDAP (Samba AD).
-    Chaque attribut est affiché sur une ligne séparée.
+    Lignes logiques du visualiseur d'attributs, non mises en forme : [type, attribut, valeur, déplié].
+    - "single" : attribut à une seule valeur ;
+    - "header" puis un "value" par valeur pour un attribut multivalué ;
+    - "more" : l'attribut a été renvoyé par tranche ("member;range=0-1499"), la valeur est
+      l'indice de la tranche suivante (voir samba_ad.read_attribute_range).
     """
-    lines = []
-    for attr_name in sorted(attrs.keys()):
-        values = attrs[attr_name]
-        formatted_values = []
-        for val in values:
-            if hasattr(val, "get_value"):
-                raw_val = val.get_value()
-                if isinstance(raw_val, bytes):
-                    try:
-                        str_val = raw_val.decode("utf-8", errors="replace")
-                    except:
-                        str_val = repr(raw_val)
-                else:
-                    str_val = str(raw_val)
-            elif isinstance(val, bytes):
-                try:
-                    str_val = val.decode("utf-8", errors="replace")
-                except:
-                    str_val = repr(val)
+    rows = []
+    for name in sorted((name for name in attrs.keys() if name.lower() != "dn"), key=str.lower):
+        attr, start, end = parse_range_name(name)
+        values = list(attrs[name])
+        if len(values) == 1 and start is None:
+            rows.append(["single", attr, values[0], False])
+            continue
+        rows.append(["header", attr, None, False])
+        rows.extend(["value", attr, value, False] for value in values)
+        if end is not None:
+            rows.append(["more", attr, end + 1, False])
+    return rows
+
+def format_attribute_row(row, counts, pending):
+    """Lignes de texte (avant retour à la ligne) d'une ligne logique du visualiseur."""
+    kind, attr, value, expanded = row
+    if kind == "header":
+        more = " (suite à la demande)" if attr in counts.get("more", ()) else ""
+        return [f"{attr}: {counts.get(attr, 0)} valeurs{more}"]
+    if kind == "more":
+        if attr in pending:
+            return [f"  ... lecture des valeurs suivantes de {attr}"]
+        return [f"  ... valeurs suivantes de {attr} (Entrée pour les lire)"]
+    text = display_text(attr, value)
+    if text is None:
+        size = len(value.get_value() if hasattr(value, "get_value") else value)
+        text = f"<binaire, {size} octets> ({'Entrée : replier' if expanded else 'Entrée : aperçu hexadécimal'})"
+    prefix = f"{attr}: " if kind == "single" else "  - "
+    lines = [prefix + text]
+    if expanded:
+        lines.extend("    " + line for line in hex_preview(value))
+    return lines
+
+def display_attribute_viewer(stdscr, title, attrs, fetch_more=None):
+    """
+    Visualiseur d'attributs (touches 'a' et 't'), adapté aux objets très volumineux :
+    - seules les lignes visibles sont mises en forme et découpées à la largeur de la fenêtre ;
+    - les attributs renvoyés par tranche sont complétés quand leur fin devient visible, via
+      'fetch_more(attribut, début)' qui renvoie une tâche (jobs.Job) dont le résultat est
+      (valeurs, début de la tranche suivante) ;
+    - les valeurs binaires sont repliées, Entrée affiche leur aperçu hexadécimal.
+    """
+    curses.noecho()
+    max_y, max_x = stdscr.getmaxyx()
+    height = max_y * 7 // 10
+    width = max_x * 7 // 10
+    start_y = (max_y - height) // 2
+    start_x = (max_x - width) // 2
+    visible_height = height - 2
+    text_width = width - 4
+    win = curses.newwin(height, width, start_y, start_x)
+
+    rows = attribute_rows(attrs)
+    counts = {"more": set()}
+    for kind, attr, value, _ in rows:
+        if kind == "value":
+            counts[attr] = counts.get(attr, 0) + 1
+        elif kind == "more":
+            counts["more"].add(attr)
+    pending = {}
+    wrapped = {}
+    top = 0
+    selected = 0
+
+    def lines_of(index):
+        """Lignes physiques d'une ligne logique, découpées une seule fois par état."""
+        row = rows[index]
+        key = (id(row), row[3], row[1] in pending)
+        cached = wrapped.get(key)
+        if cached is None:
+            cached = []
+            for line in format_attribute_row(row, counts, pending):
+                cached.extend(textwrap.wrap(line, width=text_width, subsequent_indent="    ") or [""])
+            wrapped[key] = cached
+        return cached
+
+    def follow(top):
+        """Premier indice à afficher pour que la ligne sélectionnée soit entièrement visible."""
+        if selected < top:
+            return selected
+        used = 0
+        for index in range(selected, top - 1, -1):
+            used += len(lines_of(index))
+            if used > visible_height:
+                return min(index + 1, selected)
+        return top
+
+    def request_more(index):
+        attr, start = rows[index][1], rows[index][2]
+        if fetch_more is not None and attr not in pending:
+            pending[attr] = (fetch_more(attr, start), rows[index])
+
+    def collect():
+        """Intègre les tranches reçues à la place de leur ligne "more"."""
+        for attr, (job, more_row) in list(pending.items()):
+            if not job.future.done():
+                continue
+            del pending[attr]
+            index = next((i for i, row in enumerate(rows) if row is more_row), None)
+            if index is None:
+                continue
+            if job.state != "terminé" or not isinstance(job.result, tuple):
+                rows[index] = ["single", attr, job.outcome(), False]
+                counts["more"].discard(attr)
+                continue
+            values, next_start = job.result
+            new_rows = [["value", attr, value, False] for value in values]
+            if next_start is not None:
+                new_rows.append(["more", attr, next_start, False])
             else:
-                str_val = str(val)
-            str_val = str_val.replace("\r", "\\r").replace("\n", "\\n")
-            formatted_values.append(str_val)
-        if len(formatted_values) > 1:
-            lines.append(f"{attr_name}:")
-            for single_val in formatted_values:
-                lines.append(f"  - {single_val}")
-        else:
-            lines.append(f"{attr_name}: {formatted_values[0]}")
-    return "\n".join(lines)
+                counts["more"].discard(attr)
+            counts[attr] = counts.get(attr, 0) + len(values)
+            rows[index:index + 1] = new_rows
+            wrapped.clear()
+
+    while True:
+        collect()
+        selected = min(selected, max(len(rows) - 1, 0))
+        top = follow(top)
+        win.erase()
+        win.box()
+        safe_addstr(win, 0, 2, title[:width - 4], curses.A_BOLD)
+        if rows:
+            safe_addstr(win, height - 1, 2, f" {selected + 1}/{len(rows)} "[:width - 4])
+        row_y = 1
+        index = top
+        while row_y <= visible_height and index < len(rows):
+            if rows[index][0] == "more":
+                # La fin chargée de l'attribut est visible : lecture de la tranche suivante
+                request_more(index)
+            attr_style = curses.A_REVERSE if index == selected else curses.A_NORMAL
+            for line in lines_of(index):
+                if row_y > visible_height:
+                    break
+                safe_addstr(win, row_y, 2, line[:text_width], attr_style)
+                row_y += 1
+            index += 1
+        win.refresh()
+        ch = stdscr.getch()
+        if ch == curses.KEY_UP:
+            selected = max(selected - 1, 0)
+        elif ch == curses.KEY_DOWN:
+            selected = min(selected + 1, len(rows) - 1)
+        elif ch == curses.KEY_PPAGE:
+            selected = max(selected - visible_height, 0)
+        elif ch == curses.KEY_NPAGE:
+            selected = min(selected + visible_height, len(rows) - 1)
+        elif ch == curses.KEY_HOME:
+            selected = 0
+        elif ch == curses.KEY_END:
+            selected = len(rows) - 1
+        elif ch in (curses.KEY_ENTER, 10, 13) and rows:
+            row = rows[selected]
+            if row[0] == "more":
+                request_more(selected)
+            elif row[0] in ("single", "value") and display_text(row[1], row[2]) is None:
+                row[3] = not row[3]
+        elif ch in (27, ord('q'), curses.KEY_EXIT):
+            break
 
 def display_modal_text(stdscr, title, text):
     """Affiche une fenêtre modale scrollable (80% de l'écran)."""
@@ -400,7 +705,7 @@ def modal_confirm(stdscr, prompt):
 def get_dn_for_selected(current_tab, selected_item, domain_info):
     """Construit le DN en fonction de l'onglet et de l'élément sélectionné."""
     dn = None
-    if isinstance(selected_item, dict) and "dn" in selected_item:
+    if isinstance(selected_item, Mapping) and "dn" in selected_item:
         dn = selected_item["dn"]
     else:
         if current_tab == 1:
@@ -417,66 +722,110 @@ def get_dn_for_selected(current_tab, selected_item, domain_info):
             dn = str(selected_item)
     return dn
 
-def handle_create_action(stdscr, current_tab, domain_info):
-    """Création d'un objet selon l'onglet."""
+def handle_create_action(stdscr, current_tab, domain_info, submit):
+    """
+    Création d'un objet selon l'onglet.
+    La saisie se fait dans des fenêtres modales, la création elle-même est confiée
+    à 'submit' (exécution en arrière-plan) qui renvoie le message à afficher.
+    """
+    samdb, domain_dn = domain_info["samdb"], domain_info["domain_dn"]
     if current_tab == 1:
         name = modal_input(stdscr, "Création d'OU", "Nom de la nouvelle OU: ")
         if name:
-            return create_ou(domain_info["samdb"], domain_info["domain_dn"], name)
+            return submit(f"Création de l'OU {name}", create_ou, samdb, domain_dn, name)
     elif current_tab == 2:
         name = modal_input(stdscr, "Création de Groupe", "Nom du nouveau groupe: ")
         if name:
-            return create_group(domain_info["samdb"], domain_info["domain_dn"], name)
+            return submit(f"Création du groupe {name}", create_group, samdb, domain_dn, name)
     elif current_tab == 3:
         name = modal_input(stdscr, "Création de GPO", "Nom du nouveau GPO: ")
         if name:
-            return create_full_gpo(name)
+            return submit(f"Création du GPO {name}", lambda job: create_full_gpo(name, cancelled=job.cancelled),
+                          with_job=True)
     elif current_tab == 4:
         resp = modal_input_multiple(stdscr, "Création d'Utilisateur", ["Nom d'utilisateur: ", "Mot de passe: "])
         if resp:
             username = resp.get("Nom d'utilisateur: ")
             password = resp.get("Mot de passe: ")
             if username and password:
-                return create_user(domain_info["samdb"], domain_info["domain_dn"], username, password)
+                return submit(f"Création de l'utilisateur {username}", create_user, samdb, domain_dn, username, password)
     elif current_tab == 5:
         name = modal_input(stdscr, "Création d'Ordinateur", "Nom de l'ordinateur: ")
         if name:
-            return create_computer(domain_info["samdb"], domain_info["domain_dn"], name)
+            return submit(f"Création de l'ordinateur {name}", create_computer, samdb, domain_dn, name)
     return "Opération annulée."
 
-def handle_delete_action(stdscr, current_tab, data, selected_index, domain_info):
-    """Suppression d'un objet selon l'onglet."""
-    items = get_items_for_tab(current_tab, data)
+def handle_delete_action(stdscr, current_tab, items, selected_index, domain_info, submit):
+    """Suppression d'un objet selon l'onglet (exécutée en arrière-plan via 'submit')."""
     if not items:
         return "Aucun élément à supprimer."
     selected_item = items[selected_index]
     confirm = modal_confirm(stdscr, f"Supprimer {selected_item}? (y/n): ")
     if confirm:
+        samdb, domain_dn = domain_info["samdb"], domain_info["domain_dn"]
         if current_tab in (1, 2, 3, 4, 5):
             if current_tab == 1:
-                return delete_ou(domain_info["samdb"], domain_info["domain_dn"], selected_item.get("name", selected_item))
+                name = selected_item.get("name", selected_item)
+                return submit(f"Suppression de l'OU {name}", delete_ou, samdb, domain_dn, name)
             elif current_tab == 2:
-                return delete_group(domain_info["samdb"], domain_info["domain_dn"], selected_item.get("name", selected_item))
+                name = selected_item.get("name", selected_item)
+                return submit(f"Suppression du groupe {name}", delete_group, samdb, domain_dn, name)
             elif current_tab == 3:
-                return delete_gpo(domain_info["samdb"], domain_info["domain_dn"], selected_item.get("name", selected_item))
+                name = selected_item.get("name", selected_item)
+                return submit(f"Suppression du GPO {name}", delete_gpo, samdb, domain_dn, name)
             elif current_tab == 4:
-                return delete_user(domain_info["samdb"], domain_info["domain_dn"], selected_item.get("sAMAccountName", selected_item))
+                name = selected_item.get("sAMAccountName", selected_item)
+                return submit(f"Suppression de l'utilisateur {name}", delete_user, samdb, domain_dn, name)
             elif current_tab == 5:
-                return delete_computer(domain_info["samdb"], domain_info["domain_dn"], selected_item.get("name", selected_item))
-        elif current_tab == 6:
+                name = selected_item.get("name", selected_item)
+                return submit(f"Suppression de l'ordinateur {name}", delete_computer, samdb, domain_dn, name)
+        elif current_tab in (6, 7):
             dn = get_dn_for_selected(current_tab, selected_item, domain_info)
             if dn:
-                try:
-                    domain_info["samdb"].delete(dn)
-                    return f"[OK] Objet '{dn}' supprimé."
-                except Exception as e:
-                    return f"[ERROR] Impossible de supprimer '{dn}': {e}"
+                return submit(f"Suppression de {dn}", delete_object, samdb, dn)
     return "Opération annulée."
 
-def main_tui(stdscr, domain_info):
+# Touches de navigation : elles n'ouvrent aucune fenêtre modale
+NAVIGATION_KEYS = {curses.KEY_LEFT, curses.KEY_RIGHT, curses.KEY_UP, curses.KEY_DOWN,
+                   curses.KEY_PPAGE, curses.KEY_NPAGE, curses.KEY_HOME, curses.KEY_END}
+# Touches qui agissent sur l'élément sélectionné (sans effet sur une ligne pas encore reçue)
+ROW_ACTION_KEYS = {ord(c) for c in "dpatgmrv"}
+
+def format_timings(timings):
+    """Résumé des durées de load_categories, étapes les plus longues en premier."""
+    steps = sorted(((name, t) for name, t in timings.items() if name != "total"), key=lambda step: -step[1])
+    if len(steps) <= 1:
+        return f"chargement complet en {timings['total']:.2f} s"
+    details = ", ".join(f"{name} {t:.2f} s" for name, t in steps[:3])
+    return f"chargement complet en {timings['total']:.2f} s ({details})"
+
+def format_age(seconds):
+    """Durée écoulée, arrondie à l'unité la plus parlante (l'affichage change au plus une fois par seconde)."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"il y a {seconds} s"
+    if seconds < 3600:
+        return f"il y a {seconds // 60} min"
+    return f"il y a {seconds // 3600} h"
+
+def freshness_marker(category, data, loading):
+    """Indication de fraîcheur des données de l'onglet affichée dans la barre d'onglets."""
+    if not category:
+        return ""
+    if category in loading:
+        return "Chargement..."
+    refreshed = data['sync']["refreshed"].get(category)
+    if refreshed is None:
+        return "Non chargé (F6)"
+    return f"Actualisé {format_age(time.time() - refreshed)}"
+
+def main_tui(stdscr, domain_info, intro=True):
     init_colors()
-    animate_intro(stdscr)
+    if intro:
+        animate_intro(stdscr)
+    startup_phase("écran et intro" if intro else "écran")
     curses.curs_set(0)
+    curses.set_escdelay(25)
     stdscr.nodelay(False)
     stdscr.timeout(100)
 
@@ -484,14 +833,16 @@ def main_tui(stdscr, domain_info):
     tab_height = 3
     status_height = 1
 
-    tabs = ["Dashboard", "OUs", "Groupes", "GPOs", "Utilisateurs", "Ordinateurs", "Recherche"]
+    tabs = ["Dashboard", "OUs", "Groupes", "GPOs", "Utilisateurs", "Ordinateurs", "Recherche", "Hygiène"]
     current_tab = 0
     selected_index = 0
+    scroll_offset = 0
     filter_str = ""
+    filter_mode = False
     notification = ""
-
-    data = refresh_data(domain_info)
-    data['recherche'] = []
+    # Sélection multiple (DN des éléments cochés de l'onglet courant) et début de plage
+    marked = set()
+    mark_anchor = 0
 
     max_y, max_x = stdscr.getmaxyx()
     content_height = max_y - header_height - tab_height - status_height
@@ -506,86 +857,540 @@ def main_tui(stdscr, domain_info):
     sidebar_win = main_win.derwin(content_height, sidebar_width, 0, 0)
     content_win = main_win.derwin(content_height, content_width, 0, sidebar_width)
 
+    # Toutes les opérations d'annuaire passent par cette file : l'interface reste
+    # utilisable pendant les recherches longues, chargements et créations de GPO.
+    jobs = JobQueue()
+    data = new_data()
+    data['recherche'] = []
+    # Onglet Hygiène : comptes analysés (hygiene.AccountTable), rapport, tri et seuil affichés
+    data['hygiene'] = []
+    hygiene = {"table": None, "report": "stale", "sort": "logon", "days": DEFAULT_DAYS, "job": None}
+    # Onglets chargés à la demande : catégories en cours de chargement (tâche) et catégories
+    # dont le chargement automatique a déjà été lancé (un chargement annulé n'est pas relancé
+    # tant que F5/F6 n'est pas pressé)
+    loading = {}
+    requested = set()
+
+    # Dernier état affiché de chaque zone de l'écran : une zone n'est redessinée que si
+    # son état a changé, et l'écran n'est transmis au terminal qu'une fois par tour (doupdate).
+    drawn = {}
+    first_frame = True
+
+    # Panneau des mesures (F2) affiché à la place du détail
+    show_metrics = False
+
+    def render(pane, state, draw, *args):
+        if drawn.get(pane) != state:
+            with metrics.timed("affichage", draw.__name__):
+                draw(*args)
+            drawn[pane] = state
+
+    def redraw_all():
+        """Une fenêtre modale a pu recouvrir l'écran : tout redessiner au prochain tour."""
+        drawn.clear()
+        stdscr.touchwin()
+
+    def start_count():
+        """Compte en arrière-plan les objets des onglets non chargés (tableau de bord)."""
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé":
+                notification = job.outcome()
+        jobs.submit("Comptage des objets", count_categories, domain_info, data, on_done=done)
+
+    def start_snapshot():
+        """Reprend en arrière-plan les onglets de l'instantané local, puis compte les autres."""
+        def run(job):
+            def on_page(_data):
+                job.check_cancelled()
+            return load_data(domain_info, data, on_page=on_page)
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé":
+                notification = job.outcome()
+            start_count()
+        jobs.submit("Lecture de l'instantané local", run, on_done=done, with_job=True)
+
+    def start_category_load(category, force=False):
+        """
+        Charge intégralement une catégorie en arrière-plan ; chaque page reçue est affichée aussitôt.
+        Sans 'force', rien n'est fait si la catégorie a été chargée entre-temps (instantané).
+        """
+        label = DASHBOARD_LABELS[category]
+        def run(job):
+            if not force and category in loaded_categories(data):
+                return None
+            def on_page(_data):
+                job.check_cancelled()
+                job.report(f"{len(data[category])} objets reçus")
+            return load_categories(domain_info, data, [category], on_page=on_page)
+        def done(job):
+            nonlocal notification
+            loading.pop(category, None)
+            if job.state != "terminé":
+                notification = job.outcome()
+            elif job.result:
+                notification = f"{label} : {format_timings(job.result)}"
+        requested.add(category)
+        loading[category] = jobs.submit(f"Chargement : {label}", run, on_done=done, with_job=True)
+
+    def start_sync(categories=None, message=None):
+        """
+        Applique en arrière-plan les seuls changements survenus depuis le dernier chargement
+        des catégories données (toutes les catégories chargées par défaut).
+        """
+        def done(job):
+            nonlocal notification
+            if isinstance(job.result, str) or job.error is not None:
+                for category in categories or loaded_categories(data):
+                    start_category_load(category, force=True)
+            elif message:
+                notification = message
+        for category in categories or list(virtual):
+            if category in virtual:
+                virtual[category].invalidate()
+        jobs.submit("Synchronisation", sync_data, domain_info, data, categories=categories, on_done=done)
+
+    def submit(label, func, *args, **kwargs):
+        """Exécute une écriture en arrière-plan, affiche son résultat puis synchronise les données."""
+        def done(job):
+            nonlocal notification
+            notification = job.outcome()
+            start_sync()
+            start_count()
+        jobs.submit(label, func, *args, on_done=done, **kwargs)
+        return f"{label} en cours..."
+
+    def show_attributes(dn, all_attrs, title):
+        """Lit les attributs en arrière-plan puis les affiche dans une fenêtre modale."""
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé":
+                notification = job.outcome()
+                return
+            attrs = job.result
+            if attrs is None or isinstance(attrs, str):
+                display_modal_text(stdscr, title, str(attrs))
+            else:
+                display_attribute_viewer(stdscr, title, attrs, fetch_more=lambda attr, start: jobs.submit(
+                    f"Lecture de {attr} ({start}...)", read_attribute_range, domain_info["samdb"], dn, attr, start))
+            redraw_all()
+        jobs.submit(f"Lecture des attributs de {dn}", get_object_attributes, domain_info["samdb"], dn,
+                    all_attrs=all_attrs, on_done=done)
+
+    def show_membership(dn):
+        """
+        Appartenances de l'objet (membres effectifs d'un groupe, groupes imbriqués, cycles),
+        calculées sur le graphe chargé une seule fois puis tenu à jour par les écritures.
+        """
+        def run(job):
+            if not membership.loaded:
+                job.report("chargement du graphe des groupes")
+                loaded = load_membership(domain_info["samdb"], domain_info["domain_dn"], cancelled=job.cancelled)
+                if loaded.startswith("[ERROR]"):
+                    return loaded
+            return membership.describe(dn)
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé" or isinstance(job.result, str):
+                notification = job.outcome()
+                return
+            display_attribute_viewer(stdscr, f"Appartenances de {dn}", job.result)
+            redraw_all()
+        jobs.submit(f"Appartenances de {dn}", run, on_done=done, with_job=True)
+
+    def start_search(base_dn, filter_expr, attrs):
+        def run(job):
+            return search_objects(domain_info["samdb"], base_dn, filter_expr, attrs, cancelled=job.cancelled)
+        def done(job):
+            nonlocal notification, current_tab, selected_index, filter_str
+            if job.state != "terminé" or isinstance(job.result, str):
+                notification = job.outcome()
+                return
+            data['recherche'] = job.result
+            current_tab = 6
+            selected_index = 0
+            filter_str = ""
+            notification = f"{len(data['recherche'])} résultats trouvés."
+        jobs.submit(f"Recherche {filter_expr}", run, on_done=done, with_job=True)
+
+    # Catégories parcourues par fenêtres triées par le DC (VLV) au lieu d'être chargées
+    virtual = {}
+
+    def start_browse(category):
+        """Affiche la catégorie par fenêtres triées par le DC : seules les lignes parcourues sont lues."""
+        label = DASHBOARD_LABELS[category]
+        def fetch(start, size):
+            def done(job):
+                nonlocal notification
+                if job.state != "terminé" or isinstance(job.result, str):
+                    notification = job.outcome()
+                    vlist.failed(start)
+                    return
+                records, _position, total, context = job.result
+                vlist.store(start, records, total, context)
+            jobs.submit(f"{label} {start + 1}-{start + size}", vlv_category_window, domain_info["samdb"],
+                        domain_info["domain_dn"], category, start, size, context=vlist.context, on_done=done)
+        vlist = VirtualList(fetch, VLV_PLACEHOLDER)
+        virtual[category] = vlist
+        requested.add(category)
+        vlist.start()
+
+    def browse_to(category, prefix):
+        """Place la sélection sur la première entrée dont l'attribut de tri commence par 'prefix' (ou suit)."""
+        vlist = virtual[category]
+        def done(job):
+            nonlocal notification, selected_index
+            if job.state != "terminé" or isinstance(job.result, str):
+                notification = job.outcome()
+                return
+            _records, position, total, context = job.result
+            vlist.resize(total, context)
+            selected_index = min(position, max(total - 1, 0))
+        jobs.submit(f"Recherche de '{prefix}'", vlv_category_window, domain_info["samdb"], domain_info["domain_dn"],
+                    category, count=1, value=prefix, context=vlist.context, on_done=done)
+
+    # Journal d'annulation du dernier lot de modifications ('U')
+    last_rollback = None
+
+    def batch_progress(job, verb):
+        """Rappel de progression d'un lot : objets traités, débit et erreurs."""
+        started = time.monotonic()
+        def on_progress(done, total, errors):
+            rate = done / max(time.monotonic() - started, 0.001) * 60
+            job.report(f"{done}/{total} objets {verb}, {rate:.0f}/min, {errors} erreurs")
+        return on_progress
+
+    def start_batch_modify(dns, template):
+        """Confirme puis applique en arrière-plan un modèle de modification à une liste de DN."""
+        nonlocal notification
+        if not dns:
+            notification = "Aucun objet à modifier."
+            return
+        if not modal_confirm(stdscr, f"Modifier {len(dns)} objets ? (y/n): "):
+            notification = "Opération annulée."
+            return
+        rollback_path = new_rollback_path()
+        def run(job):
+            return batch_modify(domain_info["samdb"], dns, template, rollback_path=rollback_path,
+                                on_progress=batch_progress(job, "modifiés"), cancelled=job.cancelled)
+        def done(job):
+            nonlocal notification, last_rollback
+            notification = job.outcome()
+            last_rollback = rollback_path
+            start_sync()
+        jobs.submit(f"Modification de {len(dns)} objets", run, on_done=done, with_job=True)
+
+    def start_batch_search(filter_expr, template):
+        """Recherche les objets visés par un filtre LDAP, puis propose de les modifier."""
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé" or isinstance(job.result, str):
+                notification = job.outcome()
+                return
+            start_batch_modify([str(msg.dn) for msg in job.result], template)
+            redraw_all()
+        jobs.submit(f"Recherche {filter_expr}", search_objects, domain_info["samdb"], domain_info["domain_dn"],
+                    filter_expr, ["distinguishedName"], on_done=done)
+
+    def start_bulk(label, func, *args):
+        """Suppression ou déplacement des éléments sélectionnés, suivi d'une seule synchronisation."""
+        verb = "supprimés" if func is delete_objects else "déplacés"
+        def run(job):
+            return func(domain_info["samdb"], *args, on_progress=batch_progress(job, verb), cancelled=job.cancelled)
+        def done(job):
+            nonlocal notification
+            notification = job.outcome()
+            start_sync()
+            start_count()
+        jobs.submit(label, run, on_done=done, with_job=True)
+        marked.clear()
+
+    def show_hygiene_report():
+        """Construit en arrière-plan les lignes du rapport d'hygiène courant (tri compris)."""
+        def done(job):
+            nonlocal notification
+            if job.state != "terminé":
+                notification = job.outcome()
+                return
+            data['hygiene'] = job.result
+        jobs.submit(f"Rapport : {REPORTS[hygiene['report']]}", hygiene["table"].report,
+                    hygiene["report"], hygiene["sort"], on_done=done)
+
+    def start_hygiene():
+        """Analyse des comptes (utilisateurs et ordinateurs) pour l'onglet Hygiène."""
+        def run(job):
+            return fetch_accounts(domain_info["samdb"], domain_info["domain_dn"], hygiene["days"],
+                                  cancelled=job.cancelled)
+        def done(job):
+            nonlocal notification
+            hygiene["job"] = None
+            if job.state != "terminé" or isinstance(job.result, str):
+                notification = job.outcome()
+                return
+            hygiene["table"] = job.result
+            counts = ", ".join(f"{REPORTS[report]} : {count}" for report, count in job.result.counts().items()
+                               if report != "all")
+            notification = f"{len(job.result)} comptes analysés ({counts})."
+            show_hygiene_report()
+        requested.add("hygiene")
+        hygiene["job"] = jobs.submit(f"Analyse des comptes (seuil {hygiene['days']} j)", run, on_done=done,
+                                     with_job=True)
+
+    def start_rollback(rollback_path):
+        def run(job):
+            return rollback_batch(domain_info["samdb"], rollback_path,
+                                  on_progress=batch_progress(job, "restaurés"), cancelled=job.cancelled)
+        def done(job):
+            nonlocal notification
+            notification = job.outcome()
+            start_sync()
+        jobs.submit("Annulation du dernier lot", run, on_done=done, with_job=True)
+
+    start_snapshot()
+
     while True:
-        stdscr.erase()
-        draw_ascii_header(header_win, domain_info)
-        draw_tab_bar(tab_win, current_tab, tabs)
-        draw_sidebar(sidebar_win, current_tab, data, selected_index, filter_str)
-        draw_content(content_win, current_tab, data, selected_index, filter_str)
-        draw_status_bar(status_win, notification)
-        stdscr.refresh()
-        key = stdscr.getch()
+        jobs.poll()
+        category = TAB_CATEGORIES.get(current_tab)
+        if category and category not in requested and category not in loaded_categories(data):
+            if category in VLV_SORT and data['counts'].get(category, 0) > VLV_THRESHOLD:
+                start_browse(category)
+            else:
+                start_category_load(category)
+        elif current_tab == 7 and "hygiene" not in requested:
+            start_hygiene()
+        active = jobs.active()
+        items = virtual[category] if category in virtual else filter_items(current_tab, data, filter_str)
+        selected_index = min(selected_index, max(len(items) - 1, 0))
+        page_size = sidebar_page_size(sidebar_win)
+        scroll_offset = follow_selection(selected_index, scroll_offset, page_size)
+        # Signature des éléments affichés (les listes sont complétées ou corrigées sur place
+        # par le chargement et la synchronisation en arrière-plan)
+        items_state = (current_tab, tuple(items) if current_tab == 0 else id(items), len(items),
+                       data_version(current_tab, data), getattr(items, "version", None))
+        if filter_mode:
+            status = f"/{filter_str}_   ({len(items)} résultats - Entrée = valider, Échap = annuler)"
+        elif active:
+            job = active[0]
+            others = f" (+{len(active) - 1} en attente)" if len(active) > 1 else ""
+            status = f"{get_spinner()} {job.label}... {job.progress}{others}  |  x = annuler"
+        else:
+            status = notification
+        render("header", domain_info["domain_name"], draw_ascii_header, header_win, domain_info)
+        render("spinner", get_spinner() if active else " ", draw_spinner, header_win)
+        if current_tab == 7 and hygiene["job"]:
+            marker = "Analyse..."
+        elif current_tab == 7:
+            marker = f"{REPORTS[hygiene['report']]} ({len(data['hygiene'])}), {hygiene['days']} j"
+        elif category in virtual:
+            marker = f"Tri DC : {VLV_SORT[category]}"
+        else:
+            marker = freshness_marker(category, data, loading)
+        render("tabs", (current_tab, marker), draw_tab_bar, tab_win, current_tab, tabs, marker)
+        render("sidebar", (items_state, selected_index, scroll_offset, len(marked)),
+               draw_sidebar, sidebar_win, current_tab, items, selected_index, scroll_offset, marked)
+        if show_metrics:
+            # Actualisé une fois par seconde
+            render("content", ("mesures", int(time.time())), draw_metrics, content_win, metrics)
+        else:
+            render("content", (items_state, selected_index), draw_content, content_win, current_tab, items, selected_index)
+        render("status", status, draw_status_bar, status_win, status)
+        with metrics.timed("affichage", "doupdate"):
+            curses.doupdate()
+        if first_frame:
+            startup_phase("première image")
+            first_frame = False
+        if filter_mode:
+            # Saisie du filtre au fil de l'eau : les caractères complètent le filtre,
+            # les touches spéciales (flèches, pages...) restent actives.
+            try:
+                key = stdscr.get_wch()
+            except curses.error:
+                key = -1
+            if isinstance(key, str):
+                if key in ("\n", "\r"):
+                    filter_mode = False
+                elif key == "\x1b":
+                    filter_mode = False
+                    filter_str = ""
+                elif key in ("\x7f", "\b"):
+                    filter_str = filter_str[:-1]
+                elif key.isprintable():
+                    filter_str += key
+                if category in virtual:
+                    # Liste triée par le DC : la saisie place la sélection au lieu de filtrer
+                    if filter_mode and filter_str:
+                        browse_to(category, filter_str)
+                    elif not filter_mode:
+                        filter_str = ""
+                else:
+                    selected_index = 0
+                continue
+            if key == curses.KEY_BACKSPACE:
+                filter_str = filter_str[:-1]
+                selected_index = 0
+                continue
+        else:
+            key = stdscr.getch()
+
+        # Ligne d'une liste triée par le DC dont la fenêtre n'est pas encore reçue (dn None) :
+        # seules les actions sur les objets cochés restent possibles
+        if (key in ROW_ACTION_KEYS and items and items[selected_index] is VLV_PLACEHOLDER
+                and not (marked and key in (ord('d'), ord('v')))):
+            notification = "Ligne en cours de chargement, réessayez dans un instant."
+            continue
 
         if key == curses.KEY_LEFT:
             current_tab = (current_tab - 1) % len(tabs)
             selected_index = 0
             filter_str = ""
+            marked.clear()
         elif key == curses.KEY_RIGHT:
             current_tab = (current_tab + 1) % len(tabs)
             selected_index = 0
             filter_str = ""
+            marked.clear()
         elif key == curses.KEY_UP:
             selected_index = max(selected_index - 1, 0)
         elif key == curses.KEY_DOWN:
-            items = get_items_for_tab(current_tab, data)
-            if filter_str:
-                items = [item for item in items if filter_str.lower() in str(item).lower()]
             selected_index = min(selected_index + 1, len(items) - 1) if items else 0
+        elif key == curses.KEY_PPAGE:
+            selected_index = max(selected_index - page_size, 0)
+        elif key == curses.KEY_NPAGE:
+            selected_index = min(selected_index + page_size, len(items) - 1) if items else 0
+        elif key == curses.KEY_HOME:
+            selected_index = 0
+        elif key == curses.KEY_END:
+            selected_index = max(len(items) - 1, 0)
         elif key == ord('/'):
-            filter_str = modal_input(stdscr, "Filtrer", "Entrez une chaîne à filtrer: ")
+            filter_mode = True
             selected_index = 0
+        elif key == ord(' '):
+            # Coche/décoche l'élément courant et passe au suivant
+            dn = item_dn(items[selected_index]) if items else None
+            if dn:
+                if dn in marked:
+                    marked.discard(dn)
+                else:
+                    marked.add(dn)
+                mark_anchor = selected_index
+                selected_index = min(selected_index + 1, len(items) - 1)
+        elif key == ord('+') and items:
+            # Coche la plage entre le dernier élément coché avec Espace et l'élément courant
+            low, high = sorted((min(mark_anchor, len(items) - 1), selected_index))
+            marked.update(dn for dn in map(item_dn, items[low:high + 1]) if dn)
+        elif key == ord('*') and category in virtual:
+            notification = "Tout cocher est indisponible dans une liste triée par le DC (L)."
+        elif key == ord('*'):
+            # Coche tous les éléments affichés (liste filtrée), ou les décoche s'ils le sont déjà
+            shown = {dn for dn in map(item_dn, items) if dn}
+            if shown and shown <= marked:
+                marked.difference_update(shown)
+            else:
+                marked.update(shown)
+        elif key == ord('x'):
+            count = jobs.cancel_all()
+            notification = f"{count} opération(s) annulée(s)." if count else "Aucune opération en cours."
         elif key == ord('c'):
-            notification = handle_create_action(stdscr, current_tab, domain_info)
-            data = refresh_data(domain_info)
-            data['recherche'] = []
+            notification = handle_create_action(stdscr, current_tab, domain_info, submit)
             selected_index = 0
         elif key == ord('d'):
-            notification = handle_delete_action(stdscr, current_tab, data, selected_index, domain_info)
-            data = refresh_data(domain_info)
-            data['recherche'] = []
-            selected_index = 0
+            if marked:
+                if modal_confirm(stdscr, f"Supprimer les {len(marked)} objets sélectionnés ? (y/n): "):
+                    start_bulk(f"Suppression de {len(marked)} objets", delete_objects, list(marked))
+                else:
+                    notification = "Opération annulée."
+            else:
+                notification = handle_delete_action(stdscr, current_tab, items, selected_index, domain_info, submit)
+                selected_index = 0
         elif key == ord('p'):
             if current_tab == 4:
-                items = get_items_for_tab(current_tab, data)
                 if items:
                     selected_item = items[selected_index]
                     username = selected_item.get("sAMAccountName", "")
                     if username:
                         new_pwd = modal_input(stdscr, "Réinitialiser mot de passe", f"Nouveau mot de passe pour {username}: ")
                         if new_pwd:
-                            notification = reset_password(domain_info["samdb"], domain_info["domain_dn"], username, new_pwd)
+                            notification = submit(f"Réinitialisation du mot de passe de {username}", reset_password,
+                                                  domain_info["samdb"], domain_info["domain_dn"], username, new_pwd)
+        elif key in (curses.KEY_F5, curses.KEY_F6) and current_tab == 7:
+            start_hygiene()
+        elif key in (curses.KEY_F5, curses.KEY_F6) and category in virtual:
+            virtual[category].invalidate()
+        elif key == ord('L') and category in VLV_SORT:
+            # Bascule entre la liste chargée en entier et le parcours trié par le DC
+            if category in virtual:
+                del virtual[category]
+                if category not in loaded_categories(data):
+                    start_category_load(category, force=True)
+                notification = f"{DASHBOARD_LABELS[category]} : liste complète."
+            else:
+                if category in loading:
+                    loading[category].cancel()
+                start_browse(category)
+                notification = f"{DASHBOARD_LABELS[category]} : parcours trié par le DC ('/' : aller à un nom)."
+            selected_index = 0
+            filter_str = ""
+        elif current_tab == 7 and key in (ord('o'), ord('s')) and hygiene["table"] is not None:
+            # Rapport ('o') ou tri ('s') suivant
+            field, choices = ("report", REPORTS) if key == ord('o') else ("sort", SORTS)
+            keys = list(choices)
+            hygiene[field] = keys[(keys.index(hygiene[field]) + 1) % len(keys)]
+            notification = f"Rapport : {REPORTS[hygiene['report']]}, tri : {SORTS[hygiene['sort']][0]}."
+            selected_index = 0
+            show_hygiene_report()
+        elif current_tab == 7 and key == ord('j'):
+            days = modal_input(stdscr, "Hygiène des comptes", f"Seuil d'inactivité en jours ({hygiene['days']}): ")
+            if days.strip().isdigit():
+                hygiene["days"] = int(days)
+                start_hygiene()
+        elif current_tab == 7 and key == ord('e'):
+            path = modal_input(stdscr, "Export CSV", "Fichier CSV: ") or f"hygiene_{hygiene['report']}.csv"
+            notification = write_csv(path, items)
         elif key == curses.KEY_F5:
-            data = refresh_data(domain_info)
-            data['recherche'] = []
-            notification = "Données actualisées."
+            if current_tab == 0:
+                start_sync(message="Données actualisées.")
+                start_count()
+            elif category in loaded_categories(data):
+                start_sync([category], f"{DASHBOARD_LABELS[category]} : données actualisées.")
+            elif category:
+                start_category_load(category, force=True)
+            else:
+                notification = "Relancez la recherche avec 'S'."
+        elif key == curses.KEY_F6:
+            if current_tab == 0:
+                start_count()
+            elif category:
+                start_category_load(category, force=True)
+                selected_index = 0
+                if category == "groupes":
+                    # Le graphe des appartenances sera relu à la prochaine utilisation de 'g'
+                    membership.clear()
+        elif key == curses.KEY_F2:
+            show_metrics = not show_metrics
+        elif key == ord('W'):
+            path = modal_input(stdscr, "Exporter les mesures", "Fichier (.prom ou .json): ") or "samba-ad-tui.prom"
+            notification = metrics.export(path)
         elif key == ord('h'):
             show_help(stdscr)
         elif key == ord('a'):
-            items = get_items_for_tab(current_tab, data)
             if items:
                 selected_item = items[selected_index]
                 dn = get_dn_for_selected(current_tab, selected_item, domain_info)
                 if dn:
-                    attrs = get_object_attributes(domain_info["samdb"], dn, all_attrs=False)
-                    if isinstance(attrs, dict):
-                        text = parse_samba_attrs(attrs)
-                    else:
-                        text = str(attrs)
-                    display_modal_text(stdscr, "Attributs de l'objet", text)
+                    show_attributes(dn, False, "Attributs de l'objet")
         elif key == ord('t'):
-            items = get_items_for_tab(current_tab, data)
             if items:
                 selected_item = items[selected_index]
                 dn = get_dn_for_selected(current_tab, selected_item, domain_info)
                 if dn:
-                    attrs = get_object_attributes(domain_info["samdb"], dn, all_attrs=True)
-                    if isinstance(attrs, dict):
-                        text = parse_samba_attrs(attrs)
-                    else:
-                        text = str(attrs)
-                    display_modal_text(stdscr, "Attributs COMPLETS de l'objet", text)
+                    show_attributes(dn, True, "Attributs COMPLETS de l'objet")
+        elif key == ord('g'):
+            if items and current_tab != 0:
+                dn = get_dn_for_selected(current_tab, items[selected_index], domain_info)
+                if dn:
+                    show_membership(str(dn))
         elif key == ord('m'):
-            items = get_items_for_tab(current_tab, data)
             if items:
                 selected_item = items[selected_index]
                 dn = get_dn_for_selected(current_tab, selected_item, domain_info)
@@ -596,23 +1401,50 @@ def main_tui(stdscr, domain_info):
                         if '=' in pair:
                             attr, val = pair.split('=', 1)
                             modifications[attr.strip()] = [val.strip()]
-                    notification = modify_object(domain_info["samdb"], dn, modifications)
+                    notification = submit(f"Modification de {dn}", modify_object, domain_info["samdb"], dn, modifications)
+        elif key == ord('M'):
+            # Objets visés : la liste filtrée par '/' si un filtre est actif, sinon un filtre LDAP
+            filter_expr = None
+            if not filter_str:
+                filter_expr = modal_input(stdscr, "Modification par lots", "Filtre LDAP des objets à modifier: ")
+            template = modal_input(stdscr, "Modification par lots",
+                                   "Modèle (attr=val remplace, +attr=val ajoute, -attr[=val] retire ; ...): ")
+            operations = parse_modification_template(template) if (filter_expr or filter_str) else None
+            if operations is None:
+                notification = "Opération annulée."
+            elif isinstance(operations, str):
+                notification = operations
+            elif filter_expr:
+                start_batch_search(filter_expr, operations)
+            else:
+                dns = [get_dn_for_selected(current_tab, item, domain_info) for item in items]
+                start_batch_modify([str(dn) for dn in dns if dn], operations)
+        elif key == ord('U'):
+            if not last_rollback:
+                notification = "Aucun lot de modifications à annuler."
+            elif modal_confirm(stdscr, "Annuler le dernier lot de modifications ? (y/n): "):
+                start_rollback(last_rollback)
+                last_rollback = None
         elif key == ord('r'):
-            items = get_items_for_tab(current_tab, data)
             if items:
                 selected_item = items[selected_index]
                 dn = get_dn_for_selected(current_tab, selected_item, domain_info)
                 if dn:
                     new_rdn = modal_input(stdscr, "Renommer", "Entrez le nouveau RDN (ex: CN=nouveau_nom): ")
-                    notification = rename_object(domain_info["samdb"], dn, new_rdn)
+                    notification = submit(f"Renommage de {dn}", rename_object, domain_info["samdb"], dn, new_rdn)
+        elif key == ord('v') and marked:
+            target_dn = modal_input(stdscr, "Déplacer la sélection", "DN du conteneur de destination: ")
+            if target_dn:
+                start_bulk(f"Déplacement de {len(marked)} objets", move_objects, list(marked), target_dn)
+            else:
+                notification = "Opération annulée."
         elif key == ord('v'):
-            items = get_items_for_tab(current_tab, data)
             if items:
                 selected_item = items[selected_index]
                 dn = get_dn_for_selected(current_tab, selected_item, domain_info)
                 if dn:
                     new_dn = modal_input(stdscr, "Déplacer", "Entrez le nouveau DN: ")
-                    notification = move_object(domain_info["samdb"], dn, new_dn)
+                    notification = submit(f"Déplacement de {dn}", move_object, domain_info["samdb"], dn, new_dn)
         elif key == ord('S'):
             base_dn = modal_input(stdscr, "Recherche avancée", "Entrez la base DN (laisser vide = domaine par défaut): ")
             if not base_dn:
@@ -623,14 +1455,17 @@ def main_tui(stdscr, domain_info):
                 attrs = [a.strip() for a in attrs_str.split(',')]
             else:
                 attrs = None
-            results = search_objects(domain_info["samdb"], base_dn, filter_expr, attrs)
-            data['recherche'] = results if isinstance(results, list) else []
-            current_tab = 6
-            selected_index = 0
-            notification = f"{len(data['recherche'])} résultats trouvés."
+            start_search(base_dn, filter_expr, attrs)
         elif key == 27:
             break
+        if key != -1 and key not in NAVIGATION_KEYS:
+            redraw_all()
 
+    draw_status_bar(status_win, "Fin des opérations en cours...")
+    curses.doupdate()
+    jobs.shutdown()
+    if loaded_categories(data):
+        save_snapshot(DEFAULT_SNAPSHOT_PATH, domain_info["domain_dn"], data)
     stdscr.erase()
     stdscr.refresh()
 
@@ -640,19 +1475,31 @@ def show_help(stdscr):
     help_text = [
         "Aide - Raccourcis clavier:",
         "h  : Afficher cette aide",
-        "F5 : Actualiser les données",
-        "/  : Filtrer la liste",
+        "F5 : Actualiser l'onglet courant (changements depuis son dernier chargement)",
+        "F6 : Recharger intégralement l'onglet courant (Dashboard : recompter les objets)",
+        "/  : Filtrer la liste au fil de la frappe (ex. jdoe, sam:jdoe desc:prestataire)",
         "c  : Créer un nouvel objet (selon l'onglet)",
-        "d  : Supprimer l'objet sélectionné",
+        "d  : Supprimer l'objet sélectionné (ou tous les objets cochés)",
         "p  : Réinitialiser le mot de passe d’un utilisateur (onglet Utilisateurs)",
         "a  : Afficher un sous-ensemble d'attributs de l'objet",
-        "t  : Afficher TOUS les attributs (risque de déconnexion si trop volumineux)",
+        "g  : Appartenances (membres effectifs d'un groupe, groupes imbriqués, cycles)",
+        "t  : Afficher TOUS les attributs (membres lus par tranches, Entrée : aperçu hexadécimal des valeurs binaires)",
         "m  : Modifier les attributs (attr=val;...)",
+        "M  : Modifier par lots la liste filtrée par '/' ou les objets d'un filtre LDAP",
+        "     (attr=val remplace, +attr=val ajoute, -attr=val retire une valeur, -attr supprime)",
+        "U  : Annuler le dernier lot de modifications (journal d'annulation)",
         "r  : Renommer l'objet (nouveau RDN)",
-        "v  : Déplacer l'objet (nouveau DN)",
+        "v  : Déplacer l'objet (nouveau DN), ou les objets cochés (DN du conteneur)",
+        "Espace : Cocher/décocher l'objet ; + : cocher jusqu'au dernier coché ; * : tout (dé)cocher",
+        "x  : Annuler les opérations en cours (chargement, recherche, création de GPO...)",
+        "F2 : Mesures (durée des opérations LDAP, du décodage et de l'affichage) ; W : les exporter",
         "S  : Recherche avancée (base DN, filtre LDAP, attributs)",
+        "L  : Utilisateurs/Ordinateurs : parcourir la liste triée par le DC sans la charger ('/' = aller à un nom)",
+        "Onglet Hygiène : o = rapport suivant (inactifs, jamais connectés, désactivés...),",
+        "     s = tri suivant, j = seuil d'inactivité, e = export CSV de la liste affichée, F5 = réanalyser",
         "←/→ : Changer d'onglet",
         "↑/↓ : Navigation dans la liste",
+        "PgPrec/PgSuiv, Début/Fin : Défiler d'une page, aller en haut/en bas de la liste",
         "ESC : Quitter l'application",
         "",
         "Dans l'onglet 'Recherche', vous pouvez sélectionner un objet, puis",
@@ -669,11 +1516,51 @@ def show_help(stdscr):
     win.refresh()
     win.getch()
 
-if __name__ == "__main__":
-    admin_user = input("[LOGIN] Entrez le nom d'utilisateur Samba AD : ")
-    admin_password = getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
-    domain_info = detect_domain_settings(admin_user, admin_password)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interface texte d'administration Samba AD.")
+    parser.add_argument("--user", default=os.environ.get("SAMBA_AD_USER"),
+                        help="compte administrateur Samba AD (défaut : $SAMBA_AD_USER, sinon demandé)")
+    parser.add_argument("--url", help="URL de l'annuaire (défaut : $SAMBA_AD_URL ou ldap://localhost)")
+    parser.add_argument("--kerberos", action="store_true",
+                        help="s'authentifier avec le ticket Kerberos courant (kinit) au lieu d'un mot de passe")
+    parser.add_argument("--no-intro", action="store_true", help="ne pas afficher l'animation d'intro")
+    parser.add_argument("--refresh-domain", action="store_true",
+                        help="relire le contexte du domaine sur le DC au lieu de celui mémorisé")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="afficher la durée de chaque étape du démarrage en quittant")
+    parser.add_argument("--metrics-file",
+                        help="exporter les mesures en quittant (.json, sinon format texte Prometheus)")
+    args = parser.parse_args(argv)
+    startup_phase("imports")
+
+    admin_user, admin_password = args.user, None
+    if not args.kerberos:
+        admin_user = admin_user or input("[LOGIN] Entrez le nom d'utilisateur Samba AD : ")
+        admin_password = os.environ.get("SAMBA_AD_PASSWORD") or getpass.getpass("[LOGIN] Entrez le mot de passe Samba AD : ")
+    startup_phase("saisie des identifiants")
+
+    timings = {}
+    domain_info = detect_domain_settings(admin_user, admin_password, url=args.url, kerberos=args.kerberos,
+                                         use_cache=not args.refresh_domain, timings=timings)
+    startup_phase("connexion", timings)
     if isinstance(domain_info, str):
         print(domain_info)
-    else:
-        curses.wrapper(main_tui, domain_info)
+        return 1
+
+    # Intro au premier lancement seulement (ou jamais avec --no-intro)
+    intro = not args.no_intro and not os.path.exists(INTRO_MARKER)
+    if intro:
+        try:
+            os.makedirs(os.path.dirname(INTRO_MARKER), mode=0o700, exist_ok=True)
+            open(INTRO_MARKER, "a").close()
+        except OSError:
+            pass
+    curses.wrapper(main_tui, domain_info, intro)
+    if args.profile_startup:
+        print(startup_report(), file=sys.stderr)
+    if args.metrics_file:
+        print(metrics.export(args.metrics_file), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
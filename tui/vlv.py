@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+
+
+class VirtualList:
+    """
+    Liste triée par le DC dont seules quelques fenêtres sont en mémoire (Virtual List View).
+    - L'accès à un élément absent renvoie 'placeholder' et demande sa fenêtre via
+      'fetch(start, size)', qui doit charger les données de façon asynchrone puis appeler
+      store() (ou failed() en cas d'échec) ; une même fenêtre n'est demandée qu'une fois à
+      la fois, et une fenêtre en échec n'est redemandée qu'après 'retry_delay' secondes.
+    - Au plus 'max_windows' fenêtres de 'window' éléments sont conservées (les moins
+      récemment affichées sont oubliées) : la mémoire ne dépend pas de la taille de la liste.
+    - 'version' change à chaque fenêtre reçue (l'affichage sait ainsi qu'il doit se redessiner).
+    store() et l'accès aux éléments doivent être appelés depuis le même thread.
+    """
+
+    def __init__(self, fetch, placeholder, window=100, max_windows=8, retry_delay=5):
+        self.fetch = fetch
+        self.placeholder = placeholder
+        self.window = window
+        self.max_windows = max_windows
+        self.retry_delay = retry_delay
+        self.total = None
+        self.context = None
+        self.version = 0
+        self._windows = OrderedDict()
+        self._pending = set()
+        self._failed = {}
+
+    def __len__(self):
+        return self.total or 0
+
+    def _item(self, index):
+        start = index - index % self.window
+        records = self._windows.get(start)
+        if records is None:
+            if start not in self._pending and time.monotonic() >= self._failed.get(start, 0):
+                self._pending.add(start)
+                self.fetch(start, self.window)
+            return self.placeholder
+        self._windows.move_to_end(start)
+        offset = index - start
+        return records[offset] if offset < len(records) else self.placeholder
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._item(i) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(key)
+        return self._item(key)
+
+    def __iter__(self):
+        """Éléments actuellement en mémoire uniquement (le parcours ne provoque aucune requête)."""
+        for start in sorted(self._windows):
+            yield from self._windows[start]
+
+    def start(self):
+        """Demande la première fenêtre (et le nombre total d'éléments)."""
+        self._pending.add(0)
+        self.fetch(0, self.window)
+
+    def resize(self, total, context=None):
+        """Nombre total d'éléments reçu du DC ; s'il a changé, les fenêtres reçues sont oubliées."""
+        if total != self.total:
+            self._windows.clear()
+            self.total = total
+            self.version += 1
+        self.context = context or self.context
+
+    def store(self, start, records, total, context=None):
+        """Enregistre la fenêtre qui commence à 'start' (demandée par fetch) et le nombre total d'éléments."""
+        self._pending.discard(start)
+        self._failed.pop(start, None)
+        self.resize(total, context)
+        self._windows[start] = records
+        while len(self._windows) > self.max_windows:
+            self._windows.popitem(last=False)
+        self.version += 1
+
+    def failed(self, start):
+        """La fenêtre qui commence à 'start' n'a pas pu être lue : elle sera redemandée plus tard."""
+        self._pending.discard(start)
+        self._failed[start] = time.monotonic() + self.retry_delay
+
+    def invalidate(self):
+        """Oublie les fenêtres reçues (après une modification de la liste) et relit la première."""
+        self._windows.clear()
+        self._pending.clear()
+        self._failed.clear()
+        self.context = None
+        self.version += 1
+        self.start()